@@ -0,0 +1,220 @@
+"""
+Reproducible benchmarks for deck generation, deck file I/O and the scoring kernels.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks                      # default scales
+    python -m benchmarks.run_benchmarks --scales 10000 100000 --repeats 5
+    python -m benchmarks.run_benchmarks --write-baseline     # store as the new baseline
+    python -m benchmarks.run_benchmarks --markdown           # tables for write_ups/
+
+Each benchmark is warmed up once (numba compilation, page cache) before the
+timed repeats. Results go to benchmarks/results/<timestamp>.json and are
+compared against benchmarks/baseline.json: a median slower than the baseline
+by more than --threshold is reported as a regression (exit code 1).
+Timings depend on the machine, so no baseline is committed: run once with
+--write-baseline (e.g. before a change) to create one for later comparisons.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import statistics
+import tempfile
+import tracemalloc
+import numpy as np
+
+from src.create_data import create_deck_data_bitarray, generate_decks
+from src.deck_file import deck_count
+from src.score_data import (
+    all_sequences_binary_order,
+    compute_winrate_table_incremental,
+    read_deck_file,
+    score_deck_humble_jit,
+    _batch_score,
+    _seq_to_array,
+)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SCALES = [10_000, 100_000]
+
+
+def _time(fn, repeats):
+    """
+    Call fn once untimed (warm-up), then `repeats` times under timing and tracemalloc.
+    """
+    fn()
+    times, peaks = [], []
+    for _ in range(repeats):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return times, peaks
+
+
+def _summary(name, n_decks, times, peaks):
+    return {
+        "name": name,
+        "n_decks": n_decks,
+        "median_s": statistics.median(times),
+        "mean_s": statistics.mean(times),
+        "std_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "min_s": min(times),
+        "max_s": max(times),
+        "decks_per_s": n_decks / statistics.median(times),
+        "peak_kib": max(peaks) / 1024,
+    }
+
+
+def run_benchmarks(scales, repeats, workdir):
+    """
+    Run every benchmark at every scale inside workdir and return result dicts.
+    """
+    seqs = all_sequences_binary_order(3)
+    seq_arrays = {s: _seq_to_array(s) for s in seqs}
+    results = []
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for n in scales:
+            deck_name = f"decks_{n}.bin"
+            deck_path = os.path.join("data", "decks", deck_name)
+
+            times, peaks = _time(lambda: create_deck_data_bitarray(num_decks=n, output_name=deck_name,
+                                                                   batch_size=10_000, seed=0), repeats)
+            results.append(_summary("generate_bitarray_file", n, times, peaks))
+            assert deck_count(deck_path) == n
+
+            times, peaks = _time(lambda: read_deck_file(deck_path), repeats)
+            results.append(_summary("read_deck_file", n, times, peaks))
+
+            decks = read_deck_file(deck_path)
+            sample = decks[:min(n, 1_000)]
+
+            def _per_pair_loop():
+                for deck in sample:
+                    for s1 in seqs:
+                        for s2 in seqs:
+                            if s1 != s2:
+                                score_deck_humble_jit(deck, seq_arrays[s1], seq_arrays[s2])
+
+            times, peaks = _time(_per_pair_loop, repeats)
+            results.append(_summary("score_deck_humble_jit_per_pair", len(sample), times, peaks))
+
+            times, peaks = _time(lambda: _batch_score(decks, seqs, seq_arrays), repeats)
+            results.append(_summary("batch_score", n, times, peaks))
+
+            tracking = os.path.join("data", "tracking_decks")
+
+            def _incremental():
+                shutil.rmtree(tracking, ignore_errors=True)
+                os.makedirs(tracking)
+                compute_winrate_table_incremental(
+                    deck_path, k=3,
+                    counts_cards_file=os.path.join(tracking, "counts_cards.npy"),
+                    counts_tricks_file=os.path.join(tracking, "counts_tricks.npy"),
+                    last_n_file=os.path.join(tracking, "last_n.txt"),
+                )
+
+            times, peaks = _time(_incremental, repeats)
+            results.append(_summary("compute_winrate_table_incremental", n, times, peaks))
+
+            times, peaks = _time(lambda: generate_decks(np.random.default_rng(0), n), repeats)
+            results.append(_summary("generate_decks_in_memory", n, times, peaks))
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Return (name, n_decks, baseline_median, median, ratio) for every benchmark
+    slower than its baseline by more than threshold (0.2 = 20%).
+    """
+    base = {(r["name"], r["n_decks"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        b = base.get((r["name"], r["n_decks"]))
+        if b is None:
+            continue
+        ratio = r["median_s"] / b["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append((r["name"], r["n_decks"], b["median_s"], r["median_s"], ratio))
+    return regressions
+
+
+def markdown_tables(results):
+    """
+    Format results in the table layout used by write_ups/DataGeneration.md and Scoring.md.
+    """
+    lines = []
+    for r in results:
+        lines.append(f"### {r['name']} ({r['n_decks']:,} decks)")
+        lines.append("| Statistic | Runtime (s) | Peak Memory Usage (KiB) |")
+        lines.append("| ---- | ---------- | ---------- |")
+        lines.append(f"| Median | {r['median_s']:.4f} | {r['peak_kib']:.2f} |")
+        lines.append(f"| Avg | {r['mean_s']:.4f} | |")
+        lines.append(f"| Min | {r['min_s']:.4f} | |")
+        lines.append(f"| Max | {r['max_s']:.4f} | |")
+        lines.append(f"| Std Dev | {r['std_s']:.4f} | |")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--markdown", action="store_true")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="penney_bench_")
+    try:
+        results = run_benchmarks(args.scales, args.repeats, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpu_count": os.cpu_count()},
+        "repeats": args.repeats,
+        "results": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results: {out_path}")
+    for r in results:
+        print(f"{r['name']:<36} n={r['n_decks']:>9,}  median={r['median_s']:.4f}s  "
+              f"{r['decks_per_s']:,.0f} decks/s  peak={r['peak_kib']:.0f} KiB")
+    if args.markdown:
+        print(markdown_tables(results))
+
+    if args.write_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline: {BASELINE_FILE}")
+        return 0
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.threshold)
+        for name, n, base_s, now_s, ratio in regressions:
+            print(f"REGRESSION {name} n={n:,}: {base_s:.4f}s -> {now_s:.4f}s ({ratio:.2f}x)")
+        return 1 if regressions else 0
+    print(f"No baseline at {BASELINE_FILE}; run with --write-baseline to create one")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 from src.run_experiment import main
 
 if __name__ == "__main__":
-    # Run the full experiment (create decks, score, plot, prompt to add more)
+    # Run the experiment headless (create decks, score, plot); --interactive prompts to add more
     main()
 
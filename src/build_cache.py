@@ -0,0 +1,58 @@
+import os
+import json
+import hashlib
+import numpy as np
+from src.checkpoint import atomic_write_bytes
+
+def input_digest(*arrays, **params) -> str:
+    """
+    Hash of the arrays (values, dtype and shape) and JSON-able parameters an
+    output is rendered from.
+    """
+    h = hashlib.sha256()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        h.update(repr((arr.dtype.str, arr.shape)).encode())
+        h.update(arr.tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+class BuildCache:
+    """
+    Manifest of generated outputs (CSV tables, plots): for each output path,
+    the digest of the inputs it was rendered from and the group (run type) it
+    belongs to. An output is fresh when it exists and its recorded digest
+    matches, so unchanged results are not rendered again. Outputs a group no
+    longer produces are removed with prune, which only ever touches files the
+    manifest recorded.
+    """
+
+    def __init__(self, manifest_path: str = "data/build_manifest.json"):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.entries = json.load(f)
+
+    def is_fresh(self, target: str, digest: str) -> bool:
+        entry = self.entries.get(target)
+        return entry is not None and entry["digest"] == digest and os.path.exists(target)
+
+    def record(self, target: str, digest: str, group: str):
+        self.entries[target] = {"digest": digest, "group": group}
+
+    def prune(self, group: str, keep) -> list:
+        """
+        Delete outputs recorded under group that are not in keep; returns them.
+        """
+        keep = set(keep)
+        stale = [t for t, e in self.entries.items() if e["group"] == group and t not in keep]
+        for target in stale:
+            if os.path.exists(target):
+                os.remove(target)
+            del self.entries[target]
+        return stale
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        atomic_write_bytes(self.manifest_path, json.dumps(self.entries, indent=1, sort_keys=True).encode())
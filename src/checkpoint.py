@@ -0,0 +1,83 @@
+import os
+import io
+import json
+import numpy as np
+
+def atomic_write_bytes(path: str, data: bytes):
+    """
+    Write data to path via a temporary file and rename, so readers never see a
+    partially written file even if the process is killed mid-write.
+    """
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def atomic_save_npy(path: str, arr):
+    """
+    np.save counterpart of atomic_write_bytes.
+    """
+    buf = io.BytesIO()
+    np.save(buf, np.asarray(arr))
+    atomic_write_bytes(path, buf.getvalue())
+
+def merge_ranges(ranges):
+    """
+    Merge [start, stop) ranges into a sorted list of disjoint ranges.
+    """
+    merged = []
+    for start, stop in sorted((int(a), int(b)) for a, b in ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return [tuple(r) for r in merged]
+
+def missing_ranges(done, start: int, stop: int):
+    """
+    Sub-ranges of [start, stop) not covered by the (merged) done ranges.
+    """
+    missing = []
+    cur = start
+    for a, b in merge_ranges(done):
+        if b <= cur:
+            continue
+        if a >= stop:
+            break
+        if a > cur:
+            missing.append((cur, a))
+        cur = max(cur, b)
+    if cur < stop:
+        missing.append((cur, stop))
+    return missing
+
+def save_checkpoint(path: str, meta: dict, counts_cards, counts_tricks, done, **extra):
+    """
+    Atomically save scoring state: counts, the deck ranges they cover, and the
+    meta (deck file identity and scoring parameters) they are valid for.
+    Extra keyword arrays (e.g. histograms) are stored alongside the counts.
+    """
+    buf = io.BytesIO()
+    np.savez(buf, counts_cards=counts_cards, counts_tricks=counts_tricks,
+             done=np.array(merge_ranges(done), dtype=np.int64).reshape(-1, 2),
+             meta=np.array(json.dumps(meta, sort_keys=True)), **extra)
+    atomic_write_bytes(path, buf.getvalue())
+
+def load_checkpoint(path: str, meta: dict):
+    """
+    Load (counts_cards, counts_tricks, done, extra) from a checkpoint, or None if
+    there is no checkpoint or it was written for a different deck file or
+    parameters. extra maps the names of any extra arrays to their values.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        saved = json.loads(str(data['meta']))
+        if saved != json.loads(json.dumps(meta, sort_keys=True)):
+            print(f"Ignoring checkpoint {path}: written for a different deck file or parameters.")
+            return None
+        extra = {name: data[name] for name in data.files
+                 if name not in ('counts_cards', 'counts_tricks', 'done', 'meta')}
+        return data['counts_cards'], data['counts_tricks'], [tuple(r) for r in data['done']], extra
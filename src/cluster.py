@@ -0,0 +1,355 @@
+import io
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+from collections import deque
+import numpy as np
+from src.checkpoint import atomic_save_npy
+from src.create_data import split_batches, stream_seed
+from src.deck_file import read_header
+from src.score_data import (
+    all_sequences_binary_order,
+    build_transition_tables,
+    winrate_tables,
+    warm_kernels,
+    _generate_and_score,
+    _pattern_codes,
+    _pattern_matrix,
+    _score_file_range,
+    _seq_to_array,
+)
+
+# Every message is a frame header (JSON length, payload length), a JSON
+# header and an optional .npy payload; no pickles cross the network.
+FRAME = struct.Struct("<IQ")
+PROTOCOL = 1
+
+def send_msg(sock, header: dict, payload: bytes = b""):
+    head = json.dumps(header).encode()
+    sock.sendall(FRAME.pack(len(head), len(payload)) + head + payload)
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(min(n - len(buf), 1 << 20))
+        if not chunk:
+            raise ConnectionError("peer closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+def recv_msg(sock):
+    """
+    Return (header, payload) for the next message; ConnectionError on EOF.
+    """
+    head_len, payload_len = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    header = json.loads(_recv_exact(sock, head_len))
+    return header, _recv_exact(sock, payload_len)
+
+def _npy_bytes(arr) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, arr, allow_pickle=False)
+    return buf.getvalue()
+
+def file_units(file_path: str, k: int = 3, batch_size: int = 50_000, max_decks: int = None):
+    """
+    Work units covering decks [0, n) of a deck file in batch_size ranges.
+    Workers read the file themselves, so it must be at the same path on every node.
+    """
+    n = read_header(file_path).n_decks
+    if max_decks is not None:
+        n = min(n, max_decks)
+    return [{"kind": "file", "file_path": os.path.abspath(file_path), "lo": lo,
+             "hi": min(lo + batch_size, n), "k": k} for lo in range(0, n, batch_size)]
+
+def seed_units(num_decks: int, seed=None, k: int = 3, batch_size: int = 50_000,
+               n_red: int = 26, n_black: int = 26):
+    """
+    Work units generating num_decks decks from seed streams: unit i draws the
+    same decks as batch i of compute_winrate_table_streaming with this seed.
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    return [{"kind": "seed", "entropy": entropy, "stream": i, "size": size, "n_red": n_red,
+             "n_black": n_black, "k": k} for i, size in enumerate(split_batches(num_decks, batch_size))]
+
+def score_unit(unit: dict) -> np.ndarray:
+    """
+    Score one work unit with the existing kernels: (6, n, n) count matrices.
+    """
+    k = unit["k"]
+    seqs = all_sequences_binary_order(k)
+    patterns = _pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs})
+    codes = _pattern_codes(patterns)
+    if unit["kind"] == "file":
+        path = unit["file_path"]
+        tables = build_transition_tables(patterns) if read_header(path).deck_len > 56 else None
+        counts = _score_file_range(path, unit["lo"], unit["hi"], codes, k, tables)
+    else:
+        counts = _generate_and_score(stream_seed(unit["entropy"], unit["stream"]), unit["size"], codes, k,
+                                     unit["n_red"], unit["n_black"])
+    return np.array(counts, dtype=np.int64)
+
+def unit_decks(unit: dict) -> int:
+    return unit["hi"] - unit["lo"] if unit["kind"] == "file" else unit["size"]
+
+def check_unit_counts(unit: dict, counts: np.ndarray):
+    """
+    Raise ValueError unless counts are integer (6, n, n) matrices for the
+    unit's k in which every pair played each of the unit's decks exactly once.
+    """
+    nseq = 2 ** unit["k"]
+    if counts.dtype.kind not in "iu" or counts.shape != (6, nseq, nseq):
+        raise ValueError(f"expected integer counts of shape (6, {nseq}, {nseq}), "
+                         f"got {counts.dtype} {counts.shape}")
+    off_diag = ~np.eye(nseq, dtype=bool)
+    for games in (counts[:3].sum(axis=0), counts[3:].sum(axis=0)):
+        if not (games[off_diag] == unit_decks(unit)).all():
+            raise ValueError(f"counts do not cover the unit's {unit_decks(unit)} decks")
+
+def run_worker(host: str, port: int, connect_timeout: float = 30.0) -> int:
+    """
+    Connect to a coordinator, score the units it hands out until it says to
+    stop, and return the number of units scored. Retries the connection for
+    connect_timeout seconds, so workers may start before the coordinator.
+    """
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port), timeout=connect_timeout)
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+    warm_kernels()
+    scored = 0
+    with sock:
+        sock.settimeout(None)
+        send_msg(sock, {"type": "hello", "protocol": PROTOCOL, "host": socket.gethostname(), "pid": os.getpid()})
+        while True:
+            header, _ = recv_msg(sock)
+            if header["type"] == "stop":
+                return scored
+            send_msg(sock, {"type": "result", "id": header["id"]}, _npy_bytes(score_unit(header["unit"])))
+            scored += 1
+
+class Coordinator:
+    """
+    Hand out work units to workers over TCP and sum the count matrices they
+    send back. Each unit is given to one worker at a time; if that worker
+    disconnects, sends nothing for unit_timeout seconds or sends counts that
+    fail check_unit_counts, the worker is dropped and the unit goes back to
+    the front of the queue for the next free worker. A unit is added to the
+    totals only once, so late duplicates from a slow worker are dropped and the
+    totals equal single-node scoring exactly.
+    """
+
+    def __init__(self, units, host: str = "127.0.0.1", port: int = 0, unit_timeout: float = 600.0,
+                 on_result=None):
+        self.units = list(units)
+        self.unit_timeout = unit_timeout
+        self.on_result = on_result
+        self.counts = None
+        self.reassigned = 0
+        self.workers_seen = 0
+        self._pending = deque(range(len(self.units)))
+        self._done = set()
+        self._cond = threading.Condition()
+        self._server = socket.create_server((host, port))
+        self._server.settimeout(0.2)
+        self.address = self._server.getsockname()[:2]
+
+    def finished(self) -> bool:
+        return len(self._done) == len(self.units)
+
+    def _next_unit(self):
+        # Wait for a queued unit; None once every unit is done
+        with self._cond:
+            while not self._pending and not self.finished():
+                self._cond.wait(0.5)
+            return None if self.finished() else self._pending.popleft()
+
+    def _handle(self, conn):
+        uid = None
+        try:
+            conn.settimeout(self.unit_timeout)
+            hello, _ = recv_msg(conn)
+            if hello.get("protocol") != PROTOCOL:
+                return
+            with self._cond:
+                self.workers_seen += 1
+            while True:
+                uid = self._next_unit()
+                if uid is None:
+                    send_msg(conn, {"type": "stop"})
+                    return
+                send_msg(conn, {"type": "unit", "id": uid, "unit": self.units[uid]})
+                header, payload = recv_msg(conn)
+                if header.get("type") != "result" or header.get("id") != uid:
+                    return
+                counts = np.load(io.BytesIO(payload), allow_pickle=False)
+                check_unit_counts(self.units[uid], counts)
+                with self._cond:
+                    if uid not in self._done:
+                        self._done.add(uid)
+                        self.counts = counts.copy() if self.counts is None else self.counts + counts
+                        if self.on_result is not None:
+                            self.on_result(self.units[uid], counts)
+                    uid = None
+                    self._cond.notify_all()
+        except (OSError, ValueError):
+            # Dead, hung or misbehaving worker: its unit is requeued below
+            pass
+        finally:
+            with self._cond:
+                if uid is not None and uid not in self._done:
+                    self._pending.appendleft(uid)
+                    self.reassigned += 1
+                    self._cond.notify_all()
+            conn.close()
+
+    def serve(self, timeout: float = None) -> np.ndarray:
+        """
+        Accept workers until every unit is scored; returns the (6, n, n) totals.
+        Raises TimeoutError if timeout seconds pass first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        handlers = []
+        try:
+            while not self.finished():
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"{len(self.units) - len(self._done)} units still unscored")
+                try:
+                    conn, _ = self._server.accept()
+                except socket.timeout:
+                    continue
+                t = threading.Thread(target=self._handle, args=(conn,), daemon=True)
+                t.start()
+                handlers.append(t)
+            # Let connected workers receive their stop message
+            for t in handlers:
+                t.join(timeout=5.0)
+        finally:
+            self._server.close()
+        return self.counts
+
+def start_local_workers(n: int, host: str, port: int):
+    """
+    Launch n worker processes on this machine (python -m src.cluster worker),
+    splitting the cores between them.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (root, env.get("PYTHONPATH")) if p)
+    env["NUMBA_NUM_THREADS"] = str(max(1, (os.cpu_count() or 1) // n))
+    return [subprocess.Popen([sys.executable, "-m", "src.cluster", "worker", host, str(port)], env=env)
+            for _ in range(n)]
+
+def distributed_counts(
+    file_path: str = None,
+    num_decks: int = None,
+    seed=None,
+    k: int = 3,
+    batch_size: int = 50_000,
+    max_decks: int = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    local_workers: int = 0,
+    unit_timeout: float = 600.0,
+    timeout: float = None,
+    tracer=None,
+):
+    """
+    Score a deck file (file_path, up to max_decks) or num_decks decks
+    generated from seed on any number of worker processes connected over TCP.
+    Workers on other machines join with `python -m src.cluster worker HOST
+    PORT`; local_workers starts that many on this machine. Totals are exactly
+    those of compute_winrate_table_incremental (file) or
+    compute_winrate_table_streaming (seed) with the same batch_size.
+    Returns ((6, n, n) counts: cards p1/p2/tie then tricks p1/p2/tie, seqs).
+    """
+    if file_path is not None:
+        units = file_units(file_path, k, batch_size, max_decks)
+    elif num_decks is not None:
+        units = seed_units(num_decks, seed, k, batch_size)
+    else:
+        raise ValueError("need a deck file or num_decks to generate")
+
+    def _advance(unit, counts):
+        if tracer is not None:
+            tracer.advance(unit_decks(unit))
+
+    coordinator = Coordinator(units, host, port, unit_timeout, on_result=_advance)
+    print(f"Coordinator listening on {coordinator.address[0]}:{coordinator.address[1]} "
+          f"with {len(units)} work units")
+    if tracer is not None:
+        tracer.start_progress(sum(unit_decks(u) for u in units))
+    # Local workers reach a wildcard bind through the loopback address
+    local_host = "127.0.0.1" if coordinator.address[0] in ("0.0.0.0", "") else coordinator.address[0]
+    procs = start_local_workers(local_workers, local_host, coordinator.address[1]) if local_workers else []
+    try:
+        counts = coordinator.serve(timeout)
+    finally:
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+    seqs = all_sequences_binary_order(k)
+    if counts is None:
+        counts = np.zeros((6, len(seqs), len(seqs)), dtype=np.int64)
+    return counts, seqs
+
+def compute_winrate_table_distributed(*args, **kwargs):
+    """
+    distributed_counts summarised like compute_winrate_table_incremental:
+    returns the same tuple of DataFrames, percentage matrices and seqs.
+    """
+    counts, seqs = distributed_counts(*args, **kwargs)
+    return winrate_tables(counts[:3], counts[3:], seqs)
+
+def main(argv=None):
+    """
+    Command line:
+        python -m src.cluster worker HOST PORT
+        python -m src.cluster coordinate (--deck-file F | --num-decks N [--seed S])
+            [--k K] [--bind HOST] [--port P] [--local-workers N] [--out-cards F] [--out-tricks F]
+    Counts go to their own cluster_counts_*.npy by default, not the files
+    compute_winrate_table_incremental keeps next to its checkpoint.
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.cluster")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_worker = sub.add_parser("worker")
+    p_worker.add_argument("host")
+    p_worker.add_argument("port", type=int)
+    p_coord = sub.add_parser("coordinate")
+    src_group = p_coord.add_mutually_exclusive_group(required=True)
+    src_group.add_argument("--deck-file")
+    src_group.add_argument("--num-decks", type=int)
+    p_coord.add_argument("--seed", type=int)
+    p_coord.add_argument("--k", type=int, default=3)
+    p_coord.add_argument("--batch-size", type=int, default=50_000)
+    p_coord.add_argument("--bind", default="0.0.0.0")
+    p_coord.add_argument("--port", type=int, default=5757)
+    p_coord.add_argument("--local-workers", type=int, default=0)
+    p_coord.add_argument("--out-cards", default="data/tracking_decks/cluster_counts_cards.npy")
+    p_coord.add_argument("--out-tricks", default="data/tracking_decks/cluster_counts_tricks.npy")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "worker":
+        scored = run_worker(args.host, args.port)
+        print(f"Worker {os.getpid()} scored {scored} units")
+        return
+    counts, _ = distributed_counts(args.deck_file, args.num_decks, args.seed, args.k, args.batch_size,
+                                   host=args.bind, port=args.port, local_workers=args.local_workers)
+    atomic_save_npy(args.out_cards, counts[:3])
+    atomic_save_npy(args.out_tricks, counts[3:])
+    print(f"Saved {args.out_cards}, {args.out_tricks}")
+
+if __name__ == "__main__":
+    main()
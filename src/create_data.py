@@ -2,38 +2,199 @@ import os
 import numpy as np
 from bitarray import bitarray
 import concurrent.futures
+from collections import deque
 from typing import List
+from src.checkpoint import atomic_save_npy
+from src.deck_file import (
+    FLAG_BLOCK_INDEX,
+    block_index_path,
+    data_size,
+    make_header,
+    pack_records,
+    read_block_index,
+    read_header,
+    write_header,
+)
 
-def _create_bitarray_batch(size: int) -> bitarray:
+def generate_decks(rng: np.random.Generator, size: int, n_red: int = 26, n_black: int = 26) -> np.ndarray:
+    """
+    Generate a (size, n_red + n_black) block of shuffled decks in one vectorized call.
+    Red cards are 1, black cards 0, matching the pattern encoding used for scoring.
+    """
+    base = np.array([0] * n_black + [1] * n_red, dtype=np.uint8)
+    return rng.permuted(np.broadcast_to(base, (size, base.size)), axis=1)
+
+def batch_seeds(seed, n_batches: int) -> List[np.random.SeedSequence]:
+    """
+    Spawn one independent SeedSequence per batch from a root seed (None = fresh entropy).
+    Batch i always gets the same stream for a given root seed, whichever process runs it.
+    """
+    return np.random.SeedSequence(seed).spawn(n_batches)
+
+def split_batches(num_decks: int, batch_size: int) -> List[int]:
+    """
+    Split num_decks into batch sizes. Batch sizes must be even so every 52-card
+    batch packs into whole bytes (2 decks = 13 bytes) and batches concatenate cleanly.
+    """
+    if batch_size % 2:
+        raise ValueError(f"batch_size must be even, got {batch_size}")
+    batches = [batch_size] * (num_decks // batch_size)
+    if num_decks % batch_size:
+        batches.append(num_decks % batch_size)
+    return batches
+
+def _create_packed_batch(seed_seq: np.random.SeedSequence, size: int) -> bytes:
+    """
+    Create a batch of shuffled decks from its own seed stream, packed 1 bit per card.
+    """
+    decks = generate_decks(np.random.default_rng(seed_seq), size)
+    return np.packbits(decks.ravel()).tobytes()
+
+def _create_bitarray_batch(size: int, seed=None) -> bitarray:
     """
     Create a batch of shuffled decks encoded as bitarrays.
     Each deck has 52 cards, shuffled.
     """
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
     batch = bitarray()
-    for _ in range(size):
-        deck = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
-        np.random.shuffle(deck)
-        batch.extend(deck)
+    batch.frombytes(_create_packed_batch(seed_seq, size))
+    del batch[size * 52:]
     return batch
 
-def create_deck_data_bitarray(num_decks=5_000_000, output_name='decks_bitarray.bin', batch_size=50_000):
+def write_pipelined(f, fn, batch_args, workers: int = None, in_flight: int = None,
+                    buffer_bytes: int = 8 << 20, on_batch=None) -> int:
+    """
+    Compute fn(*args) for each args in batch_args on a thread pool and write
+    the resulting bytes to f in batch order, whatever order they finish in.
+    At most in_flight batches (default two per worker) are being generated or
+    waiting to be written at once, so memory stays flat however many batches
+    there are, and generation overlaps with writing. Results are gathered into
+    writes of about buffer_bytes. on_batch(i, data) is called as batch i is
+    queued for writing. Returns the number of bytes written.
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or 2 * workers
+    pending = deque()
+    buffer = []
+    buffered = written = 0
+
+    def _flush():
+        nonlocal buffered, written
+        if buffer:
+            f.write(b"".join(buffer))
+            written += buffered
+            buffer.clear()
+            buffered = 0
+
+    def _take():
+        nonlocal buffered
+        i, fut = pending.popleft()
+        data = fut.result()
+        if on_batch is not None:
+            on_batch(i, data)
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= buffer_bytes:
+            _flush()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, args in enumerate(batch_args):
+            if len(pending) >= in_flight:
+                _take()
+            pending.append((i, executor.submit(fn, *args)))
+        while pending:
+            _take()
+    _flush()
+    return written
+
+def create_deck_data_bitarray(num_decks=5_000_000, output_name='decks_bitarray.bin', batch_size=50_000, seed=None):
     """
     Create and save num_decks decks in batches as bitarray in a file.
+    Each batch draws from its own SeedSequence stream, and batches are written in
+    order, so a given seed always produces the same file.
     """
     output_dir = 'data/decks'
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, output_name)
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        batches = [batch_size] * (num_decks // batch_size)
-        if num_decks % batch_size:
-            batches.append(num_decks % batch_size)
+    batches = split_batches(num_decks, batch_size)
+    with open(output_path, 'wb') as f:
+        write_pipelined(f, _create_packed_batch, zip(batch_seeds(seed, len(batches)), batches))
+
+def stream_seed(entropy: int, stream: int) -> np.random.SeedSequence:
+    """
+    Seed stream number `stream` of a root seed; identical to
+    SeedSequence(entropy).spawn(stream + 1)[stream], without spawning the others.
+    """
+    return np.random.SeedSequence(entropy, spawn_key=(stream,))
 
-        futures = [executor.submit(_create_bitarray_batch, batch) for batch in batches]
+def _create_record_batch(seed_seq: np.random.SeedSequence, size: int, n_red: int, n_black: int,
+                         stride_bits: int) -> bytes:
+    """
+    Create a batch of shuffled decks from its own seed stream, packed as deck file records.
+    """
+    return pack_records(generate_decks(np.random.default_rng(seed_seq), size, n_red, n_black), stride_bits)
 
-        with open(output_path, 'wb') as f:
-            for future in concurrent.futures.as_completed(futures):
-                future.result().tofile(f)
+def _write_streams(path: str, info, num_decks: int, batch_size: int):
+    """
+    Generate num_decks more decks into the version 2 file at path, one seed
+    stream per batch continuing from info.next_stream, then rewrite the header
+    (and block index). Bytes and index rows past the header's deck count, left
+    by an interrupted write, are discarded first, so the header is always authoritative.
+    """
+    sizes = [batch_size] * (num_decks // batch_size) + ([num_decks % batch_size] if num_decks % batch_size else [])
+    streams = range(info.next_stream, info.next_stream + len(sizes))
+    index = ([tuple(row) for row in read_block_index(path) if row[0] < info.n_decks]
+             if info.flags & FLAG_BLOCK_INDEX else None)
+    firsts = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64) + info.n_decks
+
+    def _index_batch(i, _):
+        if index is not None:
+            index.append((int(firsts[i]), sizes[i], streams[i]))
+
+    with open(path, 'r+b') as f:
+        f.truncate(info.data_offset + data_size(info))
+        f.seek(0, os.SEEK_END)
+        batch_args = ((stream_seed(info.entropy, stream), size, info.n_red, info.n_black, info.stride_bits)
+                      for stream, size in zip(streams, sizes))
+        write_pipelined(f, _create_record_batch, batch_args, on_batch=_index_batch)
+        f.flush()
+        os.fsync(f.fileno())
+        info = info._replace(n_decks=info.n_decks + num_decks, next_stream=streams.stop)
+        if index is not None:
+            atomic_save_npy(block_index_path(path), np.array(index, dtype=np.int64).reshape(-1, 3))
+        write_header(f, info)
+    return info
+
+def create_deck_file(path: str, num_decks: int, n_red: int = 26, n_black: int = 26, seed=None,
+                     batch_size: int = 50_000, stride_bits: int = None, block_index: bool = True):
+    """
+    Create a version 2 (self-describing) deck file of num_decks decks of
+    n_red red and n_black black cards. The header records the composition,
+    deck count, record stride and seed, so readers never scan the data and
+    append_deck_file continues the same reproducible stream. block_index also
+    writes a <path>.idx.npy sidecar mapping each batch to its decks and seed stream.
+    Returns the file's DeckFileInfo.
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    info = make_header(n_red + n_black, n_red, n_black, stride_bits, entropy=entropy, batch_size=batch_size,
+                       flags=FLAG_BLOCK_INDEX if block_index else 0)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        write_header(f, info)
+    if block_index:
+        atomic_save_npy(block_index_path(path), np.zeros((0, 3), dtype=np.int64))
+    return _write_streams(path, info, num_decks, batch_size)
+
+def append_deck_file(path: str, num_to_add: int, batch_size: int = None):
+    """
+    Append num_to_add decks to a version 2 deck file, drawing from the seed
+    streams after the ones already used. batch_size defaults to the file's own.
+    """
+    info = read_header(path)
+    if info.version < 2:
+        raise ValueError(f"{path} is a legacy deck file with no header to extend")
+    return _write_streams(path, info, num_to_add, batch_size or info.batch_size)
 
 ############## DEPRECATED - kept for reference ##################
 def _create_bit_batch(num_decks: int) -> List[bytes]:
@@ -0,0 +1,231 @@
+import os
+import struct
+import hashlib
+from collections import namedtuple
+import numpy as np
+
+DECK_SIZE = 52
+
+# Version 2 files start with a fixed 64-byte little-endian header:
+#   magic, version, header size, deck length, red count, black count,
+#   bits per deck record (stride), flags, number of decks,
+#   SeedSequence entropy (128 bits), decks per seed stream, reserved, next stream id.
+# Deck d's record starts at bit header_size * 8 + d * stride; its first deck_len
+# bits are the cards (1 = red), first card first. Legacy (version 1) files are a
+# bare 52-bit-per-deck stream with no header.
+MAGIC = b"PNYDECK\0"
+VERSION = 2
+HEADER = struct.Struct("<8sHHHHHHHxxQ16sIIQ")
+HEADER_SIZE = 64
+FLAG_BLOCK_INDEX = 1
+
+DeckFileInfo = namedtuple("DeckFileInfo", [
+    "version", "deck_len", "n_red", "n_black", "stride_bits", "data_offset",
+    "n_decks", "entropy", "batch_size", "next_stream", "flags",
+])
+
+def _legacy_info(file_path: str, deck_size: int = DECK_SIZE) -> DeckFileInfo:
+    size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    return DeckFileInfo(1, deck_size, deck_size // 2, deck_size - deck_size // 2, deck_size, 0,
+                        size * 8 // deck_size, None, 0, 0, 0)
+
+def make_header(deck_len: int, n_red: int, n_black: int, stride_bits: int = None,
+                entropy: int = None, batch_size: int = 0, n_decks: int = 0,
+                next_stream: int = 0, flags: int = 0) -> DeckFileInfo:
+    """
+    Describe a new version 2 deck file. stride_bits defaults to deck_len rounded
+    up to whole bytes, so every deck record is byte-aligned and independently addressable.
+    """
+    if n_red + n_black != deck_len:
+        raise ValueError(f"{n_red} red + {n_black} black cards do not make a {deck_len}-card deck")
+    if stride_bits is None:
+        stride_bits = -(-deck_len // 8) * 8
+    if stride_bits % 8 or stride_bits < deck_len:
+        raise ValueError(f"stride must be a whole number of bytes >= deck length, got {stride_bits}")
+    if entropy is not None and not 0 <= entropy < 1 << 128:
+        raise ValueError("seed entropy must fit in 128 bits")
+    return DeckFileInfo(VERSION, deck_len, n_red, n_black, stride_bits, HEADER_SIZE,
+                        n_decks, entropy, batch_size, next_stream, flags)
+
+def write_header(f, info: DeckFileInfo):
+    """
+    Write (or rewrite, at offset 0) the version 2 header for info.
+    """
+    entropy = (info.entropy or 0).to_bytes(16, "little")
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, HEADER_SIZE, info.deck_len, info.n_red, info.n_black,
+                        info.stride_bits, info.flags, info.n_decks, entropy,
+                        info.batch_size, 0, info.next_stream))
+
+def read_header(file_path: str, deck_size: int = DECK_SIZE) -> DeckFileInfo:
+    """
+    Return a file's layout and metadata in O(1). Files without the version 2
+    magic are treated as legacy 52-bit streams sized from the file length.
+    """
+    if not os.path.exists(file_path):
+        return _legacy_info(file_path, deck_size)
+    with open(file_path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:8] != MAGIC:
+        return _legacy_info(file_path, deck_size)
+    (_, version, header_size, deck_len, n_red, n_black, stride_bits, flags,
+     n_decks, entropy, batch_size, _, next_stream) = HEADER.unpack(raw)
+    if version != VERSION:
+        raise ValueError(f"{file_path}: unsupported deck file version {version}")
+    return DeckFileInfo(version, deck_len, n_red, n_black, stride_bits, header_size,
+                        n_decks, int.from_bytes(entropy, "little"), batch_size, next_stream, flags)
+
+def data_size(info: DeckFileInfo) -> int:
+    """
+    Bytes of deck data (after the header) covered by info.n_decks.
+    """
+    return -(-info.n_decks * info.stride_bits // 8)
+
+def block_index_path(file_path: str) -> str:
+    return f"{file_path}.idx.npy"
+
+def read_block_index(file_path: str) -> np.ndarray:
+    """
+    Optional block index of a version 2 file: rows of (first deck, deck count,
+    seed stream id) for each generated block, so any block's decks and RNG
+    stream are found without scanning. Empty if the file has no index.
+    """
+    path = block_index_path(file_path)
+    if not (read_header(file_path).flags & FLAG_BLOCK_INDEX) or not os.path.exists(path):
+        return np.zeros((0, 3), dtype=np.int64)
+    return np.load(path)
+
+def deck_count(file_path: str, deck_size: int = DECK_SIZE) -> int:
+    """
+    Return the number of whole decks in a deck file: from the header for
+    version 2 files, from the file size for legacy files.
+    """
+    return read_header(file_path, deck_size).n_decks
+
+def deck_file_fingerprint(file_path: str, head_bytes: int = 1 << 16) -> str:
+    """
+    Identify a deck file by a hash of its first bytes: the header fields that
+    never change plus the first deck for version 2 files, the first head_bytes
+    of data for legacy files. Appending decks keeps the fingerprint, while a
+    regenerated or different file changes it.
+    """
+    info = read_header(file_path)
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        if info.version == 1:
+            h.update(f.read(head_bytes))
+        else:
+            h.update(repr((info.version, info.deck_len, info.n_red, info.n_black, info.stride_bits,
+                           info.entropy, info.batch_size)).encode())
+            f.seek(info.data_offset)
+            h.update(f.read(info.stride_bits // 8 if info.n_decks else 0))
+    return h.hexdigest()
+
+def _open_bytes(file_path: str) -> np.ndarray:
+    """
+    Memory-map a deck file as raw bytes (empty files cannot be mapped).
+    """
+    if os.path.getsize(file_path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(file_path, dtype=np.uint8, mode='r')
+
+def _first_bits(info: DeckFileInfo, start: int, stop: int) -> np.ndarray:
+    return info.data_offset * 8 + np.arange(start, stop, dtype=np.int64) * info.stride_bits
+
+def _unpack_range(data: np.ndarray, info: DeckFileInfo, start: int, stop: int) -> np.ndarray:
+    """
+    Unpack decks [start, stop) from an already-mapped byte buffer.
+    """
+    deck_len = info.deck_len
+    first_bit = info.data_offset * 8 + start * info.stride_bits
+    n_bits = (stop - start) * info.stride_bits
+    first_byte = first_bit // 8
+    last_byte = -(-(first_bit + n_bits) // 8)
+    bits = np.unpackbits(data[first_byte:last_byte])
+    offset = first_bit - first_byte * 8
+    bits = bits[offset:offset + n_bits].reshape((stop - start, info.stride_bits))
+    return np.ascontiguousarray(bits[:, :deck_len])
+
+def _pack_range(data: np.ndarray, info: DeckFileInfo, start: int, stop: int) -> np.ndarray:
+    """
+    Load decks [start, stop) from a mapped byte buffer as one int64 word each,
+    first card in bit deck_len - 1. Never expands cards to bytes.
+    """
+    deck_len = info.deck_len
+    first_bits = _first_bits(info, start, stop)
+    first_bytes = first_bits // 8
+    shifts = first_bits - first_bytes * 8
+    lo = int(first_bytes[0])
+    hi = min(int(first_bytes[-1]) + 8, data.size)
+    window = np.zeros(int(first_bytes[-1]) + 8 - lo, dtype=np.uint8)
+    window[:hi - lo] = data[lo:hi]
+    gather = (first_bytes - lo)[:, None] + np.arange(8)
+    words = window[gather].view('>u8').ravel().astype(np.uint64)
+    words >>= (64 - deck_len - shifts).astype(np.uint64)
+    words &= np.uint64((1 << deck_len) - 1)
+    return words.astype(np.int64)
+
+def _check_range(start: int):
+    if start < 0:
+        raise ValueError(f"start must be non-negative, got {start}")
+
+def _check_packable(info: DeckFileInfo):
+    if info.deck_len > 56:
+        raise ValueError(f"packed decks must be at most 56 cards, got {info.deck_len}")
+
+def read_deck_range(file_path: str, start: int, stop: int, deck_size: int = DECK_SIZE) -> np.ndarray:
+    """
+    Read decks [start, stop) from a deck file, returning shape (n, deck_len) uint8.
+    Only the bytes covering the range are touched. deck_size applies to legacy files only.
+    """
+    _check_range(start)
+    info = read_header(file_path, deck_size)
+    stop = min(stop, info.n_decks)
+    if stop <= start:
+        return np.zeros((0, info.deck_len), dtype=np.uint8)
+    return _unpack_range(_open_bytes(file_path), info, start, stop)
+
+def read_packed_range(file_path: str, start: int, stop: int, deck_size: int = DECK_SIZE) -> np.ndarray:
+    """
+    Read decks [start, stop) as int64 words (first card in the highest used bit).
+    """
+    _check_range(start)
+    info = read_header(file_path, deck_size)
+    _check_packable(info)
+    stop = min(stop, info.n_decks)
+    if stop <= start:
+        return np.zeros(0, dtype=np.int64)
+    return _pack_range(_open_bytes(file_path), info, start, stop)
+
+def iter_deck_chunks(file_path: str, start: int = 0, stop: int = None,
+                     chunk_size: int = 50_000, deck_size: int = DECK_SIZE, packed: bool = False):
+    """
+    Yield (first_deck_index, decks) for fixed-size chunks of decks [start, stop).
+    The file is mapped once and each chunk is unpacked from that map; with
+    packed=True each chunk is an int64 word per deck instead of a byte per card.
+    """
+    _check_range(start)
+    info = read_header(file_path, deck_size)
+    if packed:
+        _check_packable(info)
+    stop = info.n_decks if stop is None else min(stop, info.n_decks)
+    if stop <= start:
+        return
+    data = _open_bytes(file_path)
+    for lo in range(start, stop, chunk_size):
+        hi = min(lo + chunk_size, stop)
+        if packed:
+            yield lo, _pack_range(data, info, lo, hi)
+        else:
+            yield lo, _unpack_range(data, info, lo, hi)
+
+def pack_records(decks: np.ndarray, stride_bits: int) -> bytes:
+    """
+    Pack a (n, deck_len) 0/1 block into byte-aligned records of stride_bits each.
+    """
+    n, deck_len = decks.shape
+    if stride_bits != deck_len:
+        padded = np.zeros((n, stride_bits), dtype=np.uint8)
+        padded[:, :deck_len] = decks
+        decks = padded
+    return np.packbits(decks, axis=1).tobytes()
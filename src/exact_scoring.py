@@ -0,0 +1,131 @@
+import numpy as np
+import numba as nb
+from src.score_data import (
+    all_sequences_binary_order,
+    build_transition_tables,
+    winrate_tables,
+    _pattern_matrix,
+    _seq_to_array,
+)
+
+@nb.njit(cache=True)
+def _trick_counts(table: np.ndarray, n_red: int, n_black: int):
+    """
+    Count card strings played from a fresh start (state 0) of one pair automaton.
+
+    first[w, i, j]: strings of i red and j black cards whose last card completes
+    the first trick, won by player w + 1.
+    open_[i, j]: strings of i red and j black cards that complete no trick.
+    """
+    n_states = table.shape[0]
+    cnt = np.zeros((n_red + 1, n_black + 1, n_states))
+    first = np.zeros((2, n_red + 1, n_black + 1))
+    open_ = np.zeros((n_red + 1, n_black + 1))
+    cnt[0, 0, 0] = 1.0
+    for total in range(n_red + n_black + 1):
+        for i in range(max(0, total - n_black), min(n_red, total) + 1):
+            j = total - i
+            for q in range(n_states):
+                c = cnt[i, j, q]
+                if c == 0.0:
+                    continue
+                open_[i, j] += c
+                for card in range(2):
+                    ni = i + card
+                    nj = j + 1 - card
+                    if ni > n_red or nj > n_black:
+                        continue
+                    nxt = table[q, card]
+                    if nxt < 0:
+                        first[-nxt - 1, ni, nj] += c
+                    else:
+                        cnt[ni, nj, nxt] += c
+    return first, open_
+
+@nb.njit(cache=True)
+def _pair_outcome_counts(table: np.ndarray, n_red: int, n_black: int, k: int) -> np.ndarray:
+    """
+    Exact number of decks (out of C(n_red + n_black, n_red)) where player 1 wins,
+    player 2 wins or they tie, by cards then by tricks, for one pattern pair.
+
+    Every deck ordering is equally likely, so the game is a renewal process:
+    after each trick the automaton restarts, and the next trick only depends
+    on how many red/black cards it uses. The DP runs over the reset points
+    (reds used, blacks used) carrying player 1's cards or the trick difference.
+    """
+    first, open_ = _trick_counts(table, n_red, n_black)
+    n_cards = n_red + n_black
+    max_tricks = n_cards // k
+    # cards[i, j, x]: decks prefixes ending on a trick at (i, j) with player 1 holding x cards
+    cards = np.zeros((n_red + 1, n_black + 1, n_cards + 1))
+    # tricks[i, j, t]: same, with trick difference t - max_tricks
+    tricks = np.zeros((n_red + 1, n_black + 1, 2 * max_tricks + 1))
+    cards[0, 0, 0] = 1.0
+    tricks[0, 0, max_tricks] = 1.0
+    out = np.zeros(6)
+    for total in range(n_cards + 1):
+        for i in range(max(0, total - n_black), min(n_red, total) + 1):
+            j = total - i
+            rest = open_[n_red - i, n_black - j]
+            for x in range(total + 1):
+                c = cards[i, j, x]
+                if c == 0.0:
+                    continue
+                # No further trick: the remaining cards stay unawarded
+                diff = 2 * x - total
+                out[0 if diff > 0 else 1 if diff < 0 else 2] += c * rest
+                for di in range(n_red - i + 1):
+                    for dj in range(n_black - j + 1):
+                        if di + dj < k:
+                            continue
+                        cards[i + di, j + dj, x + di + dj] += c * first[0, di, dj]
+                        cards[i + di, j + dj, x] += c * first[1, di, dj]
+            for t in range(2 * max_tricks + 1):
+                c = tricks[i, j, t]
+                if c == 0.0:
+                    continue
+                diff = t - max_tricks
+                out[3 if diff > 0 else 4 if diff < 0 else 5] += c * rest
+                for di in range(n_red - i + 1):
+                    for dj in range(n_black - j + 1):
+                        if di + dj < k:
+                            continue
+                        tricks[i + di, j + dj, t + 1] += c * first[0, di, dj]
+                        tricks[i + di, j + dj, t - 1] += c * first[1, di, dj]
+    return out
+
+@nb.njit(parallel=True, cache=True)
+def _all_pair_outcome_counts(tables: np.ndarray, n_red: int, n_black: int, k: int) -> np.ndarray:
+    """
+    Exact outcome counts for every ordered pair, shape (6, n, n).
+    """
+    nseq = tables.shape[0]
+    out = np.zeros((6, nseq, nseq))
+    for idx in nb.prange(nseq * nseq):
+        i = idx // nseq
+        j = idx % nseq
+        if i == j:
+            continue
+        out[:, i, j] = _pair_outcome_counts(tables[i, j], n_red, n_black, k)
+    return out
+
+def exact_outcome_probabilities(k: int = 3, n_red: int = 26, n_black: int = 26):
+    """
+    Exact P1 win / P2 win / tie probabilities for every ordered pattern pair.
+    Returns (cards, tricks, seqs) with cards and tricks shaped (3, n, n):
+    P1 win, P2 win, tie. Diagonal entries are zero.
+    """
+    seqs = all_sequences_binary_order(k)
+    patterns = _pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs})
+    counts = _all_pair_outcome_counts(build_transition_tables(patterns), n_red, n_black, k)
+    total = counts[:3].sum(axis=0)
+    probs = np.divide(counts, total, out=np.zeros_like(counts), where=total > 0)
+    return probs[:3], probs[3:], seqs
+
+def compute_winrate_table_exact(k: int = 3, n_red: int = 26, n_black: int = 26):
+    """
+    Exact counterpart of compute_winrate_table_incremental: returns the same
+    DataFrames and percentage matrices (for plot_heatmap), with no sampling noise.
+    """
+    cards, tricks, seqs = exact_outcome_probabilities(k, n_red, n_black)
+    return winrate_tables(cards, tricks, seqs)
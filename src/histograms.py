@@ -0,0 +1,88 @@
+import os
+import numpy as np
+from src.checkpoint import atomic_save_npy
+
+def empty_histograms(nseq: int, n_cards: int, k: int):
+    """
+    Zeroed (card_hist, trick_hist) accumulators for nseq patterns:
+    card_hist[i, j, d] counts games where p1 - p2 cards = d - n_cards, and
+    trick_hist[i, j, t1, t2] counts games where p1 took t1 and p2 t2 tricks.
+    """
+    n_tricks = n_cards // k + 1
+    return (np.zeros((nseq, nseq, 2 * n_cards + 1), dtype=np.int64),
+            np.zeros((nseq, nseq, n_tricks, n_tricks), dtype=np.int64))
+
+def _compact(hist):
+    """
+    int32 when every bin fits (any run under 2**31 decks), int64 otherwise.
+    """
+    return hist.astype(np.int32) if hist.max(initial=0) < 2 ** 31 else hist
+
+def save_histograms(card_hist_file: str, trick_hist_file: str, card_hist, trick_hist):
+    """
+    Atomically save both histograms next to the count matrices.
+    """
+    atomic_save_npy(card_hist_file, _compact(card_hist))
+    atomic_save_npy(trick_hist_file, _compact(trick_hist))
+
+def load_histograms(card_hist_file: str, trick_hist_file: str):
+    """
+    Load (card_hist, trick_hist) as int64, or None if either file is missing.
+    """
+    if not (os.path.exists(card_hist_file) and os.path.exists(trick_hist_file)):
+        return None
+    return np.load(card_hist_file).astype(np.int64), np.load(trick_hist_file).astype(np.int64)
+
+def card_diff_values(card_hist) -> np.ndarray:
+    """
+    Card difference (p1 - p2) represented by each bin of card_hist.
+    """
+    n_cards = (card_hist.shape[-1] - 1) // 2
+    return np.arange(-n_cards, n_cards + 1)
+
+def _quantile(hist, values, q):
+    """
+    Lower q-quantile of the distribution in the last axis of hist.
+    """
+    cdf = np.cumsum(hist, axis=-1)
+    total = cdf[..., -1:]
+    idx = np.argmax(cdf >= q * np.maximum(total, 1), axis=-1)
+    return np.where(total[..., 0] > 0, values[idx], np.nan)
+
+def histogram_summary(card_hist, trick_hist, seqs):
+    """
+    Per ordered pair summary statistics computed from the histograms alone:
+    card difference mean, standard deviation and quartiles, each player's mean
+    tricks and the standard deviation of the trick difference.
+    Returns a long-format DataFrame with one row per off-diagonal pair.
+    """
+    import pandas as pd
+    card_hist = np.asarray(card_hist, dtype=np.float64)
+    trick_hist = np.asarray(trick_hist, dtype=np.float64)
+    values = card_diff_values(card_hist)
+    games = card_hist.sum(axis=-1)
+    safe = np.maximum(games, 1)
+    mean = (card_hist * values).sum(axis=-1) / safe
+    var = (card_hist * values ** 2).sum(axis=-1) / safe - mean ** 2
+    tricks = np.arange(trick_hist.shape[-1])
+    p1_tricks = (trick_hist.sum(axis=-1) * tricks).sum(axis=-1) / safe
+    p2_tricks = (trick_hist.sum(axis=-2) * tricks).sum(axis=-1) / safe
+    diff = tricks[:, None] - tricks[None, :]
+    trick_mean = (trick_hist * diff).sum(axis=(-2, -1)) / safe
+    trick_var = (trick_hist * diff ** 2).sum(axis=(-2, -1)) / safe - trick_mean ** 2
+
+    n = len(seqs)
+    i, j = np.nonzero(~np.eye(n, dtype=bool))
+    return pd.DataFrame({
+        "Player 1 pattern": np.asarray(seqs)[i],
+        "Player 2 pattern": np.asarray(seqs)[j],
+        "Games": games[i, j].astype(np.int64),
+        "Mean card diff": mean[i, j],
+        "Std card diff": np.sqrt(np.maximum(var[i, j], 0)),
+        "Q1 card diff": _quantile(card_hist, values, 0.25)[i, j],
+        "Median card diff": _quantile(card_hist, values, 0.5)[i, j],
+        "Q3 card diff": _quantile(card_hist, values, 0.75)[i, j],
+        "Mean P1 tricks": p1_tricks[i, j],
+        "Mean P2 tricks": p2_tricks[i, j],
+        "Std trick diff": np.sqrt(np.maximum(trick_var[i, j], 0)),
+    })
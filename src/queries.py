@@ -0,0 +1,195 @@
+import os
+from functools import lru_cache
+from collections import namedtuple
+import numpy as np
+from src.score_data import (
+    all_sequences_binary_order,
+    _pair_transition_table,
+    _pattern_codes,
+    _pattern_matrix,
+    _seq_to_array,
+)
+from src.exact_scoring import _pair_outcome_counts
+
+PairOutcome = namedtuple("PairOutcome", ["p1_win", "p2_win", "tie", "games"])
+BestResponse = namedtuple("BestResponse", ["pattern", "p1_win", "edge"])
+MixedStrategy = namedtuple("MixedStrategy", ["strategy", "value", "gap", "iterations"])
+
+class WinRateQuery:
+    """
+    Numeric win-rate lookups and best-response queries for player 1 choosing a
+    pattern against player 2's, under each scoring ("cards", "tricks" and any
+    extra variant whose counts are loaded).
+
+    Outcomes come either from count matrices (3, n, n) of p1 wins, p2 wins and
+    ties, as saved by compute_winrate_table_incremental, or, with exact(), from
+    the exact dynamic program evaluated one pair at a time, so pattern lengths
+    whose full matrix would be too large to build are still queryable.
+    Evaluated pairs are kept in an LRU cache of cache_size entries.
+    """
+
+    # Pairs an on-demand query will evaluate to build a whole matrix
+    max_materialise_pairs = 4096
+
+    def __init__(self, counts: dict, seqs, cache_size: int = 4096):
+        self.seqs = list(seqs)
+        self._index = {s: i for i, s in enumerate(self.seqs)}
+        self._exact = None
+        if counts is None:
+            self.scorings = ["cards", "tricks"]
+            self._counts = None
+        else:
+            self.scorings = list(counts)
+            self._counts = np.stack([np.asarray(c, dtype=np.float64) for c in counts.values()])
+        self._outcomes = lru_cache(maxsize=cache_size)(self._evaluate)
+
+    @classmethod
+    def from_counts_files(cls, counts_cards_file: str = "data/tracking_decks/counts_cards.npy",
+                          counts_tricks_file: str = "data/tracking_decks/counts_tricks.npy",
+                          variants=(), cache_size: int = 4096):
+        """
+        Load the saved count matrices (and counts_<variant>.npy for each named
+        variant, from the same directory). Patterns are in binary order.
+        """
+        counts = {"cards": np.load(counts_cards_file), "tricks": np.load(counts_tricks_file)}
+        for name in variants:
+            counts[name] = np.load(os.path.join(os.path.dirname(counts_cards_file), f"counts_{name}.npy"))
+        k = int(np.log2(counts["cards"].shape[-1]))
+        return cls(counts, all_sequences_binary_order(k), cache_size)
+
+    @classmethod
+    def exact(cls, k: int, n_red: int = 26, n_black: int = 26, cache_size: int = 4096):
+        """
+        Query exact probabilities, computing each pair only when first asked for.
+        """
+        seqs = all_sequences_binary_order(k)
+        query = cls(None, seqs, cache_size)
+        codes = _pattern_codes(_pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs}))
+        query._exact = (k, n_red, n_black, codes)
+        return query
+
+    def _evaluate(self, i: int, j: int) -> np.ndarray:
+        """
+        (n_scorings, 3) p1 win / p2 win / tie counts for one ordered pair.
+        """
+        if self._counts is not None:
+            return self._counts[:, :, i, j]
+        k, n_red, n_black, codes = self._exact
+        table = _pair_transition_table(codes[i], codes[j], k)
+        return _pair_outcome_counts(table, n_red, n_black, k).reshape(2, 3)
+
+    def cache_info(self):
+        return self._outcomes.cache_info()
+
+    def _pattern_index(self, pattern) -> int:
+        if isinstance(pattern, (int, np.integer)):
+            if not 0 <= pattern < len(self.seqs):
+                raise ValueError(f"pattern index {pattern} out of range for {len(self.seqs)} patterns")
+            return int(pattern)
+        try:
+            return self._index[pattern.lower()]
+        except KeyError:
+            raise ValueError(f"unknown pattern {pattern!r}") from None
+
+    def _scoring_index(self, scoring: str) -> int:
+        if scoring not in self.scorings:
+            raise ValueError(f"unknown scoring {scoring!r}; available: {', '.join(self.scorings)}")
+        return self.scorings.index(scoring)
+
+    def pair(self, p1, p2, scoring: str = "cards") -> PairOutcome:
+        """
+        Probabilities of a player 1 win, player 2 win and tie for p1 against p2
+        (patterns as strings like "rbr" or indices), and the games behind them.
+        """
+        i, j = self._pattern_index(p1), self._pattern_index(p2)
+        if i == j:
+            raise ValueError("a pattern does not play itself")
+        wins = self._outcomes(i, j)[self._scoring_index(scoring)]
+        games = wins.sum()
+        p1_win, p2_win, tie = wins / games if games > 0 else (np.nan, np.nan, np.nan)
+        return PairOutcome(float(p1_win), float(p2_win), float(tie), float(games))
+
+    def best_response(self, opponent, scoring: str = "cards") -> BestResponse:
+        """
+        Player 1's pattern with the highest win probability against player 2's
+        opponent pattern, with that probability and its edge (p1 win - p2 win).
+        """
+        j = self._pattern_index(opponent)
+        best = None
+        for i in range(len(self.seqs)):
+            if i == j:
+                continue
+            outcome = self.pair(i, j, scoring)
+            if best is None or outcome.p1_win > best.p1_win:
+                best = BestResponse(self.seqs[i], outcome.p1_win, outcome.p1_win - outcome.p2_win)
+        return best
+
+    def dominance_chain(self, start, scoring: str = "cards") -> list:
+        """
+        Follow best responses from start (start, its best response, that
+        pattern's best response, ...) until a pattern repeats; the returned
+        list ends with the first repeated pattern, closing the cycle.
+        """
+        chain = [self.seqs[self._pattern_index(start)]]
+        while True:
+            nxt = self.best_response(chain[-1], scoring).pattern
+            chain.append(nxt)
+            if nxt in chain[:-1]:
+                return chain
+
+    def matrix(self, scoring: str = "cards") -> np.ndarray:
+        """
+        (3, n, n) probabilities of p1 win, p2 win and tie for every ordered
+        pair (zero on the diagonal). On-demand queries refuse to build matrices
+        of more than max_materialise_pairs pairs.
+        """
+        s = self._scoring_index(scoring)
+        n = len(self.seqs)
+        if self._counts is None and n * (n - 1) > self.max_materialise_pairs:
+            raise ValueError(f"{n * (n - 1):,} pairs is too many to evaluate; query pairs individually")
+        if self._counts is not None:
+            counts = self._counts[s]
+        else:
+            counts = np.zeros((3, n, n))
+            for i in range(n):
+                for j in range(n):
+                    if i != j:
+                        counts[:, i, j] = self._outcomes(i, j)[s]
+        total = counts.sum(axis=0)
+        return np.divide(counts, total, out=np.zeros_like(counts), where=total > 0)
+
+    def minimax(self, scoring: str = "cards", tol: float = 1e-6, max_iter: int = 100_000) -> MixedStrategy:
+        """
+        Optimal mixed strategy for choosing a pattern when the payoff of
+        playing pattern i against pattern j is p1_win(i, j) - p2_win(i, j) and
+        equal patterns draw. Solved by regret matching+ with linearly weighted
+        averages until the strategy's exploitability gap is below tol.
+        Returns (strategy, value, gap, iterations); strategy maps each pattern
+        played with probability above tol to that probability.
+        """
+        probs = self.matrix(scoring)
+        payoff = probs[0] - probs[1]
+        n = payoff.shape[0]
+        regret_row = np.zeros(n)
+        regret_col = np.zeros(n)
+        avg_row = np.zeros(n)
+        avg_col = np.zeros(n)
+        gap = np.inf
+        it = 0
+        while it < max_iter and gap > tol:
+            it += 1
+            x = regret_row / regret_row.sum() if regret_row.sum() > 0 else np.full(n, 1 / n)
+            y = regret_col / regret_col.sum() if regret_col.sum() > 0 else np.full(n, 1 / n)
+            row_values = payoff @ y
+            col_values = x @ payoff
+            regret_row = np.maximum(regret_row + row_values - x @ row_values, 0)
+            regret_col = np.maximum(regret_col - col_values + x @ payoff @ y, 0)
+            avg_row += it * x
+            avg_col += it * y
+            if it % 10 == 0 or it == max_iter:
+                xs, ys = avg_row / avg_row.sum(), avg_col / avg_col.sum()
+                gap = float((payoff @ ys).max() - (xs @ payoff).min())
+        xs = avg_row / avg_row.sum()
+        value = float((xs @ payoff).min())
+        strategy = {s: float(p) for s, p in zip(self.seqs, xs) if p > tol}
+        return MixedStrategy(strategy, value, gap, it)
@@ -1,67 +1,107 @@
 import os
-import re
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import glob
-from matplotlib.patches import Rectangle
-from bitarray import bitarray
-from src.create_data import create_deck_data_bitarray, _create_bitarray_batch
-from src.score_data import compute_winrate_table_incremental
+from src.create_data import (
+    create_deck_file,
+    append_deck_file,
+    write_pipelined,
+    _create_packed_batch,
+    batch_seeds,
+    split_batches,
+)
+from src.score_data import (
+    compute_winrate_table_incremental,
+    compute_winrate_table_streaming,
+    compute_winrate_table_adaptive,
+)
+from src.deck_file import deck_count, read_header
+from src.exact_scoring import compute_winrate_table_exact
+from src.tournament import compute_tournament_tables
+from src.sweep import run_sweep, sweep_configs
+from src.histograms import histogram_summary, load_histograms
+from src.variants import VARIANTS
+from src.build_cache import BuildCache, input_digest
+from src.utils import Tracer
 
 DECKS_DIR = "data/decks"
+DECK_FILE = os.path.join(DECKS_DIR, "decks.bin")
+TRACES_DIR = "data/traces"
+KEEP_TRACES = 20
+BUILD_MANIFEST = "data/build_manifest.json"
 TARGET_DECKS = 5_000_000
 BATCH_SIZE = 50_000
 
-os.makedirs("data", exist_ok=True)
-os.makedirs("data/tables", exist_ok=True)
-os.makedirs("data/plots", exist_ok=True)
-os.makedirs(DECKS_DIR, exist_ok=True)
+
+def ensure_output_dirs():
+    """
+    Create the data directories the pipeline writes to (not done at import,
+    so importing this module for scoring alone has no side effects).
+    """
+    for d in ("data", "data/tables", "data/plots", "data/tracking_decks", DECKS_DIR):
+        os.makedirs(d, exist_ok=True)
+
+
+def _stage(tracer, name, n_decks=None):
+    """
+    tracer.stage(...) when tracing, otherwise a no-op context.
+    """
+    return tracer.stage(name, n_decks=n_decks) if tracer is not None else nullcontext()
+
+
+def export_trace(tracer, keep: int = KEEP_TRACES):
+    """
+    Write a tracer's JSON and CSV exports to TRACES_DIR, named by timestamp,
+    and delete all but the latest keep traces so scheduled runs do not fill the disk.
+    """
+    os.makedirs(TRACES_DIR, exist_ok=True)
+    stem = os.path.join(TRACES_DIR, f"trace_{time.strftime('%Y%m%d_%H%M%S')}")
+    tracer.to_json(f"{stem}.json")
+    tracer.to_csv(f"{stem}.csv")
+    print(f"Saved trace: {stem}.json, {stem}.csv")
+    stems = sorted({os.path.splitext(f)[0] for f in os.listdir(TRACES_DIR)
+                    if f.startswith("trace_") and f.endswith((".json", ".csv"))})
+    for old in stems[:-keep] if keep else []:
+        for ext in (".json", ".csv"):
+            if os.path.exists(os.path.join(TRACES_DIR, old + ext)):
+                os.remove(os.path.join(TRACES_DIR, old + ext))
 
 def find_deck_file():
     """
-    Find the deck file with highest deck count in DECKS_DIR, following naming pattern.
+    Find the deck file (decks*.bin) with highest deck count in DECKS_DIR.
+    Counts come from each file's header (or size, for legacy files), not its name.
     Returns tuple: (path, count)
     """
-    files = [f for f in os.listdir(DECKS_DIR) if re.match(r"decks_\d+\.bin", f)]
+    if not os.path.isdir(DECKS_DIR):
+        return None, 0
+    files = [os.path.join(DECKS_DIR, f) for f in os.listdir(DECKS_DIR)
+             if f.startswith("decks") and f.endswith(".bin")]
     if not files:
         return None, 0
-    counts = [(f, int(re.search(r"decks_(\d+)\.bin", f).group(1))) for f in files]
-    best = max(counts, key=lambda x: x[1])
-    return os.path.join(DECKS_DIR, best[0]), best[1]
-
-def rename_deck_file(old_path, new_count):
-    """
-    Rename deck file to reflect new deck count.
-    """
-    new_name = f"decks_{new_count}.bin"
-    new_path = os.path.join(DECKS_DIR, new_name)
-    if old_path != new_path:
-        os.rename(old_path, new_path)
-    return new_path
+    best = max(files, key=deck_count)
+    return best, deck_count(best)
 
 def file_deck_count(file_path: str) -> int:
     """
-    Return the number of decks in a given file by total bits divided by 52.
+    Return the number of decks in a given file, read from its header.
     """
-    if not os.path.exists(file_path):
-        return 0
-    ba = bitarray()
-    with open(file_path, "rb") as f:
-        ba.fromfile(f)
-    return len(ba) // 52
+    return deck_count(file_path)
 
-def append_decks(file_path: str, num_to_add: int, batch_size: int = 10_000):
+def append_decks(file_path: str, num_to_add: int, batch_size: int = 10_000, seed=None):
     """
-    Append new randomly-generated decks to an existing deck file.
+    Append new randomly-generated decks to an existing deck file. Version 2
+    files continue their own seed stream and update their header; legacy files
+    get decks from `seed`.
     """
+    if read_header(file_path).version >= 2:
+        append_deck_file(file_path, num_to_add)
+        return
+    batches = split_batches(num_to_add, batch_size)
     with open(file_path, "ab") as f:
-        batches = [batch_size] * (num_to_add // batch_size)
-        if num_to_add % batch_size:
-            batches.append(num_to_add % batch_size)
-        for b in batches:
-            ba = _create_bitarray_batch(b)
-            ba.tofile(f)
+        write_pipelined(f, _create_packed_batch, zip(batch_seeds(seed, len(batches)), batches))
 
 
 def plot_heatmap(p1_pct_matrix, tie_pct_matrix, seqs, title, outpath, highlight_best=True):
@@ -69,6 +109,10 @@ def plot_heatmap(p1_pct_matrix, tie_pct_matrix, seqs, title, outpath, highlight_
     Create a heatmap showing win/draw probabilities, coloring by win likelihood.
     Highlight row-best (highest win probability) cell with black box.
     """
+    # Plotting libraries are slow to import; load them only when a plot is drawn
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.patches import Rectangle
     arr = np.nan_to_num(p1_pct_matrix, nan=0).astype(int).T
     tie_arr = np.nan_to_num(tie_pct_matrix, nan=0).astype(int).T
     n = arr.shape[0]
@@ -112,72 +156,247 @@ def plot_heatmap(p1_pct_matrix, tie_pct_matrix, seqs, title, outpath, highlight_
     plt.close()
 
 
-def run_scoring_and_plots(deck_file, limit_to_target=True, decks_to_use=None):
+def _plot_job(args):
+    plot_heatmap(*args)
+    return args[-1]
+
+
+def render_heatmaps(jobs, workers=None):
+    """
+    Draw plot_heatmap(*args) for each args in jobs. Several figures are drawn
+    in parallel spawned processes (matplotlib is not fork- or thread-safe);
+    a single figure, or workers=1, is drawn in this process.
+    """
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for args in jobs:
+            _plot_job(args)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+        list(ex.map(_plot_job, jobs))
+
+
+def build_outputs(csvs, plots, group=None, force=False, render_workers=None, tracer=None):
+    """
+    Bring CSVs and heatmaps up to date through the build cache (BUILD_MANIFEST).
+    csvs are (path, digest, df, index) with df a DataFrame or a function
+    returning one; plots are (digest, plot_heatmap args ending in the output
+    path). Only outputs that are missing or whose digest changed are written,
+    and stale heatmaps are rendered together by render_heatmaps. With group,
+    outputs recorded under that group but no longer produced are deleted.
+    Returns the paths written.
+    """
+    ensure_output_dirs()
+    cache = BuildCache(BUILD_MANIFEST)
+    written = []
+    with _stage(tracer, "save_csv"):
+        for path, digest, df, index in csvs:
+            if force or not cache.is_fresh(path, digest):
+                (df() if callable(df) else df).to_csv(path, index=index)
+                cache.record(path, digest, group or "")
+                written.append(path)
+    jobs = [(digest, args) for digest, args in plots if force or not cache.is_fresh(args[-1], digest)]
+    if jobs:
+        with _stage(tracer, "plot"):
+            render_heatmaps([args for _, args in jobs], render_workers)
+    for digest, args in jobs:
+        cache.record(args[-1], digest, group or "")
+        written.append(args[-1])
+    if group is not None:
+        for path in cache.prune(group, [c[0] for c in csvs] + [args[-1] for _, args in plots]):
+            print(f"Removed old output {path}")
+    cache.save()
+    return written
+
+
+def _winrate_outputs(name, title, p1_pct, tie_pct, seqs, stem, label):
+    """
+    The (csv, plot) entries for one win-rate table, keyed on its matrices.
+    """
+    seqs = list(seqs)
+    title = f"Player 1 Win % by {title} ({label})"
+    csv_entry = (f"data/tables/winrates_{name}_{stem}.csv",
+                 input_digest(p1_pct, tie_pct, seqs=seqs, output="winrates_csv"))
+    plot_entry = (input_digest(p1_pct, tie_pct, seqs=seqs, title=title, output="heatmap"),
+                  (p1_pct, tie_pct, seqs, title, f"data/plots/heatmap_{name}_{stem}.png"))
+    return csv_entry, plot_entry
+
+
+def run_scoring_and_plots(deck_file, limit_to_target=True, decks_to_use=None, tracer=None, histograms=False,
+                          variants=(), symmetry=None, k=3, force=False, render_workers=None):
     """
     Run scoring and plot heatmaps for both scoring methods (cards, tricks).
     Save results as CSVs and plots in expected locations.
+    Pass a utils.Tracer to time the scoring, CSV and plot stages.
+    With histograms=True the outcome histograms are kept alongside the counts
+    and summarised in data/tables/outcome_summary_n{N}.csv.
+    variants names extra registered scoring variants (src.variants) scored in
+    the same pass, each saved as its own CSV and heatmap. symmetry ("swap" or
+    "complement") scores only canonical pattern pairs, checked against full
+    scoring on the first decks first (see compute_winrate_table_incremental).
+    Only the first decks_to_use decks are scored; the deck length and
+    composition come from the file header.
+    Outputs go through the build cache: CSVs and heatmaps whose results did
+    not change are left alone (force=True rewrites them), and outputs from
+    earlier runs with another deck count are removed.
     """
     total_decks = file_deck_count(deck_file)
     if decks_to_use is None:
         decks_to_use = min(total_decks, TARGET_DECKS) if limit_to_target else total_decks
     print(f"\nScoring using n = {decks_to_use:,} decks...")
-    deck_file_path, _ = find_deck_file()
-    cards_df, tricks_df, cards_pct_p1, cards_pct_tie, tricks_pct_p1, tricks_pct_tie, seqs = compute_winrate_table_incremental(
-        deck_file_path,
-        k=3,
-        counts_cards_file="data/tracking_decks/counts_cards.npy",
-        counts_tricks_file="data/tracking_decks/counts_tricks.npy",
-        last_n_file="data/tracking_decks/last_n.txt"
-    )
+    with _stage(tracer, "score"):
+        results = compute_winrate_table_incremental(
+            deck_file,
+            k=k,
+            max_decks=decks_to_use,
+            counts_cards_file="data/tracking_decks/counts_cards.npy",
+            counts_tricks_file="data/tracking_decks/counts_tricks.npy",
+            last_n_file="data/tracking_decks/last_n.txt",
+            histograms=histograms,
+            variants=variants,
+            symmetry=symmetry,
+            verify_decks=1_000 if symmetry else 0,
+            tracer=tracer,
+        )
+    cards_df, tricks_df, cards_pct_p1, cards_pct_tie, tricks_pct_p1, tricks_pct_tie, seqs = results[:7]
 
-    csv_cards = f"data/tables/winrates_cards_n{decks_to_use}.csv"
-    csv_tricks = f"data/tables/winrates_tricks_n{decks_to_use}.csv"
-    cards_df.to_csv(csv_cards)
-    tricks_df.to_csv(csv_tricks)
-    print(f"Saved CSVs: {csv_cards}, {csv_tricks}")
-    plot_heatmap(cards_pct_p1, cards_pct_tie, seqs,
-                 f"Player 1 Win % by Cards (n={decks_to_use:,})",
-                 f"data/plots/heatmap_cards_n{decks_to_use}.png")
-    plot_heatmap(tricks_pct_p1, tricks_pct_tie, seqs,
-                 f"Player 1 Win % by Tricks (n={decks_to_use:,})",
-                 f"data/plots/heatmap_tricks_n{decks_to_use}.png")
-    print("Saved updated heatmaps.")
+    save_outputs(cards_df, tricks_df, cards_pct_p1, cards_pct_tie, tricks_pct_p1, tricks_pct_tie, seqs,
+                 decks_to_use, tracer=tracer, group="main", force=force, render_workers=render_workers)
+    save_variant_outputs(results[7] if len(results) > 7 else {}, seqs, decks_to_use, tracer=tracer,
+                         force=force, render_workers=render_workers)
+    summary = []
+    if histograms:
+        hists = load_histograms("data/tracking_decks/hist_card_diff.npy", "data/tracking_decks/hist_tricks.npy")
+        summary.append((f"data/tables/outcome_summary_n{decks_to_use}.csv",
+                        input_digest(*hists, seqs=list(seqs), output="outcome_summary"),
+                        lambda: histogram_summary(*hists, seqs), False))
+    build_outputs(summary, [], group="summary", force=force)
 
 
-def delete_old_outputs(decks_to_use):
+def save_outputs(cards_df, tricks_df, cards_pct_p1, cards_pct_tie, tricks_pct_p1, tricks_pct_tie, seqs,
+                 decks_to_use, tag="", tracer=None, group=None, force=False, render_workers=None):
     """
-    Delete old CSVs and plots not matching the current decks_to_use value.
-    Ensures only current outputs remain.
+    Save win-rate CSVs and heatmaps for one scoring result.
+    A non-empty tag is added to the file names (e.g. "stream" -> winrates_cards_stream_n...).
+    decks_to_use=None marks exact results, named by tag alone and titled "exact".
+    Files already rendered from the same results are skipped (see build_outputs).
     """
-    for f in glob.glob("data/tables/winrates_cards_n*.csv"):
-        if f != f"data/tables/winrates_cards_n{decks_to_use}.csv":
-            os.remove(f)
-    for f in glob.glob("data/tables/winrates_tricks_n*.csv"):
-        if f != f"data/tables/winrates_tricks_n{decks_to_use}.csv":
-            os.remove(f)
-    for f in glob.glob("data/plots/heatmap_cards_n*.png"):
-        if f != f"data/plots/heatmap_cards_n{decks_to_use}.png":
-            os.remove(f)
-    for f in glob.glob("data/plots/heatmap_tricks_n*.png"):
-        if f != f"data/plots/heatmap_tricks_n{decks_to_use}.png":
-            os.remove(f)
+    parts = ([tag] if tag else []) + ([f"n{decks_to_use}"] if decks_to_use is not None else [])
+    stem = "_".join(parts)
+    label = f"n={decks_to_use:,}" if decks_to_use is not None else "exact"
+    (csv_cards, cards_digest), cards_plot = _winrate_outputs("cards", "Cards", cards_pct_p1, cards_pct_tie,
+                                                             seqs, stem, label)
+    (csv_tricks, tricks_digest), tricks_plot = _winrate_outputs("tricks", "Tricks", tricks_pct_p1,
+                                                                tricks_pct_tie, seqs, stem, label)
+    written = build_outputs([(csv_cards, cards_digest, cards_df, True), (csv_tricks, tricks_digest, tricks_df, True)],
+                            [cards_plot, tricks_plot], group=group, force=force,
+                            render_workers=render_workers, tracer=tracer)
+    if written:
+        print(f"Saved {', '.join(written)}")
+    else:
+        print(f"Outputs for {label} are up to date.")
 
 
-def augment_or_rescore(n: int, prev_decks_to_use: int):
+def save_variant_outputs(variant_tables, seqs, decks_to_use, tracer=None, force=False, render_workers=None):
+    """
+    Save a CSV and heatmap per extra scoring variant, named like the cards and
+    tricks outputs (winrates_<variant>_n{N}.csv, heatmap_<variant>_n{N}.png).
+    Variants no longer requested have their old outputs removed.
     """
-    Add n new decks, renaming file when finished, and rescore using updated deck count.
+    csvs, plots = [], []
+    label = f"n={decks_to_use:,}"
+    for name, (df, p1_pct, tie_pct) in variant_tables.items():
+        (path, digest), plot = _winrate_outputs(name, VARIANTS[name].title, p1_pct, tie_pct, seqs,
+                                                f"n{decks_to_use}", label)
+        csvs.append((path, digest, df, True))
+        plots.append(plot)
+    written = build_outputs(csvs, plots, group="variants", force=force, render_workers=render_workers,
+                            tracer=tracer)
+    for path in written:
+        print(f"Saved {path}")
+
+
+def run_streaming_scoring_and_plots(num_decks, seed=None, k=3, tracer=None):
+    """
+    Score num_decks freshly generated decks without writing a deck file,
+    then save CSVs and heatmaps tagged "stream".
+    """
+    print(f"\nStreaming {num_decks:,} generated decks through the scorer (no deck file)...")
+    with _stage(tracer, "generate_and_score", n_decks=num_decks):
+        results = compute_winrate_table_streaming(num_decks, k=k, seed=seed, batch_size=BATCH_SIZE,
+                                                  tracer=tracer)
+    save_outputs(*results, num_decks, tag="stream", tracer=tracer)
+
+
+def run_adaptive_scoring_and_plots(target_halfwidth=0.001, focus="all", seed=None, k=3):
+    """
+    Generate and score decks until the Wilson interval of every cell in focus
+    ("all" or the row-best "best" cells) is within target_halfwidth, then save
+    CSVs and heatmaps tagged "adaptive".
+    """
+    print(f"\nScoring until every {focus} cell is within +/-{target_halfwidth:.2%}...")
+    results, decks_used = compute_winrate_table_adaptive(
+        target_halfwidth=target_halfwidth, focus=focus, k=k, seed=seed, batch_size=BATCH_SIZE)
+    print(f"Converged after {decks_used:,} decks.")
+    save_outputs(*results, decks_used, tag="adaptive")
+
+
+def run_exact_and_plots(k=3, n_red=26, n_black=26):
+    """
+    Compute exact win/tie probabilities by dynamic programming and save them
+    as CSVs and heatmaps tagged "exact" (no decks needed).
+    """
+    print(f"\nComputing exact win rates for a {n_red}/{n_black} deck, k={k}...")
+    results = compute_winrate_table_exact(k=k, n_red=n_red, n_black=n_black)
+    save_outputs(*results, None, tag=f"exact_{n_red}r{n_black}b_k{k}")
+
+
+def run_tournament_and_plots(n_players=3, num_decks=1_000_000, seed=None, k=3, tracer=None):
+    """
+    Score n-player games for every ordered tuple of distinct patterns on
+    num_decks generated decks. Saves one CSV row per tuple and heatmaps of
+    player 1 vs player 2 pooled over the other players, tagged "{n}p".
+    """
+    print(f"\nScoring {n_players}-player games on {num_decks:,} generated decks...")
+    with _stage(tracer, "generate_and_score", n_decks=num_decks):
+        results = compute_tournament_tables(n_players, k, num_decks=num_decks, seed=seed,
+                                            batch_size=BATCH_SIZE, tracer=tracer)
+    save_outputs(*results, num_decks, tag=f"{n_players}p", tracer=tracer)
+
+
+def run_sweep_and_save(deck_lens=(52,), red_counts=None, ks=(3,), variants=("cards", "tricks"),
+                       num_decks=100_000, seed=None, symmetry="swap", tracer=None):
+    """
+    Run a parameter sweep (see src.sweep.run_sweep) over deck length, red
+    count, pattern length and variant in one pooled job and save the tidy
+    table to data/tables/sweep_n{N}.csv. Returns the table.
+    """
+    ensure_output_dirs()
+    configs = sweep_configs(deck_lens, red_counts, ks)
+    print(f"\nSweeping {len(configs)} configurations x {len(variants)} variants on {num_decks:,} decks each...")
+    with _stage(tracer, "sweep", n_decks=num_decks * len(configs)):
+        table = run_sweep(deck_lens, red_counts, ks, variants, num_decks=num_decks, seed=seed,
+                          batch_size=BATCH_SIZE, symmetry=symmetry, tracer=tracer)
+    out = f"data/tables/sweep_n{num_decks}.csv"
+    table.to_csv(out, index=False)
+    print(f"Saved sweep table: {out}")
+    return table
+
+
+def augment_or_rescore(n: int, prev_decks_to_use: int, tracer=None):
+    """
+    Add n new decks to the deck file and rescore using updated deck count.
     """
     deck_file, cur_count = find_deck_file()
     decks_to_use = prev_decks_to_use + n
     if cur_count < decks_to_use:
         print(f"\nAppending {decks_to_use - cur_count:,} new decks to {deck_file}...")
-        append_decks(deck_file, decks_to_use - cur_count)
-        deck_file = rename_deck_file(deck_file, decks_to_use)
+        with _stage(tracer, "generate", n_decks=decks_to_use - cur_count):
+            append_decks(deck_file, decks_to_use - cur_count)
         print(f"New total decks: {decks_to_use:,}")
     else:
         print(f"\nDeck file has {cur_count:,} decks; scoring only the first {decks_to_use:,}.")
-    delete_old_outputs(decks_to_use)
-    run_scoring_and_plots(deck_file, limit_to_target=False, decks_to_use=decks_to_use)
+    run_scoring_and_plots(deck_file, limit_to_target=False, decks_to_use=decks_to_use, tracer=tracer)
 
 
 def augment_data(n: int):
@@ -188,29 +407,50 @@ def augment_data(n: int):
     augment_or_rescore(n, cur_count)
 
 
-def main():
+def ensure_decks(target_decks: int, tracer=None):
     """
-    Main experiment driver. Creates decks (if missing), then scores and plots results.
-    Prompts to augment further decks.
+    Return (deck_file, decks_to_use): the deck file, created or extended so
+    it holds at least target_decks decks, and the number of decks to score.
     """
     deck_file, cur_count = find_deck_file()
-    prev_decks_to_use = TARGET_DECKS
     if not deck_file:
-        print(f"No deck file found. Creating {TARGET_DECKS:,} decks...")
-        deck_file = os.path.join(DECKS_DIR, f"decks_{TARGET_DECKS}.bin")
-        create_deck_data_bitarray(num_decks=TARGET_DECKS,
-                                  output_name=os.path.basename(deck_file),
-                                  batch_size=BATCH_SIZE)
+        print(f"No deck file found. Creating {target_decks:,} decks...")
+        deck_file = DECK_FILE
+        with _stage(tracer, "generate", n_decks=target_decks):
+            create_deck_file(deck_file, target_decks, batch_size=BATCH_SIZE)
         print("Deck creation finished.")
-    elif cur_count < TARGET_DECKS:
-        need = TARGET_DECKS - cur_count
-        print(f"Deck file has {cur_count:,} decks; creating {need:,} more to reach {TARGET_DECKS:,}.")
-        append_decks(deck_file, need)
-        deck_file = rename_deck_file(deck_file, TARGET_DECKS)
-    elif cur_count > TARGET_DECKS:
-        print(f"Deck file has {cur_count:,} decks; scoring only the first {TARGET_DECKS:,}.")
-    delete_old_outputs(TARGET_DECKS)
-    run_scoring_and_plots(deck_file, limit_to_target=True)
+    elif cur_count < target_decks:
+        need = target_decks - cur_count
+        print(f"Deck file has {cur_count:,} decks; creating {need:,} more to reach {target_decks:,}.")
+        with _stage(tracer, "generate", n_decks=need):
+            append_decks(deck_file, need)
+    elif cur_count > target_decks:
+        print(f"Deck file has {cur_count:,} decks; scoring only the first {target_decks:,}.")
+    return deck_file, target_decks
+
+
+def run_job(target_decks: int = TARGET_DECKS, k: int = 3, histograms=False, variants=(), symmetry=None,
+            force=False, render_workers=None):
+    """
+    One non-interactive pipeline run for schedulers: make sure target_decks
+    decks exist, score only decks not already in the checkpointed counts and
+    rebuild only the outputs whose results changed. A rerun with nothing new
+    skips deck generation, kernels and plotting. Exports the run's trace
+    (keeping the latest KEEP_TRACES).
+    """
+    ensure_output_dirs()
+    tracer = Tracer()
+    deck_file, decks_to_use = ensure_decks(target_decks, tracer)
+    run_scoring_and_plots(deck_file, limit_to_target=False, decks_to_use=decks_to_use, tracer=tracer,
+                          histograms=histograms, variants=variants, symmetry=symmetry, k=k,
+                          force=force, render_workers=render_workers)
+    export_trace(tracer)
+
+
+def prompt_for_more(decks_to_use: int):
+    """
+    Interactive loop: offer to append more decks and rerun until declined.
+    """
     while True:
         resp = input("\nAppend more decks and rerun? [y/N]: ").strip().lower()
         if resp not in ("y", "yes"):
@@ -224,8 +464,33 @@ def main():
         except Exception:
             print("Invalid number.")
             continue
-        augment_or_rescore(add_n, prev_decks_to_use)
-        prev_decks_to_use += add_n
+        tracer = Tracer()
+        augment_or_rescore(add_n, decks_to_use, tracer=tracer)
+        export_trace(tracer)
+        decks_to_use += add_n
+
+
+def main(argv=None):
+    """
+    Experiment driver. Runs one headless job (run_job): creates or extends
+    the deck file, scores new decks and refreshes changed CSVs and heatmaps,
+    with no prompts, so it can run from cron. --interactive then offers to
+    append more decks and rerun. Each run's stage and worker timings are
+    exported to TRACES_DIR, which keeps the latest KEEP_TRACES runs.
+    """
+    parser = argparse.ArgumentParser(prog="main.py")
+    parser.add_argument("--decks", type=int, default=TARGET_DECKS, help="decks to score")
+    parser.add_argument("--k", type=int, default=3, help="pattern length")
+    parser.add_argument("--histograms", action="store_true", help="also tally outcome histograms")
+    parser.add_argument("--variants", nargs="*", default=[], help="extra scoring variants (src.variants)")
+    parser.add_argument("--symmetry", choices=["swap", "complement"], help="score only canonical pairs")
+    parser.add_argument("--force", action="store_true", help="rewrite CSVs and plots even if unchanged")
+    parser.add_argument("--render-workers", type=int, help="processes for drawing heatmaps")
+    parser.add_argument("--interactive", action="store_true", help="offer to append decks after the run")
+    args = parser.parse_args(argv)
+    run_job(args.decks, args.k, args.histograms, args.variants, args.symmetry, args.force, args.render_workers)
+    if args.interactive:
+        prompt_for_more(args.decks)
 
 
 if __name__ == "__main__":
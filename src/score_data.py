@@ -1,23 +1,31 @@
 import os
+import multiprocessing
 import numpy as np
-from bitarray import bitarray
 import numba as nb
-from concurrent.futures import ProcessPoolExecutor
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src.deck_file import deck_count, read_deck_range, read_packed_range, read_header, deck_file_fingerprint
+from src.checkpoint import (
+    atomic_save_npy,
+    atomic_write_bytes,
+    load_checkpoint,
+    merge_ranges,
+    missing_ranges,
+    save_checkpoint,
+)
+from src.create_data import generate_decks, batch_seeds, split_batches
+from src.histograms import empty_histograms, load_histograms, save_histograms
+from src.variants import VARIANTS, extra_variants, variant_weights
+from src.symmetry import pair_plan, expand_counts, expand_histograms
+from src.utils import traced_call
 
 def read_deck_file(file_path: str) -> np.ndarray:
     """
-    Load a deck file, returning decks as np.ndarray shape (n_decks, 52).
+    Load a deck file, returning decks as np.ndarray shape (n_decks, deck length).
+    Prefer iter_deck_chunks for large files; this materialises every deck.
     """
-    ba = bitarray()
-    with open(file_path, 'rb') as f:
-        ba.fromfile(f)
-    arr = np.frombuffer(ba.unpack(), dtype=np.uint8)
-    n_decks = len(arr) // 52
-    arr = arr[:n_decks * 52]
-    return arr.reshape((n_decks, 52))
+    return read_deck_range(file_path, 0, deck_count(file_path))
 
-@nb.njit
+@nb.njit(cache=True)
 def score_deck_humble_jit(deck: np.ndarray, s1: np.ndarray, s2: np.ndarray):
     """
     For one deck and two patterns, score total cards/tricks for each, for given window k.
@@ -60,38 +68,409 @@ def _seq_to_array(seq: str) -> np.ndarray:
     """
     return np.array([1 if c == 'r' else 0 for c in seq.lower()], dtype=np.uint8)
 
-def _batch_score(decks_chunk, seqs, seq_arrays):
+def _pattern_matrix(seqs, seq_arrays) -> np.ndarray:
     """
-    For a chunk of decks, and patterns, tabulate win/draw for both scoring systems.
+    Stack pattern arrays into a (n_patterns, k) matrix in seqs order.
     """
-    nseq = len(seqs)
-    lc1 = np.zeros((nseq, nseq), dtype=np.int64)
-    lc2 = np.zeros((nseq, nseq), dtype=np.int64)
-    lct = np.zeros((nseq, nseq), dtype=np.int64)
-    lt1 = np.zeros((nseq, nseq), dtype=np.int64)
-    lt2 = np.zeros((nseq, nseq), dtype=np.int64)
-    ltt = np.zeros((nseq, nseq), dtype=np.int64)
-    for deck in decks_chunk:
-        for i, s1 in enumerate(seqs):
-            for j, s2 in enumerate(seqs):
-                if i == j:
-                    continue
-                c1, c2, t1, t2 = score_deck_humble_jit(deck, seq_arrays[s1], seq_arrays[s2])
+    return np.stack([seq_arrays[s] for s in seqs]).astype(np.uint8)
+
+def _pattern_codes(patterns: np.ndarray) -> np.ndarray:
+    """
+    Encode each pattern row as an integer, first card in the most significant bit.
+    """
+    k = patterns.shape[1]
+    weights = (1 << np.arange(k - 1, -1, -1)).astype(np.int64)
+    return patterns.astype(np.int64) @ weights
+
+@nb.njit(cache=True)
+def _pair_transition_table(c1: int, c2: int, k: int) -> np.ndarray:
+    """
+    Build the scoring automaton for one (s1, s2) pair given as integer codes.
+
+    State 0 is the empty history (start, or just after a trick). States 1..k-1
+    are the proper prefixes of s1, states k..2k-2 the proper prefixes of s2
+    (a prefix shared with s1 uses the s1 state). Entry [state, card] is the next
+    state, or -1 / -2 when the card completes s1 / s2: that player takes the
+    trick and the automaton resets to state 0.
+    """
+    n_states = max(1, 2 * k - 1)
+    table = np.zeros((n_states, 2), dtype=np.int16)
+    for state in range(n_states):
+        # Recover the history string (code, length) this state stands for
+        if state == 0:
+            code, length = 0, 0
+        elif state < k:
+            length = state
+            code = c1 >> (k - length)
+        else:
+            length = state - k + 1
+            code = c2 >> (k - length)
+        for card in range(2):
+            v = (code << 1) | card
+            m = length + 1
+            if m == k and v == c1:
+                table[state, card] = -1
+                continue
+            if m == k and v == c2:
+                table[state, card] = -2
+                continue
+            # Longest suffix of v that is a proper prefix of s1 or s2
+            nxt = 0
+            for L in range(min(m, k - 1), 0, -1):
+                suffix = v & ((1 << L) - 1)
+                if suffix == (c1 >> (k - L)):
+                    nxt = L
+                    break
+                if suffix == (c2 >> (k - L)):
+                    nxt = k - 1 + L
+                    break
+            table[state, card] = nxt
+    return table
+
+@nb.njit(cache=True)
+def _build_transition_tables_jit(codes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Fill the (n, n, 2k-1, 2) table stack for all ordered pairs of pattern codes.
+    """
+    nseq = codes.size
+    n_states = max(1, 2 * k - 1)
+    tables = np.zeros((nseq, nseq, n_states, 2), dtype=np.int16)
+    for i in range(nseq):
+        for j in range(nseq):
+            if i != j:
+                tables[i, j] = _pair_transition_table(codes[i], codes[j], k)
+    return tables
+
+def build_transition_tables(patterns: np.ndarray) -> np.ndarray:
+    """
+    Scoring automata for every ordered pattern pair, shape (n, n, 2k-1, 2).
+    Diagonal entries are left zeroed (a pattern never plays itself).
+    """
+    patterns = np.asarray(patterns, dtype=np.uint8)
+    return _build_transition_tables_jit(_pattern_codes(patterns), patterns.shape[1])
+
+@nb.njit(cache=True)
+def _deck_stats_automaton(deck: np.ndarray, table: np.ndarray):
+    """
+    Play one deck for one pattern pair with one table lookup per card.
+    Returns (p1_cards, p2_cards, p1_tricks, p2_tricks, first, last) where first
+    and last are the players (1 or 2, 0 if no trick) taking the first and last trick.
+    """
+    p1_cards = p2_cards = p1_tricks = p2_tricks = 0
+    first = last = 0
+    last_award_idx = 0
+    state = 0
+    for i in range(deck.size):
+        nxt = table[state, deck[i]]
+        if nxt >= 0:
+            state = nxt
+            continue
+        if nxt == -1:
+            p1_cards += (i - last_award_idx + 1)
+            p1_tricks += 1
+        else:
+            p2_cards += (i - last_award_idx + 1)
+            p2_tricks += 1
+        last = -nxt
+        if first == 0:
+            first = last
+        last_award_idx = i + 1
+        state = 0
+    return p1_cards, p2_cards, p1_tricks, p2_tricks, first, last
+
+@nb.njit(cache=True)
+def score_deck_automaton_jit(deck: np.ndarray, table: np.ndarray):
+    """
+    Score one deck for one pattern pair with one table lookup per card.
+    Same results as score_deck_humble_jit, for any pattern length.
+    """
+    p1_cards, p2_cards, p1_tricks, p2_tricks, _, _ = _deck_stats_automaton(deck, table)
+    return p1_cards, p2_cards, p1_tricks, p2_tricks
+
+@nb.njit(cache=True)
+def _hist_buffers(n_blocks: int, nseq: int, n_cards: int, k: int, hist: bool):
+    """
+    Per-block histogram accumulators: card difference p1 - p2 in [-n_cards, n_cards]
+    and joint (p1 tricks, p2 tricks) in [0, n_cards // k]. Zero-length when hist is off.
+    """
+    n_diff = 2 * n_cards + 1 if hist else 0
+    n_tricks = n_cards // k + 1 if hist else 0
+    return (np.zeros((n_blocks, nseq, nseq, n_diff), dtype=np.int32),
+            np.zeros((n_blocks, nseq, nseq, n_tricks, n_tricks), dtype=np.int32))
+
+@nb.njit(cache=True)
+def _tally_variants(partial_variants, b, i, j, weights, c1, c2, t1, t2, first, last):
+    """
+    Add one game to every extra variant: each player's score is the weighted
+    sum of (cards, tricks, took first trick, took last trick) and the higher
+    score wins.
+    """
+    for v in range(weights.shape[0]):
+        s1 = (weights[v, 0] * c1 + weights[v, 1] * t1
+              + weights[v, 2] * (first == 1) + weights[v, 3] * (last == 1))
+        s2 = (weights[v, 0] * c2 + weights[v, 1] * t2
+              + weights[v, 2] * (first == 2) + weights[v, 3] * (last == 2))
+        if s1 > s2:
+            partial_variants[b, v, 0, i, j] += 1
+        elif s2 > s1:
+            partial_variants[b, v, 1, i, j] += 1
+        else:
+            partial_variants[b, v, 2, i, j] += 1
+
+@nb.njit(cache=True)
+def _merge_blocks(partial, card_hist, trick_hist, partial_variants):
+    """
+    Sum per-block accumulators into (counts, card_hist, trick_hist, variant_counts).
+    """
+    counts = np.zeros(partial.shape[1:], dtype=np.int64)
+    card_total = np.zeros(card_hist.shape[1:], dtype=np.int32)
+    trick_total = np.zeros(trick_hist.shape[1:], dtype=np.int32)
+    variant_total = np.zeros(partial_variants.shape[1:], dtype=np.int64)
+    for b in range(partial.shape[0]):
+        counts += partial[b]
+        card_total += card_hist[b]
+        trick_total += trick_hist[b]
+        variant_total += partial_variants[b]
+    return counts, card_total, trick_total, variant_total
+
+@nb.njit(parallel=True, cache=True)
+def _score_all_pairs_jit(decks: np.ndarray, tables: np.ndarray, pairs: np.ndarray, n_threads: int,
+                         hist: bool, weights: np.ndarray):
+    """
+    Score the ordered pattern pairs listed in pairs (n_pairs, 2) against every
+    deck in one compiled pass (see src.symmetry.pair_plan); unlisted pairs stay
+    zero. Returns (counts, card_hist, trick_hist, variant_counts). counts has
+    shape (6, n_patterns, n_patterns): cards p1/p2/tie, then tricks p1/p2/tie. With
+    hist, card_hist[i, j, d] counts decks where p1 - p2 cards = d - n_cards and
+    trick_hist[i, j, t1, t2] counts trick totals; otherwise both are empty.
+    variant_counts (n_variants, 3, n, n) holds p1/p2/tie counts for each row of
+    weights (see src.variants); it is empty when weights has no rows.
+    Decks are split into one block per thread, each with its own accumulator.
+    n_threads is passed in (nb.get_num_threads()) rather than read inside the
+    kernel, which would stop numba from caching it.
+    """
+    n_decks, n_cards = decks.shape
+    nseq = tables.shape[0]
+    n_blocks = max(1, min(n_threads, n_decks))
+    partial = np.zeros((n_blocks, 6, nseq, nseq), dtype=np.int64)
+    card_hist, trick_hist = _hist_buffers(n_blocks, nseq, n_cards, (tables.shape[2] + 1) // 2, hist)
+    partial_variants = np.zeros((n_blocks, weights.shape[0], 3, nseq, nseq), dtype=np.int64)
+    for b in nb.prange(n_blocks):
+        lo = b * n_decks // n_blocks
+        hi = (b + 1) * n_decks // n_blocks
+        for d in range(lo, hi):
+            deck = decks[d]
+            for p in range(pairs.shape[0]):
+                i = pairs[p, 0]
+                j = pairs[p, 1]
+                c1, c2, t1, t2, first, last = _deck_stats_automaton(deck, tables[i, j])
+                _tally_variants(partial_variants, b, i, j, weights, c1, c2, t1, t2, first, last)
+                if hist:
+                    card_hist[b, i, j, c1 - c2 + n_cards] += 1
+                    trick_hist[b, i, j, t1, t2] += 1
                 # cards
                 if c1 > c2:
-                    lc1[i, j] += 1
+                    partial[b, 0, i, j] += 1
                 elif c2 > c1:
-                    lc2[i, j] += 1
+                    partial[b, 1, i, j] += 1
                 else:
-                    lct[i, j] += 1
+                    partial[b, 2, i, j] += 1
                 # tricks
                 if t1 > t2:
-                    lt1[i, j] += 1
+                    partial[b, 3, i, j] += 1
                 elif t2 > t1:
-                    lt2[i, j] += 1
+                    partial[b, 4, i, j] += 1
                 else:
-                    ltt[i, j] += 1
-    return lc1, lc2, lct, lt1, lt2, ltt
+                    partial[b, 5, i, j] += 1
+    return _merge_blocks(partial, card_hist, trick_hist, partial_variants)
+
+@nb.njit(cache=True)
+def _highest_bit(x: int) -> int:
+    """
+    Index of the highest set bit of a positive int64.
+    """
+    b = 0
+    for step in (32, 16, 8, 4, 2, 1):
+        if x >> step:
+            x >>= step
+            b += step
+    return b
+
+@nb.njit(cache=True)
+def _match_mask(word: int, code: int, k: int, n_cards: int) -> int:
+    """
+    Bit-parallel window match: bit n_cards - 1 - s is set when the k cards
+    starting at position s equal the pattern code.
+    """
+    full = (1 << n_cards) - 1
+    m = full ^ ((1 << (k - 1)) - 1)
+    for j in range(k):
+        shifted = (word << j) & full
+        if (code >> (k - 1 - j)) & 1:
+            m &= shifted
+        else:
+            m &= ~shifted
+    return m
+
+@nb.njit(cache=True)
+def _deck_stats_packed(m1: int, m2: int, k: int, n_cards: int):
+    """
+    Play one packed deck from the match masks of s1 and s2; returns the same
+    six values as _deck_stats_automaton. The trick-reset logic only visits
+    match positions, earliest first.
+    """
+    p1_cards = p2_cards = p1_tricks = p2_tricks = 0
+    first = last = 0
+    last_award_idx = 0
+    both = m1 | m2
+    while last_award_idx <= n_cards - k:
+        # Drop windows starting before the last award
+        cand = both & ((1 << (n_cards - last_award_idx)) - 1)
+        if cand == 0:
+            break
+        b = _highest_bit(cand)
+        end = n_cards - 1 - b + k - 1
+        if (m1 >> b) & 1:
+            p1_cards += (end - last_award_idx + 1)
+            p1_tricks += 1
+            last = 1
+        else:
+            p2_cards += (end - last_award_idx + 1)
+            p2_tricks += 1
+            last = 2
+        if first == 0:
+            first = last
+        last_award_idx = end + 1
+    return p1_cards, p2_cards, p1_tricks, p2_tricks, first, last
+
+@nb.njit(cache=True)
+def score_packed_deck_jit(m1: int, m2: int, k: int, n_cards: int):
+    """
+    Score one packed deck from the match masks of s1 and s2.
+    """
+    p1_cards, p2_cards, p1_tricks, p2_tricks, _, _ = _deck_stats_packed(m1, m2, k, n_cards)
+    return p1_cards, p2_cards, p1_tricks, p2_tricks
+
+@nb.njit(parallel=True, cache=True)
+def _score_all_pairs_packed_jit(words: np.ndarray, codes: np.ndarray, k: int, n_cards: int,
+                                pairs: np.ndarray, n_threads: int, hist: bool, weights: np.ndarray):
+    """
+    Packed-deck counterpart of _score_all_pairs_jit: each deck is one int64 word
+    and pattern matches for every pattern are found once per deck.
+    """
+    n_decks = words.shape[0]
+    nseq = codes.shape[0]
+    n_blocks = max(1, min(n_threads, n_decks))
+    partial = np.zeros((n_blocks, 6, nseq, nseq), dtype=np.int64)
+    card_hist, trick_hist = _hist_buffers(n_blocks, nseq, n_cards, k, hist)
+    partial_variants = np.zeros((n_blocks, weights.shape[0], 3, nseq, nseq), dtype=np.int64)
+    for b in nb.prange(n_blocks):
+        lo = b * n_decks // n_blocks
+        hi = (b + 1) * n_decks // n_blocks
+        masks = np.zeros(nseq, dtype=np.int64)
+        for d in range(lo, hi):
+            for i in range(nseq):
+                masks[i] = _match_mask(words[d], codes[i], k, n_cards)
+            for p in range(pairs.shape[0]):
+                i = pairs[p, 0]
+                j = pairs[p, 1]
+                c1, c2, t1, t2, first, last = _deck_stats_packed(masks[i], masks[j], k, n_cards)
+                _tally_variants(partial_variants, b, i, j, weights, c1, c2, t1, t2, first, last)
+                if hist:
+                    card_hist[b, i, j, c1 - c2 + n_cards] += 1
+                    trick_hist[b, i, j, t1, t2] += 1
+                # cards
+                if c1 > c2:
+                    partial[b, 0, i, j] += 1
+                elif c2 > c1:
+                    partial[b, 1, i, j] += 1
+                else:
+                    partial[b, 2, i, j] += 1
+                # tricks
+                if t1 > t2:
+                    partial[b, 3, i, j] += 1
+                elif t2 > t1:
+                    partial[b, 4, i, j] += 1
+                else:
+                    partial[b, 5, i, j] += 1
+    return _merge_blocks(partial, card_hist, trick_hist, partial_variants)
+
+def _played_pairs(nseq: int, plan=None) -> np.ndarray:
+    """
+    Pairs handed to the kernels: every off-diagonal pair unless a symmetry plan says otherwise.
+    """
+    if plan is not None:
+        return plan.pairs
+    return np.argwhere(~np.eye(nseq, dtype=bool)).astype(np.int64)
+
+def _batch_outputs(counts, card_hist, trick_hist, variant_counts, histograms, weights, plan=None):
+    """
+    The six count matrices, then the histograms if requested, then the extra
+    variant counts if any variant weights were given. With a symmetry plan the
+    pairs that were not played are filled in from those that were.
+    """
+    if plan is not None and plan.symmetry is not None:
+        counts = expand_counts(counts, plan, [1, 0, 2, 4, 3, 5])
+        variant_counts = expand_counts(variant_counts, plan, [1, 0, 2])
+        if histograms:
+            card_hist, trick_hist = expand_histograms(card_hist, trick_hist, plan)
+    out = tuple(counts)
+    if histograms:
+        out += (card_hist, trick_hist)
+    if weights is not None:
+        out += (variant_counts,)
+    return out
+
+def _batch_score(decks_chunk, seqs, seq_arrays, tables=None, histograms=False, weights=None, plan=None):
+    """
+    For a chunk of decks, and patterns, tabulate win/draw for both scoring systems.
+    Pass prebuilt transition tables to avoid rebuilding them for every chunk.
+    With histograms=True the card difference and trick histograms (see
+    _score_all_pairs_jit) are appended to the six count matrices; with variant
+    weights (src.variants.variant_weights) so are the extra variants' counts.
+    A src.symmetry.pair_plan plays only its canonical pairs and fills in the rest.
+    """
+    decks_chunk = np.ascontiguousarray(decks_chunk, dtype=np.uint8)
+    if tables is None:
+        tables = build_transition_tables(_pattern_matrix(seqs, seq_arrays))
+    w = np.zeros((0, 4), dtype=np.int64) if weights is None else weights
+    pairs = _played_pairs(tables.shape[0], plan)
+    results = _score_all_pairs_jit(decks_chunk, tables, pairs, nb.get_num_threads(), histograms, w)
+    return _batch_outputs(*results, histograms, weights, plan)
+
+def _batch_score_packed(words_chunk, codes, k, n_cards=52, histograms=False, weights=None, plan=None):
+    """
+    Packed-deck version of _batch_score: words_chunk holds one int64 per deck.
+    """
+    words_chunk = np.ascontiguousarray(words_chunk, dtype=np.int64)
+    w = np.zeros((0, 4), dtype=np.int64) if weights is None else weights
+    pairs = _played_pairs(codes.shape[0], plan)
+    results = _score_all_pairs_packed_jit(words_chunk, codes, k, n_cards, pairs, nb.get_num_threads(),
+                                          histograms, w)
+    return _batch_outputs(*results, histograms, weights, plan)
+
+def warm_kernels():
+    """
+    Load (or compile, on the first run) every scoring kernel on tiny inputs.
+    Kernels are cached on disk (cache=True), so later processes only load them.
+    """
+    k = 3
+    patterns = np.array([[0, 0, 1], [1, 0, 0]], dtype=np.uint8)
+    decks = np.zeros((1, 52), dtype=np.uint8)
+    decks[0, ::2] = 1
+    no_variants = np.zeros((0, 4), dtype=np.int64)
+    pairs = _played_pairs(2)
+    _score_all_pairs_jit(decks, build_transition_tables(patterns), pairs, 1, False, no_variants)
+    words = (decks.astype(np.int64) << np.arange(51, -1, -1)).sum(axis=1)
+    _score_all_pairs_packed_jit(words, _pattern_codes(patterns), k, 52, pairs, 1, False, no_variants)
+
+def _init_worker(threads: int):
+    """
+    Process pool initializer: cap numba threads so workers don't oversubscribe
+    cores, and load the cached kernels once per worker rather than per task.
+    """
+    nb.set_num_threads(threads)
+    warm_kernels()
 
 def all_sequences_binary_order(k=3):
     """
@@ -104,6 +483,108 @@ def all_sequences_binary_order(k=3):
         seqs.append(seq)
     return seqs
 
+def _pct_matrices(p1, p2, tie):
+    """
+    Convert win/tie count matrices to rounded percentages (NaN where nothing was scored).
+    """
+    total = p1 + p2 + tie
+    p1_pct = np.divide(p1, total, out=np.full_like(p1, np.nan, dtype=np.float64), where=total > 0) * 100
+    tie_pct = np.divide(tie, total, out=np.full_like(tie, np.nan, dtype=np.float64), where=total > 0) * 100
+    return np.round(p1_pct, 4), np.round(tie_pct, 4)
+
+def _format_str_matrix(p1_pct, tie_pct, seqs):
+    """
+    Format percentage matrices as the "win% (tie%)" DataFrame written to CSV.
+    """
+    import pandas as pd
+    n = p1_pct.shape[0]
+    mat = np.empty((n, n), dtype=object)
+    for i in range(n):
+        for j in range(n):
+            if i == j or np.isnan(p1_pct[i, j]):
+                mat[i, j] = ""
+            else:
+                mat[i, j] = f"{p1_pct[i,j]:.2f}% ({tie_pct[i,j]:.2f}%)"
+    df = pd.DataFrame(mat, index=seqs, columns=seqs)
+    df.index.name = "Player 1 pattern"
+    df.columns.name = "Player 2 pattern"
+    return df
+
+def winrate_tables(counts_cards, counts_tricks, seqs):
+    """
+    Build the result tuple returned by the scoring entry points from
+    (3, n, n) cards and tricks counts: DataFrames, percentage matrices, seqs.
+    """
+    cards_pct_p1, cards_pct_tie = _pct_matrices(*counts_cards)
+    tricks_pct_p1, tricks_pct_tie = _pct_matrices(*counts_tricks)
+    cards_df = _format_str_matrix(cards_pct_p1, cards_pct_tie, seqs)
+    tricks_df = _format_str_matrix(tricks_pct_p1, tricks_pct_tie, seqs)
+    return cards_df, tricks_df, cards_pct_p1, cards_pct_tie, tricks_pct_p1, tricks_pct_tie, seqs
+
+def variant_tables(variant_counts, seqs):
+    """
+    Map each variant name in variant_counts ({name: (3, n, n) counts}) to its
+    (DataFrame, p1 %, tie %), formatted like the cards and tricks tables.
+    """
+    tables = {}
+    for name, counts in variant_counts.items():
+        p1_pct, tie_pct = _pct_matrices(*counts)
+        tables[name] = (_format_str_matrix(p1_pct, tie_pct, seqs), p1_pct, tie_pct)
+    return tables
+
+def _fold_in_pool(tasks, fold, workers=None, in_flight=2, tracer=None):
+    """
+    Run (fn, *args) tasks on a spawn-based process pool and pass each result
+    to fold as it completes. Only in_flight tasks per worker are queued at a
+    time, so lazily generated task arguments never pile up in memory.
+    With a tracer, each task also reports its worker timing and RSS.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    threads = max(1, min(nb.config.NUMBA_NUM_THREADS, (os.cpu_count() or 1) // workers))
+    # numba's threading layers are not fork-safe once the parent has run a parallel kernel
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(threads,)) as ex:
+        def _collect(fut):
+            if tracer is None:
+                fold(fut.result())
+                return
+            result, record = fut.result()
+            tracer.record_chunk(record)
+            fold(result)
+
+        pending = set()
+        for fn, *args in tasks:
+            if tracer is not None:
+                fn, args = traced_call, (fn, *args)
+            pending.add(ex.submit(fn, *args))
+            if len(pending) < in_flight * workers:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                _collect(fut)
+        for fut in pending:
+            _collect(fut)
+
+def _score_file_range(file_path, lo, hi, codes, k, tables=None, histograms=False, weights=None, plan=None):
+    """
+    Worker task: memory-map the deck file and score decks [lo, hi) in place,
+    so decks are never pickled from the parent. tables=None selects the packed
+    bit-parallel kernel, otherwise the automaton kernel with those tables.
+    The deck length comes from the file header.
+    """
+    if tables is None:
+        return _batch_score_packed(read_packed_range(file_path, lo, hi), codes, k,
+                                   read_header(file_path).deck_len, histograms, weights, plan)
+    return _batch_score(read_deck_range(file_path, lo, hi), None, None, tables, histograms, weights, plan)
+
+def _scored_range(lo, hi, fn, *args):
+    """
+    Worker task wrapper that tags a chunk's counts with its deck range.
+    """
+    return lo, hi, fn(*args)
+
 def compute_winrate_table_incremental(
     file_path: str,
     k: int = 3,
@@ -111,81 +592,339 @@ def compute_winrate_table_incremental(
     batch_size: int = 50_000,
     max_decks: int = None,
     seq_order_binary: bool = True,
+    packed: bool = False,
     counts_cards_file: str = "data/tracking_decks/counts_cards.npy",
     counts_tricks_file: str = "data/tracking_decks/counts_tricks.npy",
-    last_n_file: str = "data/tracking_decks/last_n.txt"
+    last_n_file: str = "data/tracking_decks/last_n.txt",
+    checkpoint_file: str = None,
+    histograms: bool = False,
+    card_hist_file: str = "data/tracking_decks/hist_card_diff.npy",
+    trick_hist_file: str = "data/tracking_decks/hist_tricks.npy",
+    variants=(),
+    symmetry: str = None,
+    verify_decks: int = 0,
+    tracer=None,
 ):
     """
     Tabulate win rates for deck file, incrementally updating counts for only new decks.
     Returns DataFrames and raw matrices for heatmap.
+    With packed=True decks are scored as one word each by the bit-parallel kernel
+    (decks longer than 56 cards always use the automaton kernel).
+
+    Progress is checkpointed atomically after every chunk (by default to
+    checkpoint.npz next to last_n_file), keyed by the deck file fingerprint, k and
+    pattern order; a killed run resumes from the chunks already completed, and a
+    checkpoint for another file or parameters is ignored rather than reused.
+    With histograms=True the kernels also tally, per pair, the card difference
+    and joint trick counts of every game; these are checkpointed with the
+    counts and saved to card_hist_file / trick_hist_file (see src.histograms).
+    variants names extra registered scoring variants (src.variants) scored in
+    the same pass; each one's (3, n, n) counts are checkpointed and saved as
+    counts_<variant>.npy next to counts_cards_file, and the result gains an
+    eighth element mapping each variant to its (DataFrame, p1 %, tie %).
+    symmetry="swap" plays each unordered pair once and mirrors it, which gives
+    exactly the same counts in about half the kernel work; "complement" also
+    copies each pair's counts to its colour complement (balanced decks only),
+    which matches full scoring in distribution rather than deck for deck (see
+    src.symmetry). With verify_decks, the first verify_decks decks are checked
+    with verify_symmetry before scoring.
+    Pass a utils.Tracer to record per-chunk worker timings and live progress.
     """
-    decks = read_deck_file(file_path)
+    info = read_header(file_path)
+    n = info.n_decks
     if max_decks is not None:
-        decks = decks[:max_decks]
-    n = decks.shape[0]
+        n = min(n, max_decks)
     seqs = all_sequences_binary_order(k) if seq_order_binary else all_sequences(k)
     nseq = len(seqs)
     seq_arrays = {s: _seq_to_array(s) for s in seqs}
+    patterns = _pattern_matrix(seqs, seq_arrays)
+    tables = None if packed and info.deck_len <= 56 else build_transition_tables(patterns)
+    codes = _pattern_codes(patterns)
+    if checkpoint_file is None:
+        checkpoint_file = os.path.join(os.path.dirname(last_n_file), "checkpoint.npz")
+    meta = {"fingerprint": deck_file_fingerprint(file_path), "k": k, "seqs": seqs, "deck_size": info.deck_len}
+    if histograms:
+        meta["histograms"] = True
+    extra_names = extra_variants(variants)
+    weights = variant_weights(extra_names) if extra_names else None
+    if extra_names:
+        meta["variants"] = {name: list(VARIANTS[name].weights) for name in extra_names}
+    if symmetry == "complement":
+        # Swap symmetry reproduces full scoring exactly; complement copies do not
+        meta["symmetry"] = symmetry
+        if info.n_red != info.n_black:
+            raise ValueError(f"complement symmetry needs a balanced deck, got {info.n_red} red / {info.n_black} black")
+    plan = pair_plan(codes, k, symmetry)
+    if symmetry is not None and verify_decks:
+        verify_symmetry(read_deck_range(file_path, 0, min(verify_decks, n)), k, symmetry,
+                        packed=tables is None, histograms=histograms, weights=weights)
+    variant_files = {name: os.path.join(os.path.dirname(counts_cards_file), f"counts_{name}.npy")
+                     for name in extra_names}
+
+    def _empty_extras():
+        hists = empty_histograms(nseq, info.deck_len, k) if histograms else ()
+        return hists, {name: np.zeros((3, nseq, nseq), dtype=np.int64) for name in extra_names}
 
     # Load or initialize counts
-    if os.path.exists(counts_cards_file) and os.path.exists(counts_tricks_file) and os.path.exists(last_n_file):
-        cards_p1, cards_p2, cards_tie = np.load(counts_cards_file)
-        tricks_p1, tricks_p2, tricks_tie = np.load(counts_tricks_file)
+    hists, variant_counts = _empty_extras()
+    state = load_checkpoint(checkpoint_file, meta)
+    saved_hists = load_histograms(card_hist_file, trick_hist_file) if histograms else ()
+    if state is not None:
+        counts_cards, counts_tricks, done, extra = state
+        if histograms:
+            hists = (extra["card_hist"].astype(np.int64), extra["trick_hist"].astype(np.int64))
+        variant_counts = {name: extra[f"counts_{name}"] for name in extra_names}
+    elif (not os.path.exists(checkpoint_file)
+          and os.path.exists(counts_cards_file) and os.path.exists(counts_tricks_file) and os.path.exists(last_n_file)
+          and saved_hists is not None and all(os.path.exists(f) for f in variant_files.values())
+          and all(np.load(f, mmap_mode="r").shape == (3, nseq, nseq)
+                  for f in [counts_cards_file, counts_tricks_file, *variant_files.values()])
+          and all(saved.shape == empty.shape for saved, empty in zip(saved_hists, hists))):
+        # Counts from before checkpoints existed cannot be verified against the file;
+        # once a checkpoint exists, only a checkpoint with matching meta is trusted
+        counts_cards = np.load(counts_cards_file)
+        counts_tricks = np.load(counts_tricks_file)
+        hists = saved_hists
+        variant_counts = {name: np.load(f) for name, f in variant_files.items()}
         with open(last_n_file, "r") as f:
-            last_n = int(f.read().strip())
+            done = [(0, int(f.read().strip()))]
     else:
-        cards_p1 = np.zeros((nseq, nseq), dtype=np.int64)
-        cards_p2 = np.zeros((nseq, nseq), dtype=np.int64)
-        cards_tie = np.zeros((nseq, nseq), dtype=np.int64)
-        tricks_p1 = np.zeros((nseq, nseq), dtype=np.int64)
-        tricks_p2 = np.zeros((nseq, nseq), dtype=np.int64)
-        tricks_tie = np.zeros((nseq, nseq), dtype=np.int64)
-        last_n = 0
-
-    if n > last_n:
-        new_decks = decks[last_n:]
-        chunks = [new_decks[i:i + batch_size] for i in range(0, len(new_decks), batch_size)]
-        if workers is None:
-            workers = os.cpu_count()
-        with ProcessPoolExecutor(max_workers=workers) as ex:
-            futures = [ex.submit(_batch_score, chunk, seqs, seq_arrays) for chunk in chunks]
-            for fut in futures:
-                lc1, lc2, lct, lt1, lt2, ltt = fut.result()
-                cards_p1 += lc1
-                cards_p2 += lc2
-                cards_tie += lct
-                tricks_p1 += lt1
-                tricks_p2 += lt2
-                tricks_tie += ltt
+        counts_cards = np.zeros((3, nseq, nseq), dtype=np.int64)
+        counts_tricks = np.zeros((3, nseq, nseq), dtype=np.int64)
+        done = []
+    if done and max(stop for _, stop in done) > info.n_decks:
+        print(f"Saved counts cover more decks than {file_path} holds; rescoring from scratch.")
+        counts_cards = np.zeros((3, nseq, nseq), dtype=np.int64)
+        counts_tricks = np.zeros((3, nseq, nseq), dtype=np.int64)
+        hists, variant_counts = _empty_extras()
+        done = []
+
+    def _tasks():
+        # Workers map their own (offset, count) range; only counts come back
+        for start, stop in missing_ranges(done, 0, n):
+            for lo in range(start, stop, batch_size):
+                hi = min(lo + batch_size, stop)
+                yield (_scored_range, lo, hi, _score_file_range, file_path, lo, hi, codes, k, tables,
+                       histograms, weights, plan)
+
+    def _add_counts(result):
+        # Folded in completion order; the checkpoint records exactly which ranges are in the counts
+        lo, hi, chunk = result
+        lc1, lc2, lct, lt1, lt2, ltt = chunk[:6]
+        counts_cards[:] += (lc1, lc2, lct)
+        counts_tricks[:] += (lt1, lt2, ltt)
+        for total, part in zip(hists, chunk[6:8] if histograms else ()):
+            total += part
+        for name, part in zip(extra_names, chunk[-1] if extra_names else ()):
+            variant_counts[name] += part
+        done[:] = merge_ranges(done + [(lo, hi)])
+        extra = dict(card_hist=hists[0], trick_hist=hists[1]) if histograms else {}
+        extra.update({f"counts_{name}": c for name, c in variant_counts.items()})
+        save_checkpoint(checkpoint_file, meta, counts_cards, counts_tricks, done, **extra)
+        if tracer is not None:
+            tracer.advance(hi - lo)
+
+    todo = missing_ranges(done, 0, n)
+    if todo:
+        if tracer is not None:
+            tracer.start_progress(sum(stop - start for start, stop in todo))
+        _fold_in_pool(_tasks(), _add_counts, workers, tracer=tracer)
         # Save updated counts and index
-        np.save(counts_cards_file, [cards_p1, cards_p2, cards_tie])
-        np.save(counts_tricks_file, [tricks_p1, tricks_p2, tricks_tie])
-        with open(last_n_file, "w") as f:
-            f.write(str(n))
-
-    def _pct_matrices(p1, p2, tie):
-        total = p1 + p2 + tie
-        p1_pct = np.divide(p1, total, out=np.full_like(p1, np.nan, dtype=np.float64), where=total > 0) * 100
-        tie_pct = np.divide(tie, total, out=np.full_like(tie, np.nan, dtype=np.float64), where=total > 0) * 100
-        return np.round(p1_pct, 4), np.round(tie_pct, 4)
-
-    cards_pct_p1, cards_pct_tie = _pct_matrices(cards_p1, cards_p2, cards_tie)
-    tricks_pct_p1, tricks_pct_tie = _pct_matrices(tricks_p1, tricks_p2, tricks_tie)
-
-    def _format_str_matrix(p1_pct, tie_pct):
-        n = p1_pct.shape[0]
-        mat = np.empty((n, n), dtype=object)
-        for i in range(n):
-            for j in range(n):
-                if i == j or np.isnan(p1_pct[i, j]):
-                    mat[i, j] = ""
-                else:
-                    mat[i, j] = f"{p1_pct[i,j]:.2f}% ({tie_pct[i,j]:.2f}%)"
-        df = pd.DataFrame(mat, index=seqs, columns=seqs)
-        df.index.name = "Player 1 pattern"
-        df.columns.name = "Player 2 pattern"
-        return df
-
-    cards_df = _format_str_matrix(cards_pct_p1, cards_pct_tie)
-    tricks_df = _format_str_matrix(tricks_pct_p1, tricks_pct_tie)
-    return cards_df, tricks_df, cards_pct_p1, cards_pct_tie, tricks_pct_p1, tricks_pct_tie, seqs
\ No newline at end of file
+        last_n = done[0][1] if done and done[0][0] == 0 else 0
+        atomic_save_npy(counts_cards_file, counts_cards)
+        atomic_save_npy(counts_tricks_file, counts_tricks)
+        if histograms:
+            save_histograms(card_hist_file, trick_hist_file, *hists)
+        for name, path in variant_files.items():
+            atomic_save_npy(path, variant_counts[name])
+        atomic_write_bytes(last_n_file, str(last_n).encode())
+
+    results = winrate_tables(counts_cards, counts_tricks, seqs)
+    if extra_names:
+        return results + (variant_tables(variant_counts, seqs),)
+    return results
+
+def _generate_and_score(seed_seq, size, codes, k, n_red=26, n_black=26, plan=None):
+    """
+    Worker task for streaming mode: generate one batch of decks in memory and
+    return only its count matrices. Uses the packed kernel when decks fit a word.
+    """
+    decks = generate_decks(np.random.default_rng(seed_seq), size, n_red, n_black)
+    n_cards = n_red + n_black
+    if n_cards <= 56:
+        words = decks.astype(np.int64) @ (1 << np.arange(n_cards - 1, -1, -1, dtype=np.int64))
+        return _batch_score_packed(words, codes, k, n_cards, plan=plan)
+    patterns = ((codes[:, None] >> np.arange(k - 1, -1, -1)) & 1).astype(np.uint8)
+    return _batch_score(decks, None, None, build_transition_tables(patterns), plan=plan)
+
+def verify_symmetry(decks, k: int = 3, symmetry: str = "complement", packed: bool = True,
+                    histograms: bool = True, weights=None):
+    """
+    Cross-check symmetric scoring against full scoring on a sample of decks
+    (n, n_cards). For complement symmetry each deck's colour flip is added, so
+    the sample is closed under flipping and the reconstructed counts must match
+    exactly, as they always must for swap symmetry. Raises ValueError naming
+    the outputs that differ; returns the number of decks scored.
+    """
+    decks = np.asarray(decks, dtype=np.uint8)
+    if symmetry == "complement":
+        decks = np.concatenate([decks, 1 - decks])
+    seqs = all_sequences_binary_order(k)
+    patterns = _pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs})
+    codes = _pattern_codes(patterns)
+    plan = pair_plan(codes, k, symmetry)
+    if packed and decks.shape[1] <= 56:
+        words = decks.astype(np.int64) @ (1 << np.arange(decks.shape[1] - 1, -1, -1, dtype=np.int64))
+        full = _batch_score_packed(words, codes, k, decks.shape[1], histograms, weights)
+        sym = _batch_score_packed(words, codes, k, decks.shape[1], histograms, weights, plan)
+    else:
+        tables = build_transition_tables(patterns)
+        full = _batch_score(decks, None, None, tables, histograms, weights)
+        sym = _batch_score(decks, None, None, tables, histograms, weights, plan)
+    names = ["cards p1", "cards p2", "cards tie", "tricks p1", "tricks p2", "tricks tie"]
+    names += ["card histogram", "trick histogram"] if histograms else []
+    names += ["variants"] if weights is not None else []
+    bad = [name for name, a, b in zip(names, full, sym) if not np.array_equal(a, b)]
+    if bad:
+        raise ValueError(f"{symmetry} symmetry disagrees with full scoring on {len(decks)} decks: {', '.join(bad)}")
+    return len(decks)
+
+def compute_winrate_table_streaming(
+    num_decks: int,
+    k: int = 3,
+    seed=None,
+    workers: int = None,
+    batch_size: int = 50_000,
+    symmetry: str = None,
+    tracer=None,
+):
+    """
+    Generate-and-score without touching disk: each worker builds a batch of
+    decks from its own seed stream, scores it and returns only the counts.
+    Batch i uses the same stream as batch i of create_deck_file (or
+    create_deck_data_bitarray) with the same seed and batch_size, so both paths
+    score identical decks. symmetry is as for compute_winrate_table_incremental.
+    Returns the same tuple as compute_winrate_table_incremental.
+    """
+    seqs = all_sequences_binary_order(k)
+    nseq = len(seqs)
+    codes = _pattern_codes(_pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs}))
+    plan = pair_plan(codes, k, symmetry)
+    counts_cards = np.zeros((3, nseq, nseq), dtype=np.int64)
+    counts_tricks = np.zeros((3, nseq, nseq), dtype=np.int64)
+
+    def _add_counts(result):
+        lc1, lc2, lct, lt1, lt2, ltt = result
+        counts_cards[:] += (lc1, lc2, lct)
+        counts_tricks[:] += (lt1, lt2, ltt)
+        if tracer is not None:
+            tracer.advance(int(lc1[0, 1] + lc2[0, 1] + lct[0, 1]))
+
+    batches = split_batches(num_decks, batch_size)
+    tasks = ((_generate_and_score, seed_seq, size, codes, k, 26, 26, plan)
+             for seed_seq, size in zip(batch_seeds(seed, len(batches)), batches))
+    if tracer is not None:
+        tracer.start_progress(num_decks)
+    _fold_in_pool(tasks, _add_counts, workers, tracer=tracer)
+    return winrate_tables(counts_cards, counts_tricks, seqs)
+
+def wilson_interval(successes, total, z: float = 1.96):
+    """
+    Wilson score interval for binomial proportions, elementwise.
+    Cells with no trials get the uninformative interval [0, 1].
+    """
+    successes = np.asarray(successes, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    safe = np.maximum(total, 1.0)
+    p = successes / safe
+    denom = 1 + z ** 2 / safe
+    centre = (p + z ** 2 / (2 * safe)) / denom
+    half = z * np.sqrt(p * (1 - p) / safe + z ** 2 / (4 * safe ** 2)) / denom
+    lo = np.where(total > 0, centre - half, 0.0)
+    hi = np.where(total > 0, centre + half, 1.0)
+    return lo, hi
+
+def _row_best_mask(p1_rate):
+    """
+    Cells highlighted by plot_heatmap: for each player 2 pattern (column),
+    the player 1 pattern with the highest win rate.
+    """
+    n = p1_rate.shape[0]
+    rates = np.where(np.eye(n, dtype=bool), -np.inf, p1_rate)
+    mask = np.zeros((n, n), dtype=bool)
+    mask[np.argmax(rates, axis=0), np.arange(n)] = True
+    return mask
+
+def _max_halfwidth(counts, z, focus):
+    """
+    Largest Wilson half-width of the player 1 win rate over the cells in focus
+    ("all" off-diagonal cells, or only the "best" cells plot_heatmap highlights).
+    """
+    total = counts.sum(axis=0)
+    lo, hi = wilson_interval(counts[0], total, z)
+    if focus == "best":
+        cells = _row_best_mask(counts[0] / np.maximum(total, 1))
+    else:
+        cells = ~np.eye(total.shape[0], dtype=bool)
+    return float(((hi - lo) / 2)[cells].max())
+
+def compute_winrate_table_adaptive(
+    target_halfwidth: float = 0.001,
+    focus: str = "all",
+    z: float = 1.96,
+    file_path: str = None,
+    k: int = 3,
+    seed=None,
+    workers: int = None,
+    batch_size: int = 50_000,
+    max_decks: int = 50_000_000,
+):
+    """
+    Score deck chunks only until every cell in focus has a Wilson interval
+    half-width at or below target_halfwidth (as a proportion, so 0.001 = 0.1
+    percentage points) for both cards and tricks. focus is "all" off-diagonal
+    cells or "best" for the row-best cells highlighted by plot_heatmap.
+    Decks come from file_path when given, otherwise they are generated as in
+    compute_winrate_table_streaming. Stops at max_decks (or the end of the file).
+    Returns (results, decks_used) where results matches compute_winrate_table_incremental.
+    """
+    if focus not in ("all", "best"):
+        raise ValueError(f"focus must be 'all' or 'best', got {focus!r}")
+    seqs = all_sequences_binary_order(k)
+    nseq = len(seqs)
+    seq_arrays = {s: _seq_to_array(s) for s in seqs}
+    codes = _pattern_codes(_pattern_matrix(seqs, seq_arrays))
+    counts_cards = np.zeros((3, nseq, nseq), dtype=np.int64)
+    counts_tricks = np.zeros((3, nseq, nseq), dtype=np.int64)
+    decks_used = 0
+
+    def _converged():
+        if decks_used == 0:
+            return False
+        return max(_max_halfwidth(counts_cards, z, focus),
+                   _max_halfwidth(counts_tricks, z, focus)) <= target_halfwidth
+
+    def _tasks():
+        # Checked lazily between submissions, so scoring stops once converged
+        if file_path is not None:
+            stop = min(max_decks, deck_count(file_path))
+            for lo in range(0, stop, batch_size):
+                if _converged():
+                    return
+                yield _score_file_range, file_path, lo, min(lo + batch_size, stop), codes, k
+        else:
+            batches = split_batches(max_decks, batch_size)
+            for seed_seq, size in zip(batch_seeds(seed, len(batches)), batches):
+                if _converged():
+                    return
+                yield _generate_and_score, seed_seq, size, codes, k
+
+    def _add_counts(result):
+        nonlocal decks_used
+        lc1, lc2, lct, lt1, lt2, ltt = result
+        counts_cards[:] += (lc1, lc2, lct)
+        counts_tricks[:] += (lt1, lt2, ltt)
+        decks_used = int(counts_cards[:, 0, 1].sum())
+
+    _fold_in_pool(_tasks(), _add_counts, workers)
+    return winrate_tables(counts_cards, counts_tricks, seqs), decks_used
@@ -0,0 +1,156 @@
+import io
+import json
+import argparse
+import numpy as np
+from src.checkpoint import atomic_save_npy, atomic_write_bytes
+from src.deck_file import deck_count, iter_deck_chunks, read_header, deck_file_fingerprint
+from src.score_data import (
+    all_sequences_binary_order,
+    build_transition_tables,
+    winrate_tables,
+    _batch_score,
+    _batch_score_packed,
+    _pattern_codes,
+    _pattern_matrix,
+    _seq_to_array,
+)
+
+def plan_shards(file_path: str, n_shards: int, stop: int = None):
+    """
+    Split decks [0, stop) of a deck file into n_shards contiguous ranges.
+    """
+    total = deck_count(file_path) if stop is None else min(stop, deck_count(file_path))
+    bounds = [total * i // n_shards for i in range(n_shards + 1)]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+def score_range_to_shard(file_path: str, start: int, stop: int, shard_path: str,
+                         k: int = 3, batch_size: int = 50_000):
+    """
+    Score decks [start, stop) of one deck file in this process and atomically
+    write a shard: the cards/tricks count matrices plus the range, the file's
+    deck count and parameters. Decks longer than 56 cards use the automaton kernel.
+    """
+    info = read_header(file_path)
+    stop = min(stop, info.n_decks)
+    seqs = all_sequences_binary_order(k)
+    patterns = _pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs})
+    codes = _pattern_codes(patterns)
+    tables = None if info.deck_len <= 56 else build_transition_tables(patterns)
+    counts = np.zeros((6, len(seqs), len(seqs)), dtype=np.int64)
+    for _, chunk in iter_deck_chunks(file_path, start, stop, batch_size, packed=tables is None):
+        if tables is None:
+            counts += np.array(_batch_score_packed(chunk, codes, k, info.deck_len))
+        else:
+            counts += np.array(_batch_score(chunk, None, None, tables))
+    meta = {"fingerprint": deck_file_fingerprint(file_path), "k": k, "seqs": seqs,
+            "deck_size": info.deck_len, "n_decks": info.n_decks, "start": start, "stop": stop}
+    buf = io.BytesIO()
+    np.savez(buf, counts_cards=counts[:3], counts_tricks=counts[3:], meta=np.array(json.dumps(meta)))
+    atomic_write_bytes(shard_path, buf.getvalue())
+    return meta
+
+def load_shard(shard_path: str):
+    """
+    Return (meta, counts_cards, counts_tricks) for one shard file.
+    """
+    with np.load(shard_path) as data:
+        return json.loads(str(data['meta'])), data['counts_cards'], data['counts_tricks']
+
+def merge_shards(shard_paths, require_complete: bool = True):
+    """
+    Sum any set of shards into (counts_cards, counts_tricks, seqs, coverage).
+
+    Shards may come from several deck files (told apart by fingerprint) but must
+    share k and pattern order, and shards of one file must agree on its deck
+    count. Overlapping ranges of the same file raise ValueError, as do gaps when
+    require_complete is set (each file's ranges must then tile [0, n_decks)
+    with no holes, including at the end). coverage maps fingerprint ->
+    [(start, stop)].
+    """
+    if not shard_paths:
+        raise ValueError("no shards to merge")
+    counts_cards = counts_tricks = None
+    params = None
+    ranges = {}
+    n_decks = {}
+    for path in shard_paths:
+        meta, cards, tricks = load_shard(path)
+        shard_params = (meta["k"], meta["seqs"], meta["deck_size"])
+        if params is None:
+            params = shard_params
+            counts_cards = np.zeros_like(cards)
+            counts_tricks = np.zeros_like(tricks)
+        elif shard_params != params:
+            raise ValueError(f"shard {path} was scored with different parameters")
+        counts_cards += cards
+        counts_tricks += tricks
+        ranges.setdefault(meta["fingerprint"], []).append((meta["start"], meta["stop"], path))
+        if n_decks.setdefault(meta["fingerprint"], meta.get("n_decks")) != meta.get("n_decks"):
+            raise ValueError(f"shard {path} disagrees with other shards of its file on the deck count")
+
+    coverage = {}
+    for fingerprint, file_ranges in ranges.items():
+        file_ranges.sort()
+        merged = []
+        for start, stop, path in file_ranges:
+            if merged and start < merged[-1][1]:
+                raise ValueError(f"shard {path} overlaps decks [{start}, {merged[-1][1]}) of another shard")
+            if require_complete and start != (merged[-1][1] if merged else 0):
+                raise ValueError(f"gap before shard {path}: decks [{merged[-1][1] if merged else 0}, {start}) missing")
+            if merged and start == merged[-1][1]:
+                merged[-1] = (merged[-1][0], stop)
+            else:
+                merged.append((start, stop))
+        if require_complete and merged[-1][1] != n_decks[fingerprint]:
+            if n_decks[fingerprint] is None:
+                raise ValueError(f"shard {path} does not record its file's deck count; cannot check completeness")
+            raise ValueError(f"gap after shard {path}: decks [{merged[-1][1]}, {n_decks[fingerprint]}) missing")
+        coverage[fingerprint] = merged
+    return counts_cards, counts_tricks, list(params[1]), coverage
+
+def winrate_tables_from_shards(shard_paths, require_complete: bool = True):
+    """
+    Merge shards and return the same tuple as compute_winrate_table_incremental.
+    """
+    counts_cards, counts_tricks, seqs, _ = merge_shards(shard_paths, require_complete)
+    return winrate_tables(counts_cards, counts_tricks, seqs)
+
+def main(argv=None):
+    """
+    Command line for batch schedulers:
+        python -m src.shards plan DECK_FILE N_SHARDS
+        python -m src.shards score DECK_FILE START STOP SHARD_FILE [--k K]
+        python -m src.shards merge SHARD_FILE... [--out-cards F] [--out-tricks F]
+    """
+    parser = argparse.ArgumentParser(prog="python -m src.shards")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_plan = sub.add_parser("plan")
+    p_plan.add_argument("deck_file")
+    p_plan.add_argument("n_shards", type=int)
+    p_score = sub.add_parser("score")
+    p_score.add_argument("deck_file")
+    p_score.add_argument("start", type=int)
+    p_score.add_argument("stop", type=int)
+    p_score.add_argument("shard_file")
+    p_score.add_argument("--k", type=int, default=3)
+    p_merge = sub.add_parser("merge")
+    p_merge.add_argument("shard_files", nargs="+")
+    p_merge.add_argument("--out-cards", default="data/tracking_decks/shard_counts_cards.npy")
+    p_merge.add_argument("--out-tricks", default="data/tracking_decks/shard_counts_tricks.npy")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "plan":
+        for start, stop in plan_shards(args.deck_file, args.n_shards):
+            print(start, stop)
+    elif args.cmd == "score":
+        meta = score_range_to_shard(args.deck_file, args.start, args.stop, args.shard_file, k=args.k)
+        print(f"Scored decks [{meta['start']:,}, {meta['stop']:,}) -> {args.shard_file}")
+    else:
+        counts_cards, counts_tricks, _, coverage = merge_shards(args.shard_files)
+        atomic_save_npy(args.out_cards, counts_cards)
+        atomic_save_npy(args.out_tricks, counts_tricks)
+        for fingerprint, covered in coverage.items():
+            print(f"{fingerprint[:12]}: decks {covered}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import time
+import itertools
+from collections import namedtuple
+import numpy as np
+from src.create_data import generate_decks, split_batches
+from src.score_data import (
+    all_sequences_binary_order,
+    build_transition_tables,
+    _batch_score,
+    _batch_score_packed,
+    _fold_in_pool,
+    _pattern_codes,
+    _pattern_matrix,
+    _row_best_mask,
+    _seq_to_array,
+)
+from src.symmetry import pair_plan
+from src.variants import BUILTIN, extra_variants, variant_weights
+
+# One simulated configuration; every variant of a configuration is scored in the same pass
+SweepConfig = namedtuple("SweepConfig", ["deck_len", "n_red", "k"])
+
+def sweep_configs(deck_lens, red_counts=None, ks=(3,)):
+    """
+    Every (deck_len, n_red, k) configuration of the grid, skipping impossible
+    ones (more red cards than the deck holds, patterns as long as the deck).
+    red_counts=None uses a balanced split (deck_len // 2 red) for each length.
+    """
+    configs = []
+    for deck_len, k in itertools.product(deck_lens, ks):
+        for n_red in ([deck_len // 2] if red_counts is None else red_counts):
+            if 0 <= n_red <= deck_len and k < deck_len:
+                configs.append(SweepConfig(deck_len, n_red, k))
+    return configs
+
+def _sweep_batch(config_id, seed_seq, size, config, weights, plan):
+    """
+    Worker task: generate one batch of decks for a configuration and score
+    every pattern pair (and extra variant) on it. Returns (config_id, worker
+    seconds, counts) with counts stacked as (6 + 3 * n_variants, n, n).
+    """
+    start = time.perf_counter()
+    deck_len, n_red, k = config
+    decks = generate_decks(np.random.default_rng(seed_seq), size, n_red, deck_len - n_red)
+    seqs = all_sequences_binary_order(k)
+    patterns = _pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs})
+    if deck_len <= 56:
+        words = decks.astype(np.int64) @ (1 << np.arange(deck_len - 1, -1, -1, dtype=np.int64))
+        result = _batch_score_packed(words, _pattern_codes(patterns), k, deck_len, weights=weights, plan=plan)
+    else:
+        result = _batch_score(decks, None, None, build_transition_tables(patterns), weights=weights, plan=plan)
+    counts = np.array(result[:6])
+    if weights is not None:
+        counts = np.concatenate([counts, result[6].reshape(-1, *counts.shape[1:])])
+    return config_id, time.perf_counter() - start, counts
+
+def _tidy_rows(config, variants, counts, decks, seconds):
+    """
+    Long-format DataFrame rows for one configuration: one row per variant and
+    ordered pattern pair, with counts, percentages, whether player 1's pattern
+    is the best response to player 2's (as highlighted by plot_heatmap), and
+    the configuration's timing.
+    """
+    import pandas as pd
+    seqs = np.asarray(all_sequences_binary_order(config.k))
+    n = len(seqs)
+    i, j = np.nonzero(~np.eye(n, dtype=bool))
+    extra = extra_variants(variants)
+    frames = []
+    for name in variants:
+        if name in BUILTIN:
+            c = counts[0:3] if name == "cards" else counts[3:6]
+        else:
+            c = counts[6 + 3 * extra.index(name):9 + 3 * extra.index(name)]
+        total = c.sum(axis=0)
+        rate = np.divide(c[0], total, out=np.full(total.shape, np.nan), where=total > 0)
+        tie = np.divide(c[2], total, out=np.full(total.shape, np.nan), where=total > 0)
+        frames.append(pd.DataFrame({
+            "deck_len": config.deck_len, "n_red": config.n_red, "n_black": config.deck_len - config.n_red,
+            "k": config.k, "variant": name,
+            "p1_pattern": seqs[i], "p2_pattern": seqs[j],
+            "p1_wins": c[0][i, j], "p2_wins": c[1][i, j], "ties": c[2][i, j],
+            "p1_win_pct": np.round(rate[i, j] * 100, 4), "tie_pct": np.round(tie[i, j] * 100, 4),
+            "best_response": _row_best_mask(np.nan_to_num(rate, nan=-1.0))[i, j],
+            "decks": decks, "score_seconds": seconds,
+        }))
+    return frames
+
+def run_sweep(
+    deck_lens=(52,),
+    red_counts=None,
+    ks=(3,),
+    variants=("cards", "tricks"),
+    num_decks: int = 100_000,
+    seed=None,
+    workers: int = None,
+    batch_size: int = 50_000,
+    symmetry: str = "swap",
+    tracer=None,
+):
+    """
+    Simulate num_decks decks for every (deck_len, n_red, k) configuration of
+    the grid (see sweep_configs) and score every requested variant in the same
+    pass. All configurations' batches go through one process pool, so workers
+    and their warmed kernels are reused from cell to cell instead of being
+    restarted per configuration.
+    symmetry is passed to src.symmetry.pair_plan; "complement" only applies to
+    balanced configurations, the others fall back to "swap".
+    Returns a long-format DataFrame with one row per (configuration, variant,
+    ordered pattern pair); score_seconds is the summed worker time of the
+    configuration's pass, shared by its variants.
+    """
+    import pandas as pd
+    configs = sweep_configs(deck_lens, red_counts, ks)
+    if not configs:
+        raise ValueError("the sweep grid has no valid configuration")
+    variants = list(dict.fromkeys(variants))
+    extra = extra_variants(variants)
+    weights = variant_weights(extra) if extra else None
+    config_seeds = np.random.SeedSequence(seed).spawn(len(configs))
+    batches = split_batches(num_decks, batch_size)
+    plans = []
+    for config in configs:
+        seqs = all_sequences_binary_order(config.k)
+        codes = _pattern_codes(_pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs}))
+        balanced = 2 * config.n_red == config.deck_len
+        plans.append(pair_plan(codes, config.k, symmetry if symmetry != "complement" or balanced else "swap"))
+    counts = [None] * len(configs)
+    seconds = [0.0] * len(configs)
+
+    def _tasks():
+        for c, config in enumerate(configs):
+            for seed_seq, size in zip(config_seeds[c].spawn(len(batches)), batches):
+                yield _sweep_batch, c, seed_seq, size, config, weights, plans[c]
+
+    def _add_counts(result):
+        c, elapsed, part = result
+        counts[c] = part if counts[c] is None else counts[c] + part
+        seconds[c] += elapsed
+        if tracer is not None:
+            tracer.advance(int(part[:3, 0, 1].sum()))
+
+    if tracer is not None:
+        tracer.start_progress(num_decks * len(configs))
+    _fold_in_pool(_tasks(), _add_counts, workers, tracer=tracer)
+    frames = []
+    for config, c, s in zip(configs, counts, seconds):
+        frames += _tidy_rows(config, variants, c, num_decks, round(s, 4))
+    return pd.concat(frames, ignore_index=True)
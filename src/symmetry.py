@@ -0,0 +1,82 @@
+from collections import namedtuple
+import numpy as np
+
+# How a game against (s1, s2) relates to other pattern pairs:
+#   swap        (s2, s1) is the same game with the players' seats exchanged,
+#               so its counts follow exactly from (s1, s2) on the same decks.
+#   complement  flipping every card's colour maps (s1, s2) on a deck to
+#               (~s1, ~s2) on the flipped deck. A balanced (n_red == n_black)
+#               deck is as likely as its flip, so both pairs have the same
+#               distribution; the counts agree exactly only when the scored
+#               decks are closed under flipping.
+SYMMETRIES = (None, "swap", "complement")
+
+PairPlan = namedtuple("PairPlan", ["pairs", "dst", "src", "swapped", "symmetry"])
+
+def pair_plan(codes, k: int, symmetry: str = None) -> PairPlan:
+    """
+    Decide which ordered pattern pairs the kernels play and how the rest are
+    filled in. symmetry=None plays every off-diagonal pair; "swap" plays one
+    pair of each {(s1, s2), (s2, s1)}; "complement" also folds in the colour
+    complement, one pair per class of up to four. pairs (n_played, 2) are the
+    played pairs; for every ordered pair dst (n_ordered, 2) the counts come from
+    src, with the players exchanged where swapped.
+    """
+    if symmetry not in SYMMETRIES:
+        raise ValueError(f"symmetry must be one of {SYMMETRIES}, got {symmetry!r}")
+    codes = np.asarray(codes, dtype=np.int64)
+    nseq = codes.shape[0]
+    index = {int(c): i for i, c in enumerate(codes)}
+    if symmetry == "complement":
+        missing = [int(c) for c in codes if int(c) ^ ((1 << k) - 1) not in index]
+        if missing:
+            raise ValueError("complement symmetry needs every pattern's complement in the pattern set")
+        comp = np.array([index[int(c) ^ ((1 << k) - 1)] for c in codes], dtype=np.int64)
+    dst, src, swapped = [], [], []
+    for i in range(nseq):
+        for j in range(nseq):
+            if i == j:
+                continue
+            # Exact relations take precedence over the statistical one
+            candidates = [((i, j), False)]
+            if symmetry is not None:
+                candidates.append(((j, i), True))
+            if symmetry == "complement":
+                candidates += [((comp[i], comp[j]), False), ((comp[j], comp[i]), True)]
+            rep = min(pair for pair, _ in candidates)
+            dst.append((i, j))
+            src.append(rep)
+            swapped.append(next(swap for pair, swap in candidates if pair == rep))
+    src = np.array(src, dtype=np.int64).reshape(-1, 2)
+    pairs = np.unique(src, axis=0)
+    return PairPlan(pairs, np.array(dst, dtype=np.int64).reshape(-1, 2), src,
+                    np.array(swapped, dtype=bool), symmetry)
+
+def expand_counts(counts, plan: PairPlan, swap_rows):
+    """
+    Fill every ordered pair of counts (..., n, n) from the played pairs.
+    swap_rows reorders the axis just before the two pattern axes (the
+    p1/p2/tie rows) for pairs whose players are exchanged.
+    """
+    out = np.zeros_like(counts)
+    (di, dj), (si, sj) = plan.dst.T, plan.src.T
+    gathered = counts[..., si, sj]
+    gathered[..., plan.swapped] = gathered[..., swap_rows, :][..., plan.swapped]
+    out[..., di, dj] = gathered
+    return out
+
+def expand_histograms(card_hist, trick_hist, plan: PairPlan):
+    """
+    Fill every ordered pair of the (n, n, ...) histograms: exchanging the
+    players negates the card difference and transposes the trick counts.
+    """
+    (di, dj), (si, sj) = plan.dst.T, plan.src.T
+    card = card_hist[si, sj]
+    trick = trick_hist[si, sj]
+    card[plan.swapped] = card[plan.swapped][:, ::-1]
+    trick[plan.swapped] = trick[plan.swapped].transpose(0, 2, 1)
+    card_out = np.zeros_like(card_hist)
+    trick_out = np.zeros_like(trick_hist)
+    card_out[di, dj] = card
+    trick_out[di, dj] = trick
+    return card_out, trick_out
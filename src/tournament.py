@@ -0,0 +1,249 @@
+import itertools
+import numpy as np
+import numba as nb
+from src.deck_file import read_header, read_packed_range
+from src.create_data import generate_decks, batch_seeds, split_batches
+from src.score_data import (
+    all_sequences_binary_order,
+    _fold_in_pool,
+    _highest_bit,
+    _match_mask,
+    _pattern_codes,
+    _pattern_matrix,
+    _seq_to_array,
+)
+
+def player_tuples(nseq: int, n_players: int) -> np.ndarray:
+    """
+    Every ordered choice of n_players distinct patterns, shape (n_tuples, n_players).
+    Patterns of the same length can only complete at the same card if they are
+    equal, so distinct patterns never tie for a trick.
+    """
+    return np.array(list(itertools.permutations(range(nseq), n_players)), dtype=np.int64).reshape(-1, n_players)
+
+def player_sets(nseq: int, n_players: int) -> np.ndarray:
+    """
+    Every set of n_players distinct patterns, in ascending order, shape (n_sets, n_players).
+    Reordering the seats of a set replays the same game, so only sets are scored.
+    """
+    return np.array(list(itertools.combinations(range(nseq), n_players)), dtype=np.int64).reshape(-1, n_players)
+
+@nb.njit(cache=True)
+def _outcome(scores: np.ndarray) -> int:
+    """
+    Slot with the strictly highest score, or len(scores) for a tie at the top.
+    """
+    best = 0
+    tied = False
+    for p in range(1, scores.shape[0]):
+        if scores[p] > scores[best]:
+            best = p
+            tied = False
+        elif scores[p] == scores[best]:
+            tied = True
+    return scores.shape[0] if tied else best
+
+@nb.njit(parallel=True, cache=True)
+def _score_sets_packed_jit(words: np.ndarray, codes: np.ndarray, sets: np.ndarray, k: int,
+                           n_cards: int, n_threads: int) -> np.ndarray:
+    """
+    Play every pattern set against every packed deck. Match masks, and which
+    pattern owns each match position, are found once per deck and shared by all
+    sets; each set then only visits its own match positions, earliest first.
+    Returns counts shape (2, n_players + 1, n_sets): cards then tricks, with
+    row r counting wins of the set's r-th pattern and the last row ties.
+    """
+    n_decks = words.shape[0]
+    nseq = codes.shape[0]
+    n_sets, n_players = sets.shape
+    n_blocks = max(1, min(n_threads, n_decks))
+    partial = np.zeros((n_blocks, 2, n_players + 1, n_sets), dtype=np.int64)
+    for b in nb.prange(n_blocks):
+        lo = b * n_decks // n_blocks
+        hi = (b + 1) * n_decks // n_blocks
+        masks = np.zeros(nseq, dtype=np.int64)
+        owner = np.zeros(64, dtype=np.int64)
+        slot = np.zeros(nseq, dtype=np.int64)
+        cards = np.zeros(n_players, dtype=np.int64)
+        tricks = np.zeros(n_players, dtype=np.int64)
+        for d in range(lo, hi):
+            for i in range(nseq):
+                m = _match_mask(words[d], codes[i], k, n_cards)
+                masks[i] = m
+                while m:
+                    bit = _highest_bit(m)
+                    owner[bit] = i
+                    m ^= 1 << bit
+            for t in range(n_sets):
+                both = 0
+                for p in range(n_players):
+                    both |= masks[sets[t, p]]
+                    slot[sets[t, p]] = p
+                    cards[p] = 0
+                    tricks[p] = 0
+                last_award_idx = 0
+                while last_award_idx <= n_cards - k:
+                    cand = both & ((1 << (n_cards - last_award_idx)) - 1)
+                    if cand == 0:
+                        break
+                    bit = _highest_bit(cand)
+                    end = n_cards - 1 - bit + k - 1
+                    p = slot[owner[bit]]
+                    cards[p] += end - last_award_idx + 1
+                    tricks[p] += 1
+                    last_award_idx = end + 1
+                partial[b, 0, _outcome(cards), t] += 1
+                partial[b, 1, _outcome(tricks), t] += 1
+    counts = np.zeros((2, n_players + 1, n_sets), dtype=np.int64)
+    for b in range(n_blocks):
+        counts += partial[b]
+    return counts
+
+def _expand_to_tuples(set_counts, sets, tuples):
+    """
+    Spread (n_players + 1, n_sets) counts per set over every seat order:
+    returns (n_players + 1, n_tuples) counts indexed by seat.
+    """
+    n_players = tuples.shape[1]
+    set_index = {tuple(row): i for i, row in enumerate(sets)}
+    of_set = np.array([set_index[tuple(row)] for row in np.sort(tuples, axis=1)], dtype=np.int64)
+    counts = np.zeros((n_players + 1, len(tuples)), dtype=np.int64)
+    counts[n_players] = set_counts[n_players, of_set]
+    for r in range(n_players):
+        # seat of the set's r-th pattern within each tuple
+        seat = np.argmax(tuples == sets[of_set, r][:, None], axis=1)
+        counts[seat, np.arange(len(tuples))] = set_counts[r, of_set]
+    return counts
+
+def _batch_score_sets(words_chunk, codes, sets, k, n_cards=52):
+    """
+    Set counterpart of _batch_score_packed: returns (2, n_players + 1, n_sets) counts.
+    """
+    words_chunk = np.ascontiguousarray(words_chunk, dtype=np.int64)
+    return _score_sets_packed_jit(words_chunk, codes, sets, k, n_cards, nb.get_num_threads())
+
+def _batch_score_tuples(words_chunk, codes, tuples, k, n_cards=52):
+    """
+    Score a chunk for every player tuple: returns (cards, tricks) counts,
+    each shape (n_players + 1, n_tuples).
+    """
+    sets = player_sets(codes.shape[0], tuples.shape[1])
+    counts = _batch_score_sets(words_chunk, codes, sets, k, n_cards)
+    return _expand_to_tuples(counts[0], sets, tuples), _expand_to_tuples(counts[1], sets, tuples)
+
+def _score_file_range_sets(file_path, lo, hi, codes, sets, k):
+    """
+    Worker task: score decks [lo, hi) of a deck file for every pattern set.
+    """
+    words = read_packed_range(file_path, lo, hi)
+    return _batch_score_sets(words, codes, sets, k, read_header(file_path).deck_len)
+
+def _generate_and_score_sets(seed_seq, size, codes, sets, k, n_red=26, n_black=26):
+    """
+    Worker task: generate one batch of decks in memory and score every pattern set.
+    """
+    decks = generate_decks(np.random.default_rng(seed_seq), size, n_red, n_black)
+    n_cards = n_red + n_black
+    words = decks.astype(np.int64) @ (1 << np.arange(n_cards - 1, -1, -1, dtype=np.int64))
+    return _batch_score_sets(words, codes, sets, k, n_cards)
+
+def compute_tournament_counts(
+    n_players: int = 3,
+    k: int = 3,
+    file_path: str = None,
+    num_decks: int = None,
+    seed=None,
+    n_red: int = 26,
+    n_black: int = 26,
+    workers: int = None,
+    batch_size: int = 50_000,
+    tracer=None,
+):
+    """
+    Score n-player games, one per ordered tuple of distinct patterns, in a single
+    pass over the decks. Each set of patterns is played once per deck and
+    credited to every seat order. Decks come from file_path (the first
+    num_decks, or all) or, without a file, num_decks decks are generated as in
+    compute_winrate_table_streaming. Decks must fit a packed word (<= 56 cards).
+    Returns (counts_cards, counts_tricks, tuples, seqs); counts are shaped
+    (n_players + 1, n_tuples) with seat p's wins in row p and ties in the last row.
+    """
+    if n_players < 2:
+        raise ValueError(f"need at least 2 players, got {n_players}")
+    seqs = all_sequences_binary_order(k)
+    if n_players > len(seqs):
+        raise ValueError(f"{n_players} players cannot pick distinct patterns from {len(seqs)}")
+    codes = _pattern_codes(_pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs}))
+    sets = player_sets(len(seqs), n_players)
+    counts = np.zeros((2, n_players + 1, len(sets)), dtype=np.int64)
+
+    if file_path is not None:
+        info = read_header(file_path)
+        n_cards = info.deck_len
+        stop = info.n_decks if num_decks is None else min(num_decks, info.n_decks)
+        tasks = ((_score_file_range_sets, file_path, lo, min(lo + batch_size, stop), codes, sets, k)
+                 for lo in range(0, stop, batch_size))
+    else:
+        if num_decks is None:
+            raise ValueError("num_decks is required when no deck file is given")
+        n_cards = n_red + n_black
+        stop = num_decks
+        batches = split_batches(num_decks, batch_size)
+        tasks = ((_generate_and_score_sets, seed_seq, size, codes, sets, k, n_red, n_black)
+                 for seed_seq, size in zip(batch_seeds(seed, len(batches)), batches))
+    if n_cards > 56:
+        raise ValueError(f"tournament scoring needs decks of at most 56 cards, got {n_cards}")
+
+    def _add_counts(result):
+        counts[:] += result
+        if tracer is not None:
+            tracer.advance(int(result[0, :, 0].sum()))
+
+    if tracer is not None:
+        tracer.start_progress(stop)
+    _fold_in_pool(tasks, _add_counts, workers, tracer=tracer)
+    tuples = player_tuples(len(seqs), n_players)
+    return _expand_to_tuples(counts[0], sets, tuples), _expand_to_tuples(counts[1], sets, tuples), tuples, seqs
+
+def tournament_table(counts, tuples, seqs):
+    """
+    Long-format DataFrame with one row per tuple: each seat's pattern, each
+    seat's win % and the tie %.
+    """
+    import pandas as pd
+    n_players = tuples.shape[1]
+    total = counts.sum(axis=0)
+    pct = np.divide(counts, total, out=np.full(counts.shape, np.nan), where=total > 0) * 100
+    seqs = np.asarray(seqs)
+    df = pd.DataFrame({f"Player {p + 1} pattern": seqs[tuples[:, p]] for p in range(n_players)})
+    for p in range(n_players):
+        df[f"Player {p + 1} win %"] = np.round(pct[p], 4)
+    df["Tie %"] = np.round(pct[n_players], 4)
+    return df
+
+def seat_matrices(counts, tuples, nseq: int):
+    """
+    Collapse n-player counts to plot_heatmap's (p1_pct, tie_pct) layout:
+    entry [i, j] is player 1's win (and tie) % with pattern i against player 2
+    with pattern j, pooled over every choice of the remaining players' patterns.
+    """
+    n_players = tuples.shape[1]
+    wins = np.zeros((nseq, nseq))
+    ties = np.zeros((nseq, nseq))
+    total = np.zeros((nseq, nseq))
+    np.add.at(wins, (tuples[:, 0], tuples[:, 1]), counts[0])
+    np.add.at(ties, (tuples[:, 0], tuples[:, 1]), counts[n_players])
+    np.add.at(total, (tuples[:, 0], tuples[:, 1]), counts.sum(axis=0))
+    p1_pct = np.divide(wins, total, out=np.full_like(wins, np.nan), where=total > 0) * 100
+    tie_pct = np.divide(ties, total, out=np.full_like(ties, np.nan), where=total > 0) * 100
+    return np.round(p1_pct, 4), np.round(tie_pct, 4)
+
+def compute_tournament_tables(n_players: int = 3, k: int = 3, **kwargs):
+    """
+    compute_tournament_counts plus its summaries: returns (cards_df, tricks_df,
+    cards_pct_p1, cards_pct_tie, tricks_pct_p1, tricks_pct_tie, seqs) where the
+    DataFrames are tournament_table rows and the matrices are seat_matrices.
+    """
+    counts_cards, counts_tricks, tuples, seqs = compute_tournament_counts(n_players, k, **kwargs)
+    return (tournament_table(counts_cards, tuples, seqs), tournament_table(counts_tricks, tuples, seqs),
+            *seat_matrices(counts_cards, tuples, len(seqs)), *seat_matrices(counts_tricks, tuples, len(seqs)), seqs)
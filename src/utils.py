@@ -1,5 +1,9 @@
+import os
+import csv
+import json
 import time
 import tracemalloc
+from contextlib import contextmanager
 from functools import wraps
 
 class Debugger:
@@ -16,4 +20,129 @@ class Debugger:
             print(f"Function `{func.__name__}` executed in {end_time - start_time:.6f} seconds")
             print(f"Peak memory usage: {peak / 1024:.2f} KiB")
             return result
-        return wrapper
\ No newline at end of file
+        return wrapper
+
+def current_rss_kib() -> float:
+    """
+    Resident set size of this process in KiB (peak RSS where /proc is unavailable).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def traced_call(fn, *args):
+    """
+    Run fn(*args) in a worker and return (result, record) with the worker's pid,
+    wall-clock start/end and RSS, for Tracer.record_chunk in the parent.
+    """
+    start = time.time()
+    result = fn(*args)
+    end = time.time()
+    return result, {"pid": os.getpid(), "task": fn.__name__, "start": start, "end": end,
+                    "rss_kib": current_rss_kib()}
+
+
+class Tracer:
+    """
+    Per-stage and per-chunk timings for a pipeline run, including work done in
+    pool workers. Stages are timed with `with tracer.stage(name, n_decks=...)`;
+    worker tasks report through traced_call/record_chunk. Export with to_json/to_csv.
+    """
+
+    def __init__(self, live=True):
+        self.live = live
+        self.created = time.time()
+        self.stages = []
+        self.chunks = []
+        self.total_decks = None
+        self.decks_done = 0
+
+    @contextmanager
+    def stage(self, name, n_decks=None):
+        record = {"stage": name, "start": time.time(), "n_decks": n_decks,
+                  "rss_start_kib": current_rss_kib()}
+        try:
+            yield record
+        finally:
+            record["end"] = time.time()
+            record["seconds"] = record["end"] - record["start"]
+            record["rss_end_kib"] = current_rss_kib()
+            if n_decks:
+                record["decks_per_s"] = n_decks / record["seconds"] if record["seconds"] > 0 else None
+            self.stages.append(record)
+            if self.live:
+                rate = f", {record['decks_per_s']:,.0f} decks/s" if record.get("decks_per_s") else ""
+                print(f"[trace] {name}: {record['seconds']:.3f}s{rate}")
+
+    def start_progress(self, total_decks):
+        self.total_decks = total_decks
+        self.decks_done = 0
+
+    def record_chunk(self, record):
+        self.chunks.append(dict(record, seconds=record["end"] - record["start"], n_decks=None))
+
+    def advance(self, n_decks):
+        """
+        Attribute n_decks to the most recent chunk and update live progress.
+        """
+        if self.chunks:
+            self.chunks[-1]["n_decks"] = n_decks
+        self.decks_done += n_decks
+        if self.live and self.total_decks:
+            elapsed = time.time() - self.created
+            print(f"\r[trace] {self.decks_done:,}/{self.total_decks:,} decks "
+                  f"({self.decks_done / max(elapsed, 1e-9):,.0f} decks/s)", end="",
+                  flush=True)
+            if self.decks_done >= self.total_decks:
+                print()
+
+    def summary(self):
+        """
+        Aggregate view: stage durations, chunk throughput and worker utilisation
+        (busy time summed over workers / (workers x span of their chunks)).
+        """
+        out = {"stages": {s["stage"]: s["seconds"] for s in self.stages}}
+        if self.chunks:
+            pids = {c["pid"] for c in self.chunks}
+            span = max(c["end"] for c in self.chunks) - min(c["start"] for c in self.chunks)
+            busy = sum(c["seconds"] for c in self.chunks)
+            decks = sum(c["n_decks"] or 0 for c in self.chunks)
+            out.update({
+                "chunks": len(self.chunks),
+                "workers": len(pids),
+                "worker_utilisation": busy / (len(pids) * span) if span > 0 else None,
+                "chunk_decks_per_s": decks / busy if busy > 0 else None,
+                "max_worker_rss_kib": max(c["rss_kib"] for c in self.chunks),
+            })
+        return out
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(), "stages": self.stages, "chunks": self.chunks},
+                      f, indent=2)
+
+    def to_csv(self, path):
+        """
+        One row per stage and per chunk, times relative to tracer creation.
+        """
+        fields = ["kind", "name", "pid", "start", "end", "seconds", "n_decks", "rss_kib"]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for s in self.stages:
+                writer.writerow({"kind": "stage", "name": s["stage"], "pid": os.getpid(),
+                                 "start": s["start"] - self.created, "end": s["end"] - self.created,
+                                 "seconds": s["seconds"], "n_decks": s["n_decks"],
+                                 "rss_kib": s["rss_end_kib"]})
+            for c in self.chunks:
+                writer.writerow({"kind": "chunk", "name": c["task"], "pid": c["pid"],
+                                 "start": c["start"] - self.created, "end": c["end"] - self.created,
+                                 "seconds": c["seconds"], "n_decks": c["n_decks"],
+                                 "rss_kib": c["rss_kib"]})
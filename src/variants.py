@@ -0,0 +1,54 @@
+from collections import namedtuple
+import numpy as np
+
+# Per-player game statistics a variant can weigh, in kernel order
+STATS = ("cards", "tricks", "first_trick", "last_trick")
+
+Variant = namedtuple("Variant", ["name", "title", "weights"])
+
+VARIANTS = {}
+
+def register_variant(name: str, title: str, cards: int = 0, tricks: int = 0,
+                     first_trick: int = 0, last_trick: int = 0) -> Variant:
+    """
+    Register a scoring variant. Each player's score is the weighted sum of the
+    cards they won, the tricks they won, and whether they took the first and
+    the last trick; the higher score wins the game and equal scores tie.
+    title is used in heatmap titles ("Player 1 Win % by <title>").
+    """
+    weights = (cards, tricks, first_trick, last_trick)
+    if not any(weights):
+        raise ValueError(f"variant {name!r} needs at least one non-zero weight")
+    variant = Variant(name, title, weights)
+    VARIANTS[name] = variant
+    return variant
+
+# cards and tricks are always scored by the kernels; they are registered so
+# every variant can be looked up by name
+register_variant("cards", "Cards", cards=1)
+register_variant("tricks", "Tricks", tricks=1)
+register_variant("penney", "First Trick (Penney)", first_trick=1)
+register_variant("last_trick", "Last Trick", last_trick=1)
+# Tricks never exceed 1,000 in a deck, so cards decide and tricks break ties
+register_variant("cards_then_tricks", "Cards, Tricks Tiebreak", cards=1_000, tricks=1)
+
+BUILTIN = ("cards", "tricks")
+
+def extra_variants(names) -> list:
+    """
+    Validate variant names and return those scored in addition to cards and
+    tricks, in the given order without duplicates.
+    """
+    extra = []
+    for name in names:
+        if name not in VARIANTS:
+            raise ValueError(f"unknown variant {name!r}; registered: {', '.join(VARIANTS)}")
+        if name not in BUILTIN and name not in extra:
+            extra.append(name)
+    return extra
+
+def variant_weights(names) -> np.ndarray:
+    """
+    Weight matrix (n_variants, len(STATS)) passed to the scoring kernels.
+    """
+    return np.array([VARIANTS[name].weights for name in names], dtype=np.int64).reshape(-1, len(STATS))
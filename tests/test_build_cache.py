@@ -0,0 +1,71 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.build_cache import BuildCache, input_digest
+from src.score_data import winrate_tables, all_sequences_binary_order
+from src.utils import Tracer
+from src import run_experiment
+
+
+class TestBuildCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_digest_and_prune(self):
+        a = np.arange(6).reshape(2, 3)
+        self.assertEqual(input_digest(a, title="x"), input_digest(a.copy(), title="x"))
+        self.assertNotEqual(input_digest(a, title="x"), input_digest(a, title="y"))
+        self.assertNotEqual(input_digest(a), input_digest(a.astype(np.int32)))
+        cache = BuildCache("manifest.json")
+        for name in ("old.csv", "new.csv", "other.csv"):
+            open(name, "w").close()
+        cache.record("old.csv", "d1", "main")
+        cache.record("new.csv", "d2", "main")
+        cache.record("other.csv", "d3", "stream")
+        cache.save()
+        cache = BuildCache("manifest.json")
+        self.assertTrue(cache.is_fresh("new.csv", "d2"))
+        self.assertFalse(cache.is_fresh("new.csv", "d9"))
+        self.assertEqual(cache.prune("main", ["new.csv"]), ["old.csv"])
+        self.assertFalse(os.path.exists("old.csv"))
+        self.assertTrue(os.path.exists("other.csv"))
+
+    def test_unchanged_results_are_not_rendered_again(self):
+        seqs = all_sequences_binary_order(3)
+        rng = np.random.default_rng(0)
+        counts = rng.integers(0, 100, (6, 8, 8))
+        results = winrate_tables(counts[:3], counts[3:], seqs)
+        run_experiment.save_outputs(*results, 1000, group="main", render_workers=1)
+        csv_path, plot_path = "data/tables/winrates_cards_n1000.csv", "data/plots/heatmap_cards_n1000.png"
+        stamps = {p: os.stat(p).st_mtime_ns for p in (csv_path, plot_path)}
+        self.assertEqual(run_experiment.build_outputs([], []), [])
+
+        run_experiment.save_outputs(*results, 1000, group="main", render_workers=1)
+        self.assertEqual({p: os.stat(p).st_mtime_ns for p in stamps}, stamps)
+
+        # New results under a new deck count replace the old outputs of the group
+        counts[3:] += 1
+        run_experiment.save_outputs(*winrate_tables(counts[:3], counts[3:], seqs), 2000, group="main",
+                                    render_workers=1)
+        self.assertEqual(sorted(os.listdir("data/plots")), ["heatmap_cards_n2000.png", "heatmap_tricks_n2000.png"])
+        self.assertEqual(sorted(os.listdir("data/tables")), ["winrates_cards_n2000.csv", "winrates_tricks_n2000.csv"])
+
+    def test_only_latest_traces_kept(self):
+        os.makedirs(run_experiment.TRACES_DIR)
+        for i in range(4):
+            for ext in (".json", ".csv"):
+                open(os.path.join(run_experiment.TRACES_DIR, f"trace_2000010{i}_000000{ext}"), "w").close()
+        run_experiment.export_trace(Tracer(live=False), keep=3)
+        stems = sorted({os.path.splitext(f)[0] for f in os.listdir(run_experiment.TRACES_DIR)})
+        self.assertEqual(len(os.listdir(run_experiment.TRACES_DIR)), 6)
+        self.assertEqual(stems[:2], ["trace_20000102_000000", "trace_20000103_000000"])
+
+
+if __name__ == '__main__':
+    unittest.main()
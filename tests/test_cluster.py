@@ -0,0 +1,93 @@
+import unittest
+import os
+import socket
+import tempfile
+import threading
+import numpy as np
+from src.create_data import create_deck_file, generate_decks, stream_seed
+from src.deck_file import read_deck_range
+from src.score_data import _batch_score, _seq_to_array, all_sequences_binary_order, warm_kernels
+from src.cluster import (
+    Coordinator, distributed_counts, recv_msg, run_worker, seed_units, send_msg, _npy_bytes, PROTOCOL,
+)
+
+
+def direct_counts(decks):
+    seqs = all_sequences_binary_order(3)
+    return np.array(_batch_score(decks, seqs, {s: _seq_to_array(s) for s in seqs}))
+
+
+class TestCluster(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # In-process workers score on threads; start numba's thread pool on the
+        # main thread first (a TBB pool first started on a thread hangs at exit)
+        warm_kernels()
+
+    def test_local_worker_processes_match_single_node(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, 'decks.bin')
+        create_deck_file(path, 900, seed=2, batch_size=100)
+        counts, seqs = distributed_counts(path, k=3, batch_size=200, local_workers=2, timeout=120)
+        np.testing.assert_array_equal(counts, direct_counts(read_deck_range(path, 0, 900)))
+
+    def test_units_of_dead_workers_are_reassigned(self):
+        units = seed_units(300, seed=8, batch_size=100)
+        coordinator = Coordinator(units, unit_timeout=30)
+        host, port = coordinator.address
+
+        def _dead_worker():
+            # Takes a unit and disconnects without answering
+            with socket.create_connection((host, port)) as sock:
+                send_msg(sock, {"type": "hello", "protocol": PROTOCOL})
+                recv_msg(sock)
+
+        scored = []
+        worker = threading.Thread(target=lambda: (_dead_worker(), scored.append(run_worker(host, port))))
+        worker.start()
+        counts = coordinator.serve(timeout=120)
+        worker.join()
+        self.assertEqual(scored, [3])
+        self.assertGreaterEqual(coordinator.reassigned, 1)
+        decks = np.concatenate([generate_decks(np.random.default_rng(stream_seed(units[0]["entropy"], i)), 100)
+                                for i in range(3)])
+        np.testing.assert_array_equal(counts, direct_counts(decks))
+
+    def test_bad_results_are_rejected_and_requeued(self):
+        units = seed_units(300, seed=8, batch_size=100)
+        coordinator = Coordinator(units, unit_timeout=30)
+        host, port = coordinator.address
+
+        def _bad_worker(result):
+            # Answers its unit with counts that must not reach the totals
+            with socket.create_connection((host, port)) as sock:
+                send_msg(sock, {"type": "hello", "protocol": PROTOCOL})
+                header, _ = recv_msg(sock)
+                send_msg(sock, {"type": "result", "id": header["id"]}, _npy_bytes(result))
+                with self.assertRaises(ConnectionError):
+                    recv_msg(sock)
+
+        bad_results = [np.ones(1, dtype=np.int64),                  # broadcasts into the totals
+                       np.zeros((6, 16, 16), dtype=np.int64),       # scored with another k
+                       np.zeros((6, 8, 8), dtype=np.int64),         # right shape, no decks
+                       np.full((6, 8, 8), 100 / 6)]                 # not counts
+
+        def _workers():
+            for result in bad_results:
+                _bad_worker(result)
+            run_worker(host, port)
+
+        worker = threading.Thread(target=_workers)
+        worker.start()
+        counts = coordinator.serve(timeout=120)
+        worker.join()
+        self.assertEqual(coordinator.reassigned, len(bad_results))
+        decks = np.concatenate([generate_decks(np.random.default_rng(stream_seed(units[0]["entropy"], i)), 100)
+                                for i in range(3)])
+        np.testing.assert_array_equal(counts, direct_counts(decks))
+
+
+if __name__ == '__main__':
+    unittest.main()
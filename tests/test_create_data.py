@@ -0,0 +1,56 @@
+import unittest
+import io
+import time
+import threading
+import numpy as np
+from src.create_data import generate_decks, batch_seeds, split_batches, write_pipelined, _create_packed_batch
+
+
+class TestVectorizedGeneration(unittest.TestCase):
+
+    def test_decks_are_balanced(self):
+        decks = generate_decks(np.random.default_rng(0), 1000)
+        self.assertEqual(decks.shape, (1000, 52))
+        self.assertTrue(np.all(decks.sum(axis=1) == 26))
+
+    def test_batches_reproducible_from_seed(self):
+        first = [_create_packed_batch(s, 10) for s in batch_seeds(42, 3)]
+        second = [_create_packed_batch(s, 10) for s in batch_seeds(42, 3)]
+        self.assertEqual(first, second)
+        self.assertNotEqual(first[0], first[1])
+
+    def test_batches_concatenate_on_byte_boundaries(self):
+        data = b''.join(_create_packed_batch(s, b) for s, b in zip(batch_seeds(1, 3), split_batches(30, 10)))
+        decks = np.unpackbits(np.frombuffer(data, dtype=np.uint8)).reshape((30, 52))
+        self.assertTrue(np.all(decks.sum(axis=1) == 26))
+
+    def test_odd_batch_size_rejected(self):
+        with self.assertRaises(ValueError):
+            split_batches(100, 7)
+
+    def test_pipelined_writes_in_batch_order_with_bounded_window(self):
+        lock = threading.Lock()
+        live = [0, 0]  # current, peak batches generated but not yet written
+
+        def _batch(i, delay):
+            with lock:
+                live[0] += 1
+                live[1] = max(live[1], live[0])
+            time.sleep(delay)
+            return bytes([i]) * 3
+
+        def _written(i, data):
+            with lock:
+                live[0] -= 1
+
+        delays = np.random.default_rng(3).uniform(0, 0.01, 40)
+        out = io.BytesIO()
+        n = write_pipelined(out, _batch, enumerate(delays), workers=4, in_flight=5,
+                            buffer_bytes=10, on_batch=_written)
+        self.assertEqual(n, 120)
+        self.assertEqual(out.getvalue(), b''.join(bytes([i]) * 3 for i in range(40)))
+        self.assertLessEqual(live[1], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
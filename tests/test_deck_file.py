@@ -0,0 +1,108 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from bitarray import bitarray
+from src.deck_file import (
+    block_index_path,
+    deck_count,
+    deck_file_fingerprint,
+    iter_deck_chunks,
+    read_block_index,
+    read_deck_range,
+    read_header,
+    read_packed_range,
+)
+from src.create_data import create_deck_file, append_deck_file, generate_decks, batch_seeds
+
+
+class TestDeckFile(unittest.TestCase):
+    NUM_DECKS = 101
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        base = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
+        self.decks = rng.permuted(np.tile(base, (self.NUM_DECKS, 1)), axis=1)
+        tmp = tempfile.NamedTemporaryFile(suffix='.bin', delete=False)
+        tmp.close()
+        self.path = tmp.name
+        self.addCleanup(os.remove, self.path)
+        ba = bitarray()
+        ba.extend(self.decks.ravel().tolist())
+        with open(self.path, 'wb') as f:
+            ba.tofile(f)
+
+    def test_deck_count_from_size(self):
+        self.assertEqual(deck_count(self.path), self.NUM_DECKS)
+        self.assertEqual(deck_count(self.path + '.missing'), 0)
+
+    def test_read_range_at_odd_and_even_offsets(self):
+        for start, stop in [(0, 5), (1, 4), (7, 8), (50, 101), (100, 200)]:
+            np.testing.assert_array_equal(read_deck_range(self.path, start, stop),
+                                          self.decks[start:stop])
+
+    def test_packed_words_match_cards(self):
+        words = read_packed_range(self.path, 1, self.NUM_DECKS)
+        expected = (self.decks[1:].astype(np.int64) << np.arange(51, -1, -1)).sum(axis=1)
+        np.testing.assert_array_equal(words, expected)
+
+    def test_negative_start_rejected(self):
+        with self.assertRaises(ValueError):
+            read_deck_range(self.path, -1, 3)
+
+    def test_chunks_cover_range(self):
+        chunks = list(iter_deck_chunks(self.path, 3, None, chunk_size=25))
+        self.assertEqual([lo for lo, _ in chunks], [3, 28, 53, 78])
+        np.testing.assert_array_equal(np.concatenate([c for _, c in chunks]), self.decks[3:])
+
+
+
+class TestDeckFileV2(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'decks.bin')
+
+    def test_header_describes_file(self):
+        create_deck_file(self.path, 25, n_red=20, n_black=10, seed=3, batch_size=10)
+        info = read_header(self.path)
+        self.assertEqual((info.version, info.deck_len, info.n_red, info.n_black), (2, 30, 20, 10))
+        self.assertEqual((info.n_decks, info.stride_bits, info.next_stream), (25, 32, 3))
+        self.assertEqual(deck_count(self.path), 25)
+        np.testing.assert_array_equal(read_block_index(self.path), [[0, 10, 0], [10, 10, 1], [20, 5, 2]])
+        decks = read_deck_range(self.path, 0, 25)
+        self.assertEqual(decks.shape, (25, 30))
+        np.testing.assert_array_equal(decks.sum(axis=1), 20)
+        words = read_packed_range(self.path, 4, 9)
+        np.testing.assert_array_equal(words, (decks[4:9].astype(np.int64) << np.arange(29, -1, -1)).sum(axis=1))
+
+    def test_decks_follow_seed_streams_across_appends(self):
+        create_deck_file(self.path, 20, seed=7, batch_size=10)
+        fingerprint = deck_file_fingerprint(self.path)
+        append_deck_file(self.path, 15)
+        self.assertEqual(deck_count(self.path), 35)
+        self.assertEqual(deck_file_fingerprint(self.path), fingerprint)
+        expected = np.concatenate([generate_decks(np.random.default_rng(s), n)
+                                   for s, n in zip(batch_seeds(7, 4), [10, 10, 10, 5])])
+        np.testing.assert_array_equal(read_deck_range(self.path, 0, 35), expected)
+
+    def test_partial_write_past_header_count_is_ignored(self):
+        create_deck_file(self.path, 10, seed=1, batch_size=10)
+        with open(self.path, 'ab') as f:
+            f.write(b'\xff' * 20)
+        self.assertEqual(deck_count(self.path), 10)
+        append_deck_file(self.path, 10)
+        expected = np.concatenate([generate_decks(np.random.default_rng(s), 10) for s in batch_seeds(1, 2)])
+        np.testing.assert_array_equal(read_deck_range(self.path, 0, 20), expected)
+
+    def test_index_rows_past_header_count_are_dropped(self):
+        create_deck_file(self.path, 20, seed=2, batch_size=10)
+        # As if an append was killed after saving its index, before the header
+        np.save(block_index_path(self.path), [[0, 10, 0], [10, 10, 1], [20, 10, 2], [30, 10, 3]])
+        append_deck_file(self.path, 5)
+        np.testing.assert_array_equal(read_block_index(self.path), [[0, 10, 0], [10, 10, 1], [20, 5, 2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from itertools import combinations
+import numpy as np
+from src.exact_scoring import exact_outcome_probabilities
+from src.score_data import score_deck_humble_jit, _seq_to_array
+
+
+class TestExactScoring(unittest.TestCase):
+    N_RED = 5
+    N_BLACK = 4
+
+    def test_matches_enumeration_of_small_deck(self):
+        cards, tricks, seqs = exact_outcome_probabilities(3, self.N_RED, self.N_BLACK)
+        n_cards = self.N_RED + self.N_BLACK
+        counts = np.zeros((6, len(seqs), len(seqs)))
+        decks = 0
+        for reds in combinations(range(n_cards), self.N_RED):
+            deck = np.zeros(n_cards, dtype=np.uint8)
+            deck[list(reds)] = 1
+            decks += 1
+            for i, s1 in enumerate(seqs):
+                for j, s2 in enumerate(seqs):
+                    if i == j:
+                        continue
+                    c1, c2, t1, t2 = score_deck_humble_jit(deck, _seq_to_array(s1), _seq_to_array(s2))
+                    counts[0 if c1 > c2 else 1 if c2 > c1 else 2, i, j] += 1
+                    counts[3 if t1 > t2 else 4 if t2 > t1 else 5, i, j] += 1
+        np.testing.assert_allclose(cards, counts[:3] / decks, atol=1e-12)
+        np.testing.assert_allclose(tricks, counts[3:] / decks, atol=1e-12)
+
+    def test_probabilities_sum_to_one(self):
+        cards, tricks, seqs = exact_outcome_probabilities()
+        off_diag = ~np.eye(len(seqs), dtype=bool)
+        np.testing.assert_allclose(cards.sum(axis=0)[off_diag], 1.0)
+        np.testing.assert_allclose(tricks.sum(axis=0)[off_diag], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.histograms import histogram_summary, load_histograms
+from src.score_data import (
+    compute_winrate_table_incremental,
+    score_deck_humble_jit,
+    _batch_score_packed,
+    _pattern_codes,
+    _pattern_matrix,
+    _seq_to_array,
+    all_sequences_binary_order,
+)
+
+
+class TestHistograms(unittest.TestCase):
+    NUM_DECKS = 130
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        self.seqs = all_sequences_binary_order(3)
+        self.seq_arrays = {s: _seq_to_array(s) for s in self.seqs}
+        rng = np.random.default_rng(9)
+        base = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
+        self.decks = rng.permuted(np.tile(base, (self.NUM_DECKS, 1)), axis=1)
+        self.deck_path = os.path.join(self.dir, 'decks.bin')
+        with open(self.deck_path, 'wb') as f:
+            f.write(np.packbits(self.decks.ravel()).tobytes())
+
+    def _reference(self):
+        card_hist = np.zeros((8, 8, 105), dtype=np.int64)
+        trick_hist = np.zeros((8, 8, 18, 18), dtype=np.int64)
+        for deck in self.decks:
+            for i, s1 in enumerate(self.seqs):
+                for j, s2 in enumerate(self.seqs):
+                    if i != j:
+                        c1, c2, t1, t2 = score_deck_humble_jit(deck, self.seq_arrays[s1], self.seq_arrays[s2])
+                        card_hist[i, j, c1 - c2 + 52] += 1
+                        trick_hist[i, j, t1, t2] += 1
+        return card_hist, trick_hist
+
+    def test_incremental_histograms_match_reference(self):
+        expected = self._reference()
+        for packed in (False, True):
+            tag = 'packed' if packed else 'automaton'
+            files = dict(counts_cards_file=os.path.join(self.dir, f'cards_{tag}.npy'),
+                         counts_tricks_file=os.path.join(self.dir, f'tricks_{tag}.npy'),
+                         last_n_file=os.path.join(self.dir, f'last_n_{tag}.txt'),
+                         checkpoint_file=os.path.join(self.dir, f'checkpoint_{tag}.npz'),
+                         card_hist_file=os.path.join(self.dir, f'hist_cards_{tag}.npy'),
+                         trick_hist_file=os.path.join(self.dir, f'hist_tricks_{tag}.npy'))
+            compute_winrate_table_incremental(self.deck_path, workers=1, batch_size=50, packed=packed,
+                                              histograms=True, **files)
+            self.assertEqual(np.load(files['card_hist_file']).dtype, np.int32)
+            card_hist, trick_hist = load_histograms(files['card_hist_file'], files['trick_hist_file'])
+            np.testing.assert_array_equal(card_hist, expected[0])
+            np.testing.assert_array_equal(trick_hist, expected[1])
+            counts_cards = np.load(files['counts_cards_file'])
+            np.testing.assert_array_equal(card_hist[..., 53:].sum(axis=-1), counts_cards[0])
+            np.testing.assert_array_equal(card_hist[..., 52], counts_cards[2])
+
+    def test_summary_from_histograms(self):
+        codes = _pattern_codes(_pattern_matrix(self.seqs, self.seq_arrays))
+        words = (self.decks.astype(np.int64) << np.arange(51, -1, -1)).sum(axis=1)
+        *_, card_hist, trick_hist = _batch_score_packed(words, codes, 3, histograms=True)
+        df = histogram_summary(card_hist, trick_hist, self.seqs)
+        self.assertEqual(len(df), 56)
+        row = df[(df["Player 1 pattern"] == "bbr") & (df["Player 2 pattern"] == "rbb")].iloc[0]
+        diffs = []
+        for deck in self.decks:
+            c1, c2, _, _ = score_deck_humble_jit(deck, self.seq_arrays["bbr"], self.seq_arrays["rbb"])
+            diffs.append(c1 - c2)
+        self.assertAlmostEqual(row["Mean card diff"], np.mean(diffs))
+        self.assertAlmostEqual(row["Std card diff"], np.std(diffs))
+        self.assertEqual(row["Median card diff"], np.sort(diffs)[(len(diffs) - 1) // 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
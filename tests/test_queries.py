@@ -0,0 +1,75 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.exact_scoring import exact_outcome_probabilities
+from src.queries import WinRateQuery
+
+
+class TestQueries(unittest.TestCase):
+
+    def setUp(self):
+        cards, tricks, self.seqs = exact_outcome_probabilities(3)
+        # Scale to integer-like counts, as saved by compute_winrate_table_incremental
+        self.counts = {"cards": np.round(cards * 1e6), "tricks": np.round(tricks * 1e6)}
+
+    def test_lookups_match_counts_and_exact(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cards_file = os.path.join(tmpdir.name, 'counts_cards.npy')
+        tricks_file = os.path.join(tmpdir.name, 'counts_tricks.npy')
+        np.save(cards_file, self.counts["cards"].astype(np.int64))
+        np.save(tricks_file, self.counts["tricks"].astype(np.int64))
+        saved = WinRateQuery.from_counts_files(cards_file, tricks_file)
+        exact = WinRateQuery.exact(3)
+        for scoring in ("cards", "tricks"):
+            for p1, p2 in (("bbr", "rbb"), ("rbr", "brr")):
+                a, b = saved.pair(p1, p2, scoring), exact.pair(p1, p2, scoring)
+                self.assertAlmostEqual(a.p1_win, b.p1_win, places=5)
+                self.assertAlmostEqual(a.tie, b.tie, places=5)
+            np.testing.assert_allclose(saved.matrix(scoring), exact.matrix(scoring), atol=1e-5)
+        self.assertEqual(saved.pair("RBR", "brr"), saved.pair(5, 3))
+        with self.assertRaises(ValueError):
+            saved.pair("rbr", "rbr")
+        with self.assertRaises(ValueError):
+            saved.pair("rbr", "brr", "penney")
+        for p1, p2 in ((-1, 3), (-1, 7), (0, 8)):
+            with self.assertRaises(ValueError):
+                saved.pair(p1, p2)
+
+    def test_best_responses_and_dominance(self):
+        query = WinRateQuery(self.counts, self.seqs)
+        probs = query.matrix("cards")
+        for j, opponent in enumerate(self.seqs):
+            best = query.best_response(opponent)
+            rates = np.where(np.arange(8) == j, -1, probs[0, :, j])
+            self.assertEqual(best.pattern, self.seqs[int(np.argmax(rates))])
+            self.assertAlmostEqual(best.edge, probs[0, rates.argmax(), j] - probs[1, rates.argmax(), j])
+        chain = query.dominance_chain("rrr")
+        self.assertEqual(chain[0], "rrr")
+        for prev, nxt in zip(chain, chain[1:]):
+            self.assertEqual(nxt, query.best_response(prev).pattern)
+        # Only the last pattern repeats, and it closes the cycle
+        self.assertEqual(len(set(chain)), len(chain) - 1)
+        self.assertIn(chain[-1], chain[:-1])
+        # Every pattern has a counter, so the cycle has at least three patterns
+        self.assertGreaterEqual(len(chain) - 1 - chain.index(chain[-1]), 3)
+
+    def test_minimax_and_cache(self):
+        query = WinRateQuery.exact(3)
+        solution = query.minimax("cards", tol=1e-5)
+        self.assertLessEqual(solution.gap, 1e-5)
+        # The payoff matrix is antisymmetric, so the game is fair
+        self.assertAlmostEqual(solution.value, 0.0, places=4)
+        self.assertAlmostEqual(sum(solution.strategy.values()), 1.0, places=4)
+        info = query.cache_info()
+        self.assertEqual(info.currsize, 56)
+        query.best_response("rrr", "tricks")
+        self.assertEqual(query.cache_info().misses, info.misses)
+        query.max_materialise_pairs = 10
+        with self.assertRaises(ValueError):
+            query.matrix("tricks")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+import os
+import subprocess
+import sys
+
+
+class TestRunExperiment(unittest.TestCase):
+
+    def test_import_does_not_load_plotting(self):
+        # A fresh interpreter, since other tests may already have imported these
+        code = ("import sys, src.run_experiment; "
+                "print(','.join(m for m in ('matplotlib', 'seaborn', 'pandas') if m in sys.modules))")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+        self.assertEqual(out.stdout.strip(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.checkpoint import save_checkpoint
+from src.deck_file import deck_file_fingerprint, read_deck_range
+from src.create_data import batch_seeds, split_batches, create_deck_file, _create_packed_batch
+from src.score_data import (
+    compute_winrate_table_incremental,
+    compute_winrate_table_streaming,
+    compute_winrate_table_adaptive,
+    wilson_interval,
+    score_deck_humble_jit,
+    score_deck_automaton_jit,
+    build_transition_tables,
+    _batch_score,
+    _batch_score_packed,
+    _pattern_codes,
+    _seq_to_array,
+    all_sequences_binary_order,
+)
+
+
+def random_decks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
+    return rng.permuted(np.tile(base, (n, 1)), axis=1)
+
+
+def reference_counts(decks, seqs, seq_arrays):
+    """
+    Per-deck, per-pair scoring through score_deck_humble_jit, as the original loop did.
+    """
+    nseq = len(seqs)
+    counts = np.zeros((6, nseq, nseq), dtype=np.int64)
+    for deck in decks:
+        for i, s1 in enumerate(seqs):
+            for j, s2 in enumerate(seqs):
+                if i == j:
+                    continue
+                c1, c2, t1, t2 = score_deck_humble_jit(deck, seq_arrays[s1], seq_arrays[s2])
+                counts[0 if c1 > c2 else 1 if c2 > c1 else 2, i, j] += 1
+                counts[3 if t1 > t2 else 4 if t2 > t1 else 5, i, j] += 1
+    return counts
+
+
+class TestScoring(unittest.TestCase):
+    K = 3
+
+    def setUp(self):
+        self.seqs = all_sequences_binary_order(self.K)
+        self.seq_arrays = {s: _seq_to_array(s) for s in self.seqs}
+        self.decks = random_decks(300)
+        self.expected = reference_counts(self.decks, self.seqs, self.seq_arrays)
+
+    def test_batch_score_matches_reference(self):
+        counts = np.array(_batch_score(self.decks, self.seqs, self.seq_arrays))
+        np.testing.assert_array_equal(counts, self.expected)
+
+    def test_every_deck_counted_once_per_pair(self):
+        counts = np.array(_batch_score(self.decks, self.seqs, self.seq_arrays))
+        off_diag = ~np.eye(len(self.seqs), dtype=bool)
+        self.assertTrue(np.all(counts[:3].sum(axis=0)[off_diag] == len(self.decks)))
+        self.assertTrue(np.all(counts[3:].sum(axis=0)[off_diag] == len(self.decks)))
+
+    def test_automaton_matches_window_scoring_for_longer_patterns(self):
+        for k in (4, 5):
+            seqs = all_sequences_binary_order(k)
+            patterns = np.stack([_seq_to_array(s) for s in seqs])
+            tables = build_transition_tables(patterns)
+            rng = np.random.default_rng(k)
+            for deck in self.decks[:40]:
+                i, j = rng.choice(len(seqs), size=2, replace=False)
+                self.assertEqual(
+                    score_deck_automaton_jit(deck, tables[i, j]),
+                    score_deck_humble_jit(deck, patterns[i], patterns[j]),
+                )
+
+    def test_packed_scoring_matches_reference(self):
+        words = (self.decks.astype(np.int64) << np.arange(51, -1, -1)).sum(axis=1)
+        patterns = np.stack([self.seq_arrays[s] for s in self.seqs])
+        counts = np.array(_batch_score_packed(words, _pattern_codes(patterns), self.K))
+        np.testing.assert_array_equal(counts, self.expected)
+
+    def test_incremental_scoring_only_adds_new_decks(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        deck_path = os.path.join(tmpdir.name, 'decks.bin')
+        with open(deck_path, 'wb') as f:
+            f.write(np.packbits(self.decks.ravel()).tobytes())
+        files = dict(
+            counts_cards_file=os.path.join(tmpdir.name, 'cards.npy'),
+            counts_tricks_file=os.path.join(tmpdir.name, 'tricks.npy'),
+            last_n_file=os.path.join(tmpdir.name, 'last_n.txt'),
+        )
+        compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, max_decks=100, **files)
+        compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, **files)
+        counts = np.concatenate([np.load(files['counts_cards_file']), np.load(files['counts_tricks_file'])])
+        np.testing.assert_array_equal(counts, self.expected)
+        with open(files['last_n_file']) as f:
+            self.assertEqual(int(f.read()), len(self.decks))
+
+    def _write_decks(self, tmpdir):
+        deck_path = os.path.join(tmpdir, 'decks.bin')
+        with open(deck_path, 'wb') as f:
+            f.write(np.packbits(self.decks.ravel()).tobytes())
+        files = dict(
+            counts_cards_file=os.path.join(tmpdir, 'cards.npy'),
+            counts_tricks_file=os.path.join(tmpdir, 'tricks.npy'),
+            last_n_file=os.path.join(tmpdir, 'last_n.txt'),
+        )
+        return deck_path, files
+
+    def test_resumes_from_out_of_order_checkpoint(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        deck_path, files = self._write_decks(tmpdir.name)
+        # As if a run was killed after finishing only the chunk [64, 128)
+        partial = np.array(_batch_score(self.decks[64:128], self.seqs, self.seq_arrays))
+        meta = {"fingerprint": deck_file_fingerprint(deck_path), "k": 3, "seqs": self.seqs, "deck_size": 52}
+        save_checkpoint(os.path.join(tmpdir.name, 'checkpoint.npz'), meta, partial[:3], partial[3:], [(64, 128)])
+        compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, **files)
+        counts = np.concatenate([np.load(files['counts_cards_file']), np.load(files['counts_tricks_file'])])
+        np.testing.assert_array_equal(counts, self.expected)
+
+    def test_packed_file_scoring_in_workers(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        deck_path, files = self._write_decks(tmpdir.name)
+        compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, packed=True, **files)
+        counts = np.concatenate([np.load(files['counts_cards_file']), np.load(files['counts_tricks_file'])])
+        np.testing.assert_array_equal(counts, self.expected)
+
+    def test_scores_other_deck_compositions_from_header(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        deck_path = os.path.join(tmpdir.name, 'decks.bin')
+        create_deck_file(deck_path, 150, n_red=12, n_black=18, seed=4, batch_size=64)
+        expected = reference_counts(read_deck_range(deck_path, 0, 150), self.seqs, self.seq_arrays)
+        for packed in (False, True):
+            files = dict(counts_cards_file=os.path.join(tmpdir.name, f'cards{packed}.npy'),
+                         counts_tricks_file=os.path.join(tmpdir.name, f'tricks{packed}.npy'),
+                         last_n_file=os.path.join(tmpdir.name, f'last_n{packed}.txt'),
+                         checkpoint_file=os.path.join(tmpdir.name, f'checkpoint{packed}.npz'))
+            compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, packed=packed, **files)
+            counts = np.concatenate([np.load(files['counts_cards_file']), np.load(files['counts_tricks_file'])])
+            np.testing.assert_array_equal(counts, expected)
+
+    def test_checkpoint_for_other_file_ignored(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        deck_path, files = self._write_decks(tmpdir.name)
+        bogus = np.ones((3, len(self.seqs), len(self.seqs)), dtype=np.int64)
+        meta = {"fingerprint": "other", "k": 3, "seqs": self.seqs, "deck_size": 52}
+        save_checkpoint(os.path.join(tmpdir.name, 'checkpoint.npz'), meta, bogus, bogus, [(0, 200)])
+        compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, **files)
+        counts = np.concatenate([np.load(files['counts_cards_file']), np.load(files['counts_tricks_file'])])
+        np.testing.assert_array_equal(counts, self.expected)
+
+    def test_legacy_counts_not_reused_for_other_file_or_k(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        deck_path, files = self._write_decks(tmpdir.name)
+        compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, **files)
+        # Regenerate the file at the same path with different decks
+        other = random_decks(len(self.decks), seed=1)
+        with open(deck_path, 'wb') as f:
+            f.write(np.packbits(other.ravel()).tobytes())
+        compute_winrate_table_incremental(deck_path, workers=1, batch_size=64, **files)
+        counts = np.concatenate([np.load(files['counts_cards_file']), np.load(files['counts_tricks_file'])])
+        np.testing.assert_array_equal(counts, reference_counts(other, self.seqs, self.seq_arrays))
+        # A different k starts from zero counts of its own shape
+        compute_winrate_table_incremental(deck_path, k=4, workers=1, batch_size=64, **files)
+        seqs = all_sequences_binary_order(4)
+        expected = np.array(_batch_score(other, seqs, {s: _seq_to_array(s) for s in seqs}))
+        np.testing.assert_array_equal(np.load(files['counts_cards_file']), expected[:3])
+
+    def test_streaming_matches_scoring_same_decks_from_file(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        deck_path = os.path.join(tmpdir.name, 'decks.bin')
+        batches = split_batches(250, 100)
+        with open(deck_path, 'wb') as f:
+            for seed_seq, size in zip(batch_seeds(7, len(batches)), batches):
+                f.write(_create_packed_batch(seed_seq, size))
+        from_file = compute_winrate_table_incremental(
+            deck_path, workers=1,
+            counts_cards_file=os.path.join(tmpdir.name, 'cards.npy'),
+            counts_tricks_file=os.path.join(tmpdir.name, 'tricks.npy'),
+            last_n_file=os.path.join(tmpdir.name, 'last_n.txt'),
+        )
+        streamed = compute_winrate_table_streaming(250, seed=7, workers=1, batch_size=100)
+        for a, b in zip(from_file[2:6], streamed[2:6]):
+            np.testing.assert_array_equal(a, b)
+
+    def test_wilson_interval_contains_estimate(self):
+        lo, hi = wilson_interval(np.array([0, 30, 100]), np.array([100, 100, 100]))
+        self.assertTrue(np.all(lo <= np.array([0, 0.3, 1.0]) + 1e-12))
+        self.assertTrue(np.all(hi >= np.array([0, 0.3, 1.0]) - 1e-12))
+        self.assertAlmostEqual(lo[0], 0.0)
+        self.assertAlmostEqual(hi[2], 1.0)
+
+    def test_adaptive_stops_once_target_reached(self):
+        results, used = compute_winrate_table_adaptive(
+            target_halfwidth=0.05, focus="best", seed=3, workers=1, batch_size=100, max_decks=20_000)
+        self.assertGreater(used, 0)
+        self.assertLess(used, 20_000)
+        cards_pct_p1 = results[2]
+        self.assertFalse(np.isnan(cards_pct_p1[0, 1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
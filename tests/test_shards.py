@@ -0,0 +1,67 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.create_data import create_deck_file
+from src.deck_file import read_deck_range
+from src.shards import plan_shards, score_range_to_shard, merge_shards
+from src.score_data import _batch_score, _seq_to_array, all_sequences_binary_order
+
+
+class TestShards(unittest.TestCase):
+    NUM_DECKS = 150
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        rng = np.random.default_rng(5)
+        base = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
+        self.decks = rng.permuted(np.tile(base, (self.NUM_DECKS, 1)), axis=1)
+        self.deck_path = os.path.join(self.dir, 'decks.bin')
+        with open(self.deck_path, 'wb') as f:
+            f.write(np.packbits(self.decks.ravel()).tobytes())
+
+    def _shards(self, ranges):
+        paths = []
+        for i, (start, stop) in enumerate(ranges):
+            path = os.path.join(self.dir, f'shard_{i}.npz')
+            score_range_to_shard(self.deck_path, start, stop, path, batch_size=40)
+            paths.append(path)
+        return paths
+
+    def test_merged_shards_equal_full_scoring(self):
+        seqs = all_sequences_binary_order(3)
+        expected = np.array(_batch_score(self.decks, seqs, {s: _seq_to_array(s) for s in seqs}))
+        ranges = plan_shards(self.deck_path, 3)
+        self.assertEqual(ranges, [(0, 50), (50, 100), (100, 150)])
+        cards, tricks, _, coverage = merge_shards(self._shards(ranges)[::-1])
+        np.testing.assert_array_equal(np.concatenate([cards, tricks]), expected)
+        self.assertEqual(list(coverage.values()), [[(0, 150)]])
+
+    def test_overlap_and_gap_rejected(self):
+        with self.assertRaises(ValueError):
+            merge_shards(self._shards([(0, 60), (50, 100)]))
+        with self.assertRaises(ValueError):
+            merge_shards(self._shards([(0, 50), (60, 100)]))
+        merge_shards(self._shards([(0, 50), (60, 100)]), require_complete=False)
+        # Decks [100, 150) at the end of the file are missing too
+        with self.assertRaises(ValueError):
+            merge_shards(self._shards([(0, 50), (50, 100)]))
+
+    def test_long_decks_use_automaton_kernel(self):
+        path = os.path.join(self.dir, 'long.bin')
+        create_deck_file(path, 90, n_red=30, n_black=30, seed=3, batch_size=40)
+        seqs = all_sequences_binary_order(3)
+        expected = np.array(_batch_score(read_deck_range(path, 0, 90), seqs,
+                                         {s: _seq_to_array(s) for s in seqs}))
+        shard_paths = []
+        for i, (start, stop) in enumerate(plan_shards(path, 2)):
+            shard_paths.append(os.path.join(self.dir, f'long_{i}.npz'))
+            score_range_to_shard(path, start, stop, shard_paths[-1], batch_size=40)
+        cards, tricks, _, _ = merge_shards(shard_paths)
+        np.testing.assert_array_equal(np.concatenate([cards, tricks]), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from src.create_data import generate_decks
+from src.score_data import _batch_score, _seq_to_array, all_sequences_binary_order
+from src.sweep import SweepConfig, sweep_configs, run_sweep
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_grid_skips_impossible_configs(self):
+        self.assertEqual(sweep_configs((12, 52), ks=(3,)), [SweepConfig(12, 6, 3), SweepConfig(52, 26, 3)])
+        self.assertEqual(sweep_configs((4,), red_counts=(1, 5), ks=(2, 4)), [SweepConfig(4, 1, 2)])
+        with self.assertRaises(ValueError):
+            run_sweep(deck_lens=(3,), ks=(3,), num_decks=10)
+
+    def test_sweep_matches_direct_scoring(self):
+        table = run_sweep(deck_lens=(12, 60), red_counts=(5, 6, 30), ks=(2, 3),
+                          variants=("cards", "tricks", "penney"), num_decks=120, seed=9,
+                          workers=1, batch_size=50)
+        configs = sweep_configs((12, 60), (5, 6, 30), (2, 3))
+        self.assertEqual(len(configs), 10)
+        rows = sum(3 * (2 ** c.k) * (2 ** c.k - 1) for c in configs)
+        self.assertEqual(len(table), rows)
+        self.assertTrue(((table.p1_wins + table.p2_wins + table.ties) == 120).all())
+        self.assertTrue((table.score_seconds > 0).all())
+        # One best response per opponent pattern, per configuration and variant
+        best = table[table.best_response].groupby(["deck_len", "n_red", "k", "variant", "p2_pattern"]).size()
+        self.assertTrue((best == 1).all())
+
+        # The 12-card, 5-red, k=3 cell replays its own seed streams
+        c = configs.index(SweepConfig(12, 5, 3))
+        seeds = np.random.SeedSequence(9).spawn(len(configs))[c].spawn(3)
+        decks = np.concatenate([generate_decks(np.random.default_rng(s), n, 5, 7)
+                                for s, n in zip(seeds, (50, 50, 20))])
+        seqs = all_sequences_binary_order(3)
+        expected = np.array(_batch_score(decks, seqs, {s: _seq_to_array(s) for s in seqs}))
+        cell = table[(table.deck_len == 12) & (table.n_red == 5) & (table.k == 3) & (table.variant == "tricks")]
+        for row in cell.itertuples():
+            i, j = seqs.index(row.p1_pattern), seqs.index(row.p2_pattern)
+            self.assertEqual((row.p1_wins, row.p2_wins, row.ties), tuple(expected[3:6, i, j]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.score_data import (
+    compute_winrate_table_incremental,
+    verify_symmetry,
+    all_sequences_binary_order,
+    _batch_score,
+    _batch_score_packed,
+    _pattern_codes,
+    _pattern_matrix,
+    _seq_to_array,
+    build_transition_tables,
+)
+from src.symmetry import pair_plan
+from src.variants import variant_weights
+
+
+def random_decks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
+    return rng.permuted(np.tile(base, (n, 1)), axis=1)
+
+
+class TestSymmetry(unittest.TestCase):
+
+    def setUp(self):
+        seqs = all_sequences_binary_order(3)
+        self.patterns = _pattern_matrix(seqs, {s: _seq_to_array(s) for s in seqs})
+        self.codes = _pattern_codes(self.patterns)
+
+    def test_canonical_pair_classes(self):
+        self.assertEqual(len(pair_plan(self.codes, 3).pairs), 56)
+        self.assertEqual(len(pair_plan(self.codes, 3, "swap").pairs), 28)
+        # 12 classes of four pairs plus 4 of (s, ~s) and (~s, s)
+        self.assertEqual(len(pair_plan(self.codes, 3, "complement").pairs), 16)
+        with self.assertRaises(ValueError):
+            pair_plan(self.codes, 3, "mirror")
+
+    def test_swap_matches_full_scoring_exactly(self):
+        decks = random_decks(200, seed=4)
+        weights = variant_weights(["penney", "last_trick"])
+        plan = pair_plan(self.codes, 3, "swap")
+        tables = build_transition_tables(self.patterns)
+        full = _batch_score(decks, None, None, tables, True, weights)
+        for a, b in zip(full, _batch_score(decks, None, None, tables, True, weights, plan)):
+            np.testing.assert_array_equal(a, b)
+        words = decks.astype(np.int64) @ (1 << np.arange(51, -1, -1, dtype=np.int64))
+        for a, b in zip(full, _batch_score_packed(words, self.codes, 3, 52, True, weights, plan)):
+            np.testing.assert_array_equal(a, b)
+
+    def test_complement_verified_on_flip_closed_sample(self):
+        decks = random_decks(150, seed=5)
+        weights = variant_weights(["penney"])
+        self.assertEqual(verify_symmetry(decks, 3, "complement", packed=True, weights=weights), 300)
+        self.assertEqual(verify_symmetry(decks, 3, "complement", packed=False), 300)
+        self.assertEqual(verify_symmetry(decks, 3, "swap"), 150)
+
+    def test_incremental_complement_mode(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        decks = random_decks(400, seed=6)
+        deck_path = os.path.join(tmpdir.name, 'decks.bin')
+        with open(deck_path, 'wb') as f:
+            f.write(np.packbits(decks.ravel()).tobytes())
+        results = compute_winrate_table_incremental(
+            deck_path, workers=1, batch_size=150, packed=True, symmetry="complement", verify_decks=50,
+            counts_cards_file=os.path.join(tmpdir.name, 'counts_cards.npy'),
+            counts_tricks_file=os.path.join(tmpdir.name, 'counts_tricks.npy'),
+            last_n_file=os.path.join(tmpdir.name, 'last_n.txt'))
+        counts = np.load(os.path.join(tmpdir.name, 'counts_cards.npy'))
+        # Every pair shares counts with its colour complement, except (s, ~s)
+        # whose complement is its own swap; swapped pairs mirror them
+        comp = 7 - np.arange(8)
+        copied = np.arange(8)[None, :] != comp[:, None]
+        np.testing.assert_array_equal(counts[:, copied], counts[:, comp][:, :, comp][:, copied])
+        np.testing.assert_array_equal(counts[0], counts[1].T)
+        self.assertTrue((counts.sum(axis=0)[~np.eye(8, dtype=bool)] == 400).all())
+        self.assertEqual(results[2].shape, (8, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
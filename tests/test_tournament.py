@@ -0,0 +1,92 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.create_data import create_deck_file
+from src.score_data import _batch_score_packed, _pattern_codes, _pattern_matrix, _seq_to_array, all_sequences_binary_order
+from src.tournament import (
+    player_tuples,
+    compute_tournament_counts,
+    seat_matrices,
+    tournament_table,
+    _batch_score_tuples,
+)
+
+
+def reference_outcomes(deck, patterns):
+    """
+    Play one deck for several players card by card, as score_deck_humble_jit does for two.
+    """
+    k = len(patterns[0])
+    cards = [0] * len(patterns)
+    tricks = [0] * len(patterns)
+    last = 0
+    for end in range(k - 1, len(deck)):
+        if end - k + 1 < last:
+            continue
+        window = list(deck[end - k + 1:end + 1])
+        for p, pattern in enumerate(patterns):
+            if window == list(pattern):
+                cards[p] += end - last + 1
+                tricks[p] += 1
+                last = end + 1
+                break
+
+    def outcome(scores):
+        top = max(scores)
+        return len(scores) if scores.count(top) > 1 else scores.index(top)
+    return outcome(cards), outcome(tricks)
+
+
+class TestTournament(unittest.TestCase):
+
+    def setUp(self):
+        self.seqs = all_sequences_binary_order(3)
+        self.patterns = _pattern_matrix(self.seqs, {s: _seq_to_array(s) for s in self.seqs})
+        self.codes = _pattern_codes(self.patterns)
+        rng = np.random.default_rng(2)
+        base = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
+        self.decks = rng.permuted(np.tile(base, (60, 1)), axis=1)
+        self.words = (self.decks.astype(np.int64) << np.arange(51, -1, -1)).sum(axis=1)
+
+    def test_two_players_match_pair_scoring(self):
+        tuples = player_tuples(len(self.seqs), 2)
+        cards, tricks = _batch_score_tuples(self.words, self.codes, tuples, 3)
+        pair = np.array(_batch_score_packed(self.words, self.codes, 3))
+        np.testing.assert_array_equal(cards, pair[:3][:, tuples[:, 0], tuples[:, 1]])
+        np.testing.assert_array_equal(tricks, pair[3:][:, tuples[:, 0], tuples[:, 1]])
+
+    def test_three_players_match_reference(self):
+        tuples = player_tuples(len(self.seqs), 3)
+        self.assertEqual(len(tuples), 8 * 7 * 6)
+        cards, tricks = _batch_score_tuples(self.words, self.codes, tuples, 3)
+        expected = np.zeros((2, 4, len(tuples)), dtype=np.int64)
+        for deck in self.decks:
+            for t, players in enumerate(tuples):
+                c, tr = reference_outcomes(deck, [self.patterns[p] for p in players])
+                expected[0, c, t] += 1
+                expected[1, tr, t] += 1
+        np.testing.assert_array_equal(cards, expected[0])
+        np.testing.assert_array_equal(tricks, expected[1])
+
+    def test_file_and_streaming_agree_and_summaries(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, 'decks.bin')
+        create_deck_file(path, 120, seed=3, batch_size=50)
+        from_file = compute_tournament_counts(4, file_path=path, workers=1, batch_size=50)
+        streamed = compute_tournament_counts(4, num_decks=120, seed=3, workers=1, batch_size=50)
+        np.testing.assert_array_equal(from_file[0], streamed[0])
+        np.testing.assert_array_equal(from_file[1], streamed[1])
+        counts_cards, _, tuples, seqs = from_file
+        np.testing.assert_array_equal(counts_cards.sum(axis=0), 120)
+        df = tournament_table(counts_cards, tuples, seqs)
+        self.assertEqual(len(df), 8 * 7 * 6 * 5)
+        np.testing.assert_allclose(df.filter(like="%").sum(axis=1), 100, atol=1e-3)
+        p1_pct, tie_pct = seat_matrices(counts_cards, tuples, len(seqs))
+        self.assertTrue(np.isnan(p1_pct[0, 0]))
+        self.assertTrue(np.all((p1_pct[~np.eye(8, dtype=bool)] >= 0) & (p1_pct[~np.eye(8, dtype=bool)] <= 100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import os
+import csv
+import json
+import tempfile
+from src.utils import Tracer
+from src.score_data import compute_winrate_table_streaming
+
+
+class TestTracer(unittest.TestCase):
+
+    def test_records_stages_and_worker_chunks(self):
+        tracer = Tracer(live=False)
+        with tracer.stage("generate_and_score", n_decks=300):
+            compute_winrate_table_streaming(300, seed=1, workers=1, batch_size=100, tracer=tracer)
+        summary = tracer.summary()
+        self.assertEqual(summary["chunks"], 3)
+        self.assertEqual(summary["workers"], 1)
+        self.assertEqual(sum(c["n_decks"] for c in tracer.chunks), 300)
+        self.assertIn("generate_and_score", summary["stages"])
+        self.assertNotEqual(tracer.chunks[0]["pid"], os.getpid())
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        json_path = os.path.join(tmpdir.name, "trace.json")
+        csv_path = os.path.join(tmpdir.name, "trace.csv")
+        tracer.to_json(json_path)
+        tracer.to_csv(csv_path)
+        with open(json_path) as f:
+            self.assertEqual(len(json.load(f)["chunks"]), 3)
+        with open(csv_path) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r["kind"] for r in rows], ["stage", "chunk", "chunk", "chunk"])
+
+
+if __name__ == '__main__':
+    unittest.main()
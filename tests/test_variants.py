@@ -0,0 +1,91 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from src.score_data import compute_winrate_table_incremental, all_sequences_binary_order, _seq_to_array
+from src.variants import VARIANTS, register_variant, extra_variants, variant_weights
+
+
+def reference_games(deck, s1, s2):
+    """
+    Play one deck card by card, returning (cards, tricks, first, last) with
+    per-player pairs and the winners (1/2, 0 for none) of the first and last tricks.
+    """
+    k = len(s1)
+    cards, tricks, winners = [0, 0], [0, 0], []
+    last = 0
+    for end in range(k - 1, len(deck)):
+        if end - k + 1 < last:
+            continue
+        window = list(deck[end - k + 1:end + 1])
+        for p, pattern in enumerate((s1, s2)):
+            if window == list(pattern):
+                cards[p] += end - last + 1
+                tricks[p] += 1
+                winners.append(p + 1)
+                last = end + 1
+                break
+    return cards, tricks, (winners[0] if winners else 0), (winners[-1] if winners else 0)
+
+
+class TestVariants(unittest.TestCase):
+
+    def test_registry(self):
+        self.assertEqual(extra_variants(["cards", "penney", "tricks", "penney"]), ["penney"])
+        with self.assertRaises(ValueError):
+            extra_variants(["no_such_variant"])
+        np.testing.assert_array_equal(variant_weights(["penney", "last_trick"]), [[0, 0, 1, 0], [0, 0, 0, 1]])
+        register_variant("tricks_then_cards", "Tricks, Cards Tiebreak", tricks=1_000, cards=1)
+        self.addCleanup(VARIANTS.pop, "tricks_then_cards")
+        self.assertIn("tricks_then_cards", extra_variants(["tricks_then_cards"]))
+
+    def test_variants_scored_in_same_pass(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        rng = np.random.default_rng(11)
+        base = np.array([0] * 26 + [1] * 26, dtype=np.uint8)
+        decks = rng.permuted(np.tile(base, (90, 1)), axis=1)
+        deck_path = os.path.join(tmpdir.name, 'decks.bin')
+        with open(deck_path, 'wb') as f:
+            f.write(np.packbits(decks.ravel()).tobytes())
+        seqs = all_sequences_binary_order(3)
+        arrays = [_seq_to_array(s) for s in seqs]
+        names = ["penney", "last_trick", "cards_then_tricks"]
+        expected = {name: np.zeros((3, 8, 8), dtype=np.int64) for name in names}
+        for deck in decks:
+            for i in range(8):
+                for j in range(8):
+                    if i == j:
+                        continue
+                    cards, tricks, first, last = reference_games(deck, arrays[i], arrays[j])
+                    scores = {"penney": (first == 1, first == 2), "last_trick": (last == 1, last == 2),
+                              "cards_then_tricks": (cards[0] * 1000 + tricks[0], cards[1] * 1000 + tricks[1])}
+                    for name, (a, b) in scores.items():
+                        expected[name][0 if a > b else 1 if b > a else 2, i, j] += 1
+
+        for packed in (False, True):
+            d = os.path.join(tmpdir.name, 'packed' if packed else 'automaton')
+            os.makedirs(d)
+            results = compute_winrate_table_incremental(
+                deck_path, workers=1, batch_size=40, packed=packed, variants=["cards"] + names,
+                counts_cards_file=os.path.join(d, 'counts_cards.npy'),
+                counts_tricks_file=os.path.join(d, 'counts_tricks.npy'),
+                last_n_file=os.path.join(d, 'last_n.txt'))
+            tables = results[7]
+            self.assertEqual(list(tables), names)
+            for name in names:
+                np.testing.assert_array_equal(np.load(os.path.join(d, f'counts_{name}.npy')), expected[name])
+                total = expected[name].sum(axis=0)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    np.testing.assert_allclose(tables[name][1], np.round(expected[name][0] / total * 100, 4))
+            # A second run finds nothing new and reuses the checkpointed variant counts
+            again = compute_winrate_table_incremental(
+                deck_path, workers=1, batch_size=40, packed=packed, variants=names,
+                counts_cards_file=os.path.join(d, 'counts_cards.npy'),
+                counts_tricks_file=os.path.join(d, 'counts_tricks.npy'),
+                last_n_file=os.path.join(d, 'last_n.txt'))
+            np.testing.assert_array_equal(again[7]["penney"][1], tables["penney"][1])
+
+
+if __name__ == '__main__':
+    unittest.main()